@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Precompressed, content-addressed copies of the served data files.
+
+ArtifactPublisher copies each finished output file to
+dist/<name>.<hash>.json, where <hash> is the start of its SHA-256, along with
+gzip and (when the brotli package is installed) brotli variants next to it.
+Because a file's name changes whenever its content does, the hashed files can
+be served with a far-future, immutable cache policy. artifacts.json is the
+small pointer file that maps each logical name to its current artifacts:
+
+    {
+      "version": 1,
+      "files": {
+        "matrix_data.json": {
+          "path": "dist/matrix_data.0123456789ab.json",
+          "sha256": "...", "bytes": 1234567,
+          "encodings": {
+            "gzip": {"path": "dist/matrix_data.0123456789ab.json.gz", "bytes": 123456},
+            "br": {"path": "dist/matrix_data.0123456789ab.json.br", "bytes": 98765}
+          }
+        }
+      }
+    }
+
+Files are hashed and compressed on a thread pool as soon as they are
+submitted, so compression of one file overlaps with writing the next (zlib and
+brotli release the GIL while they work). A file whose hash matches the
+previous pointer entry, with all of its artifacts still present, is not
+compressed again unless force is set. Gzip output is written with a zero mtime
+so identical input always produces identical artifacts.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ARTIFACT_MANIFEST_VERSION = 1
+
+# Name of the pointer file, written to the output directory
+ARTIFACT_MANIFEST = 'artifacts.json'
+
+# Subdirectory of the output directory holding the hashed files
+ARTIFACT_DIR = 'dist'
+
+# Length of the content hash used in artifact filenames
+HASH_LENGTH = 12
+
+DEFAULT_GZIP_LEVEL = 9
+DEFAULT_BROTLI_QUALITY = 11
+
+
+def _write_atomic(path, content):
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(content)
+    os.replace(temp_path, path)
+
+
+class ArtifactPublisher:
+    """Hash and compress output files in the background and write the pointer file."""
+
+    def __init__(self, output_dir, gzip_level=DEFAULT_GZIP_LEVEL, brotli_quality=DEFAULT_BROTLI_QUALITY,
+                 jobs=None, force=False):
+        self.output_dir = Path(output_dir)
+        self.artifact_dir = self.output_dir / ARTIFACT_DIR
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.previous = {} if force else self._load_previous()
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        self.futures = {}
+
+    def _load_previous(self):
+        try:
+            with open(self.output_dir / ARTIFACT_MANIFEST) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != ARTIFACT_MANIFEST_VERSION:
+            return {}
+        return manifest.get('files', {})
+
+    def _is_current(self, entry, digest):
+        if not entry or entry.get('sha256') != digest:
+            return False
+        paths = [entry['path']] + [variant['path'] for variant in entry.get('encodings', {}).values()]
+        if brotli is not None and 'br' not in entry.get('encodings', {}):
+            return False
+        return all((self.output_dir / path).exists() for path in paths)
+
+    def submit(self, path):
+        """Queue a finished output file for hashing and compression."""
+        path = Path(path)
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        self.futures[path.name] = self.executor.submit(self._publish, path)
+
+    def _publish(self, path):
+        """Return (pointer entry, whether any artifact was written) for one file."""
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        previous = self.previous.get(path.name)
+        if self._is_current(previous, digest):
+            return previous, False
+
+        hashed_name = f"{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}"
+        entry = {
+            'path': f"{ARTIFACT_DIR}/{hashed_name}",
+            'sha256': digest,
+            'bytes': len(content),
+            'encodings': {}
+        }
+        shutil.copyfile(path, self.artifact_dir / hashed_name)
+
+        variants = [('gzip', '.gz', lambda data: gzip.compress(data, self.gzip_level, mtime=0))]
+        if brotli is not None:
+            variants.append(('br', '.br', lambda data: brotli.compress(data, quality=self.brotli_quality)))
+
+        for encoding, suffix, compress in variants:
+            compressed = compress(content)
+            _write_atomic(self.artifact_dir / (hashed_name + suffix), compressed)
+            entry['encodings'][encoding] = {'path': f"{ARTIFACT_DIR}/{hashed_name}{suffix}",
+                                            'bytes': len(compressed)}
+        return entry, True
+
+    def finish(self):
+        """Wait for queued files, write the pointer file and remove superseded artifacts.
+
+        Returns the pointer file's dict.
+        """
+        files = {}
+        written = 0
+        try:
+            for name, future in self.futures.items():
+                files[name], changed = future.result()
+                written += changed
+        finally:
+            self.executor.shutdown()
+
+        current = {Path(entry['path']).name for entry in files.values()}
+        for entry in files.values():
+            current.update(Path(variant['path']).name for variant in entry['encodings'].values())
+        removed = 0
+        if self.artifact_dir.exists():
+            for artifact_path in self.artifact_dir.iterdir():
+                if artifact_path.name not in current:
+                    os.remove(artifact_path)
+                    removed += 1
+
+        manifest = {'version': ARTIFACT_MANIFEST_VERSION, 'files': files}
+        with open(self.output_dir / ARTIFACT_MANIFEST, 'w') as f:
+            json.dump(manifest, f, sort_keys=True, indent=2)
+
+        encodings = 'gzip and brotli' if brotli is not None else 'gzip (brotli not installed)'
+        print(f"Published {len(files)} content-addressed artifacts with {encodings} to {self.artifact_dir} "
+              f"({written} updated, {len(files) - written} unchanged, {removed} stale files removed)")
+        return manifest
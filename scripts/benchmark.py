@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extraction pipeline on synthetic workspaces.
+
+A workspace is generated for each scale (see synthetic_workspace.py), where a
+scale of 1 is roughly the size of the OBDb organization, and the pipeline is
+timed stage by stage with the same functions extract_data.py uses. Signalsets
+are streamed through the stages one at a time, so memory stays bounded at
+every scale:
+
+    discovery        find_vehicle_repos()
+    read             reading the signalset files through their repo source
+    parse            parse_signalset(), excluding signal group matching
+    signal_groups    process_signal_groups()
+    normalize        Parameter.to_dict(), which gives records in normalized form
+    validation       the compiled schema validator, record by record
+    encode           canonical_encoding()
+    sort             ordering the encoded records with the external merge sort
+    hash             SHA-256 of the output, kept in the report as output_sha256
+    write            writing the minified output file
+
+Unless --skip-end-to-end is given, each workspace is also run through
+extract_data() as a whole, with its usual outputs.
+
+The report is written as JSON so CI can keep it as a baseline. With --compare,
+stage times are checked against a previous report at the same scales and the
+run exits with status 1 if any stage slowed down by more than --tolerance.
+Runs with the same configuration whose output_sha256 differs from the
+baseline's are reported too, since an optimization shouldn't change the output.
+
+Usage:
+    python benchmark.py --scales 1 10 100 --output benchmark_report.json
+    python benchmark.py --repos 50 --scales 1 10 --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import extract_data
+from repo_sources import SIGNALSET_DIR, open_repo_source
+from synthetic_workspace import DEFAULTS, generate_workspace
+from validate_json import canonical_encoding, load_record_validator, sort_encoded_records
+
+REPORT_VERSION = 1
+
+# Repositories in a scale 1 workspace, about the size of the OBDb organization
+ORG_REPO_COUNT = 250
+
+STAGES = ('discovery', 'read', 'parse', 'signal_groups', 'normalize', 'validation', 'encode', 'sort', 'hash',
+          'write')
+
+# Output is hashed and written in blocks of about this many characters
+WRITE_BLOCK_SIZE = 1 << 20
+
+# Stages faster than this are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def benchmark_stages(workspace_dir, output_dir, schema_path):
+    """
+    Time each stage of the pipeline over a workspace and return the timings and counts.
+
+    Signalsets are streamed through the stages one at a time, like extract_data()
+    streams them, so only one signalset's intermediates are held in memory and
+    the encoded records are sorted with the bounded-memory external sort.
+    """
+    stages = dict.fromkeys(STAGES, 0.0)
+    counts = {'repos': 0, 'signalsets': 0, 'parameters': 0}
+    process_signal_groups = extract_data.process_signal_groups
+    validator = load_record_validator(str(schema_path))
+
+    def timed_signal_groups(*args):
+        start = time.perf_counter()
+        try:
+            return process_signal_groups(*args)
+        finally:
+            stages['signal_groups'] += time.perf_counter() - start
+
+    def encoded_records(repo_dirs):
+        for repo_dir in repo_dirs:
+            with open_repo_source(repo_dir) as source:
+                make, model = source.name.split('-', 1) if '-' in source.name else (source.name, '')
+                counts['repos'] += 1
+                for name in source.list_signalsets():
+                    years = extract_data.extract_year_range_from_filename(name) if name != 'default.json' else None
+
+                    start = time.perf_counter()
+                    content = source.read(f"{SIGNALSET_DIR}/{name}")
+                    stages['read'] += time.perf_counter() - start
+
+                    groups_before = stages['signal_groups']
+                    start = time.perf_counter()
+                    parameters = extract_data.parse_signalset(content, make, model, years)
+                    stages['parse'] += time.perf_counter() - start - (stages['signal_groups'] - groups_before)
+                    counts['signalsets'] += 1
+                    counts['parameters'] += len(parameters)
+
+                    start = time.perf_counter()
+                    normalized = [parameter.to_dict() for parameter in parameters]
+                    stages['normalize'] += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    for record in normalized:
+                        for _ in validator.iter_errors(record):
+                            pass
+                    stages['validation'] += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    encoded = [canonical_encoding(record) for record in normalized]
+                    stages['encode'] += time.perf_counter() - start
+                    yield from encoded
+
+    start = time.perf_counter()
+    repo_dirs = extract_data.find_vehicle_repos(workspace_dir)
+    stages['discovery'] = time.perf_counter() - start
+
+    digest = hashlib.sha256()
+    block = []
+    block_size = 0
+
+    def flush(f):
+        data = ''.join(block).encode('utf-8')
+        block.clear()
+        start = time.perf_counter()
+        digest.update(data)
+        stages['hash'] += time.perf_counter() - start
+        start = time.perf_counter()
+        f.write(data)
+        stages['write'] += time.perf_counter() - start
+
+    # parse_signalset() looks up process_signal_groups() in its module, so it is swapped in place
+    extract_data.process_signal_groups = timed_signal_groups
+    start = time.perf_counter()
+    try:
+        with open(Path(output_dir) / 'matrix_data.json', 'wb') as f:
+            separator = '['
+            for line in sort_encoded_records(encoded_records(repo_dirs), temp_dir=output_dir, encode=str):
+                block.append(separator + line)
+                block_size += len(line) + 1
+                separator = ','
+                if block_size >= WRITE_BLOCK_SIZE:
+                    flush(f)
+                    block_size = 0
+            block.append('[]' if separator == '[' else ']')
+            flush(f)
+    finally:
+        extract_data.process_signal_groups = process_signal_groups
+    counts['output_sha256'] = digest.hexdigest()
+
+    # Sorting is interleaved with the other stages, so it gets the time none of them account for
+    streamed = time.perf_counter() - start
+    stages['sort'] = max(streamed - sum(seconds for stage, seconds in stages.items()
+                                        if stage not in ('discovery', 'sort')), 0.0)
+
+    return stages, counts
+
+
+def benchmark_end_to_end(workspace_dir, output_dir):
+    """Time a full extract_data() run without a cache, discarding its console output."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        extract_data.extract_data(workspace_dir, output_dir)
+    return time.perf_counter() - start
+
+
+def run_scale(scale, base_dir, config, end_to_end=True):
+    """Generate the workspace for one scale and benchmark it."""
+    workspace_dir = Path(base_dir) / f"workspace-{scale}x"
+    output_dir = Path(base_dir) / f"output-{scale}x"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    repos = config['repos'] * scale
+    print(f"Generating a {scale}x workspace with {repos} repositories...")
+    generated = generate_workspace(workspace_dir, repos, config['signalsets'], config['commands'],
+                                   config['signals'], config['signal_groups'], config['seed'])
+
+    print(f"Timing pipeline stages at {scale}x...")
+    stages, counts = benchmark_stages(workspace_dir, output_dir, config['schema'])
+    total = sum(stages.values())
+    run = {
+        'scale': scale,
+        'repos': counts['repos'],
+        'signalsets': counts['signalsets'],
+        'commands': generated['commands'],
+        'signals': generated['signals'],
+        'parameters': counts['parameters'],
+        'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        'total_seconds': round(total, 6),
+        'parameters_per_second': round(counts['parameters'] / total) if total else None,
+        'end_to_end_seconds': None,
+        'output_sha256': counts['output_sha256']
+    }
+
+    if end_to_end:
+        print(f"Running extract_data() at {scale}x...")
+        run['end_to_end_seconds'] = round(benchmark_end_to_end(workspace_dir, output_dir / 'end-to-end'), 6)
+
+    return run
+
+
+def print_run(run):
+    print(f"\n{run['scale']}x: {run['repos']} repos, {run['signalsets']} signalsets, "
+          f"{run['parameters']} parameters, {run['total_seconds']:.3f}s "
+          f"({run['parameters_per_second']} parameters/s)")
+    for stage, seconds in run['stages'].items():
+        share = seconds / run['total_seconds'] * 100 if run['total_seconds'] else 0
+        print(f"  {stage:<14} {seconds:9.3f}s {share:5.1f}%")
+    if run['end_to_end_seconds'] is not None:
+        print(f"  {'end to end':<14} {run['end_to_end_seconds']:9.3f}s")
+
+
+def find_regressions(baseline, report, tolerance):
+    """List the stages of matching scales that are more than tolerance slower than the baseline."""
+    baseline_runs = {run['scale']: run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in report['runs']:
+        previous = baseline_runs.get(run['scale'])
+        if previous is None:
+            continue
+
+        timings = dict(run['stages'], end_to_end=run['end_to_end_seconds'])
+        previous_timings = dict(previous['stages'], end_to_end=previous.get('end_to_end_seconds'))
+        for stage, seconds in timings.items():
+            before = previous_timings.get(stage)
+            if seconds is None or before is None or seconds < MIN_REGRESSION_SECONDS:
+                continue
+            if seconds > before * (1 + tolerance):
+                regressions.append({'scale': run['scale'], 'stage': stage, 'baseline': before, 'seconds': seconds})
+    return regressions
+
+
+def find_output_changes(baseline, report):
+    """List the scales whose output differs from the baseline's, when both ran with the same configuration."""
+    if baseline.get('config') != report['config']:
+        return []
+    baseline_runs = {run['scale']: run for run in baseline.get('runs', [])}
+    return [run['scale'] for run in report['runs']
+            if baseline_runs.get(run['scale'], {}).get('output_sha256') not in (None, run['output_sha256'])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline on synthetic workspaces')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='Workspace sizes as multiples of --repos (default: 1 10 100)')
+    parser.add_argument('--repos', type=int, default=ORG_REPO_COUNT,
+                        help=f'Repositories at scale 1 (default: {ORG_REPO_COUNT})')
+    parser.add_argument('--signalsets', type=int, default=DEFAULTS['signalsets'],
+                        help='Most signalset files per repository')
+    parser.add_argument('--commands', type=int, default=DEFAULTS['commands'], help='Mean commands per signalset')
+    parser.add_argument('--signals', type=int, default=DEFAULTS['signals'], help='Mean signals per command')
+    parser.add_argument('--signal-groups', type=int, default=DEFAULTS['signal_groups'],
+                        help='Signal groups per signalset')
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'], help='Random seed for the workspaces')
+    parser.add_argument('--output', default='benchmark_report.json', help='Report file path')
+    parser.add_argument('--compare', help='Previous report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown per stage against --compare, as a fraction (default: 0.25)')
+    parser.add_argument('--skip-end-to-end', action='store_true', help="Don't time full extract_data() runs")
+    parser.add_argument('--work-dir', help='Directory for the generated workspaces (default: a temp directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated workspaces and outputs')
+    args = parser.parse_args()
+
+    config = {
+        'repos': args.repos,
+        'signalsets': args.signalsets,
+        'commands': args.commands,
+        'signals': args.signals,
+        'signal_groups': args.signal_groups,
+        'seed': args.seed,
+        'schema': Path(__file__).parent / 'matrix_data_schema.json'
+    }
+
+    base_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='obdb-benchmark-'))
+    base_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        runs = [run_scale(scale, base_dir, config, not args.skip_end_to_end) for scale in args.scales]
+    finally:
+        if args.keep:
+            print(f"Kept the generated workspaces in {base_dir}")
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    report = {
+        'version': REPORT_VERSION,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {key: value for key, value in config.items() if key != 'schema'},
+        'runs': runs
+    }
+
+    for run in runs:
+        print_run(run)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved benchmark report to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for scale in find_output_changes(baseline, report):
+            print(f"Warning: the {scale}x output differs from {args.compare} (output_sha256)")
+        regressions = find_regressions(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression['scale']}x {regression['stage']}: {regression['seconds']:.3f}s "
+                  f"vs {regression['baseline']:.3f}s in {args.compare}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No stage slowed down by more than {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
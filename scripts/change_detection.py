@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Per-vehicle change detection for matrix_data.json.
+
+ChangeDetector is an output sink for validate_json.write_normalized_stream().
+It hashes each parameter's encoded line once, grouped by vehicle and signal
+id, and the resulting digests are persisted between runs as a manifest:
+
+    {
+      "version": 1,
+      "vehicles": {
+        "Ford-Transit-Connect": {
+          "digest": "...", "count": 123,
+          "signals": {"FORD_SOC": "0123456789abcdef", ...}
+        }
+      }
+    }
+
+compare_manifests() compares the vehicle digests first and only compares the
+signal digests of vehicles that were added, removed or changed, so the work is
+proportional to what changed rather than to the size of the matrix.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from data_shards import vehicle_id
+from serialization import dump, load
+
+CHANGE_MANIFEST_VERSION = 1
+
+# Length of the per-signal digests kept in the manifest; they only need to detect changes
+SIGNAL_DIGEST_LENGTH = 16
+
+
+class ChangeDetector:
+    """Collect per-vehicle, per-signal digests of the encoded parameters."""
+
+    def __init__(self):
+        self.vehicles = {}
+
+    def add(self, record, line):
+        signals = self.vehicles.setdefault(vehicle_id(record.get('make', ''), record.get('model', '')), {})
+        signal_id = record.get('id', '')
+        digest = signals.get(signal_id)
+        if digest is None:
+            digest = signals[signal_id] = hashlib.sha256()
+        digest.update(line.encode('utf-8') + b'\n')
+
+    def manifest(self):
+        """Return the digest manifest of everything added so far."""
+        vehicles = {}
+        for vehicle, signals in self.vehicles.items():
+            signal_digests = {
+                signal_id: digest.hexdigest()[:SIGNAL_DIGEST_LENGTH]
+                for signal_id, digest in sorted(signals.items())
+            }
+            vehicle_digest = hashlib.sha256()
+            for signal_id, digest in signal_digests.items():
+                vehicle_digest.update(f"{signal_id}\0{digest}\n".encode('utf-8'))
+            vehicles[vehicle] = {
+                'digest': vehicle_digest.hexdigest(),
+                'count': len(signal_digests),
+                'signals': signal_digests
+            }
+        return {'version': CHANGE_MANIFEST_VERSION, 'vehicles': vehicles}
+
+
+def load_change_manifest(manifest_path):
+    """Load the manifest saved by the previous run, or None if there is no usable one."""
+    try:
+        with open(manifest_path) as f:
+            manifest = load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CHANGE_MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_change_manifest(manifest_path, manifest):
+    """Save a manifest through a temp file so an interrupted run keeps the previous one."""
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    with open(temp_path, 'w') as f:
+        dump(manifest, f, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def compare_manifests(previous, current):
+    """
+    Describe the differences between two manifests.
+
+    Returns a dict with sorted lists of added, removed and changed vehicles, and
+    for each of those vehicles the signal ids that were added, removed or changed.
+    """
+    old_vehicles = previous['vehicles']
+    new_vehicles = current['vehicles']
+    report = {'added': [], 'removed': [], 'changed': [], 'signals': {}}
+
+    for vehicle in sorted(set(old_vehicles) | set(new_vehicles)):
+        old = old_vehicles.get(vehicle)
+        new = new_vehicles.get(vehicle)
+        if old is not None and new is not None and old['digest'] == new['digest']:
+            continue
+
+        if old is None:
+            report['added'].append(vehicle)
+        elif new is None:
+            report['removed'].append(vehicle)
+        else:
+            report['changed'].append(vehicle)
+
+        old_signals = old['signals'] if old else {}
+        new_signals = new['signals'] if new else {}
+        report['signals'][vehicle] = {
+            'added': sorted(set(new_signals) - set(old_signals)),
+            'removed': sorted(set(old_signals) - set(new_signals)),
+            'changed': sorted(signal for signal in set(old_signals) & set(new_signals)
+                              if old_signals[signal] != new_signals[signal])
+        }
+
+    return report
+
+
+def has_changes(report):
+    return bool(report['added'] or report['removed'] or report['changed'])
+
+
+def print_change_report(report, limit=20):
+    """Print a summary of a comparison, listing up to limit vehicles per category."""
+    print(f"Vehicle changes: {len(report['added'])} added, {len(report['removed'])} removed, "
+          f"{len(report['changed'])} changed")
+    for category in ('added', 'removed', 'changed'):
+        for vehicle in report[category][:limit]:
+            signals = report['signals'][vehicle]
+            print(f"  {category} {vehicle}: {len(signals['added'])} signals added, "
+                  f"{len(signals['removed'])} removed, {len(signals['changed'])} changed")
+        if len(report[category]) > limit:
+            print(f"  ... and {len(report[category]) - limit} more {category}")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Binary columnar form of matrix_data.json for analytics.
+
+ColumnarMatrixBuilder is an output sink for validate_json.write_normalized_stream().
+It stores the matrix one column per record field instead of one object per
+record, so a consumer can filter by make, hdr or metric by scanning a single
+array without deserializing anything else. The file is laid out as:
+
+    b'OBDBCOL1'                 magic
+    uint32 (little endian)      length of the JSON header
+    JSON header                 row count and, per column, its kind and blocks
+    column blocks               each starting on an 8-byte boundary
+
+Columns come in three kinds:
+
+    "dict"   uint32 codes into a dictionary of distinct values, stored as a
+             minified JSON array in its own block and only parsed when the
+             column's values are needed. Nested fields (cmd, fmt, modelYears,
+             signalGroups) are dictionary encoded too, with their JSON values
+             in the dictionary. MISSING_CODE marks records without the field.
+    "int32"  bitOffset and bitLength, with MISSING_INT for absent values
+    "float64" fmt.mul, fmt.div and fmt.add pulled out of fmt, NaN when absent
+
+ColumnarMatrix reads the file through mmap, so opening it is cheap and columns
+are only paged in as they are used. column() copies a column out of the map
+into an array, so the values stay usable after the file is closed:
+
+    matrix = ColumnarMatrix('public/data/matrix_data.columns')
+    rows = matrix.where(make='Toyota', hdr='7E0')
+    scales = matrix.column('fmt.mul')
+    record = matrix.record(rows[0])
+
+record() reconstructs the original flat record key for key. Running this module
+converts a columnar file back to flat JSON, or to Parquet when pyarrow is
+installed.
+
+Usage:
+    python columnar_matrix.py --input public/data/matrix_data.columns --output matrix_data.json
+    python columnar_matrix.py --input public/data/matrix_data.columns --parquet matrix_data.parquet
+"""
+
+import argparse
+import math
+import mmap
+import struct
+import sys
+from array import array
+
+from serialization import dump, dumps, loads
+
+COLUMNAR_VERSION = 1
+
+MAGIC = b'OBDBCOL1'
+
+# Code of records that don't have a dictionary encoded field
+MISSING_CODE = 0xFFFFFFFF
+
+# Value of records that don't have an integer field
+MISSING_INT = -2 ** 31
+
+# Top-level fields stored as dictionary codes
+DICT_FIELDS = ('make', 'model', 'hdr', 'eax', 'pid', 'id', 'name', 'unit', 'suggestedMetric',
+               'scaling', 'path', 'debug', 'cmd', 'fmt', 'modelYears', 'signalGroups')
+
+# Top-level integer fields
+INT_FIELDS = ('bitOffset', 'bitLength')
+
+# Keys of fmt exposed as float64 columns named fmt.<key>
+FMT_FLOAT_KEYS = ('mul', 'div', 'add')
+
+# Dictionary column holding any other top-level fields of a record, as one object
+EXTRA_COLUMN = '_extra'
+
+TYPECODES = {'dict': 'I', 'int32': 'i', 'float64': 'd'}
+
+KNOWN_FIELDS = frozenset(DICT_FIELDS + INT_FIELDS)
+
+
+def _encode_value(value):
+    return dumps(value)
+
+
+class ColumnarMatrixBuilder:
+    """Build the columns incrementally from normalized records, in output order."""
+
+    def __init__(self):
+        self.count = 0
+        self.columns = {}
+        self.dictionaries = {}
+        self._codes = {}
+        for field in DICT_FIELDS + (EXTRA_COLUMN,):
+            self._add_column(field, 'dict')
+        for field in INT_FIELDS:
+            self._add_column(field, 'int32')
+        for key in FMT_FLOAT_KEYS:
+            self._add_column(f"fmt.{key}", 'float64')
+
+    def _add_column(self, name, kind):
+        self.columns[name] = (kind, array(TYPECODES[kind]))
+        if kind == 'dict':
+            self.dictionaries[name] = []
+            self._codes[name] = {}
+
+    def _code(self, name, value):
+        # Records are normalized, so equal values always encode identically
+        key = _encode_value(value)
+        code = self._codes[name].get(key)
+        if code is None:
+            code = len(self.dictionaries[name])
+            self._codes[name][key] = code
+            self.dictionaries[name].append(value)
+        return code
+
+    def add(self, record, line=None):
+        """Add one normalized record; the encoded line is accepted for use as an output sink."""
+        self.count += 1
+        columns = self.columns
+
+        for field in DICT_FIELDS:
+            columns[field][1].append(self._code(field, record[field]) if field in record else MISSING_CODE)
+
+        extra = {key: value for key, value in record.items() if key not in KNOWN_FIELDS}
+
+        for field in INT_FIELDS:
+            value = record.get(field)
+            if type(value) is int and MISSING_INT < value < 2 ** 31:
+                columns[field][1].append(value)
+            else:
+                columns[field][1].append(MISSING_INT)
+                if field in record:
+                    # Keep values that don't fit the column exact by storing them with the extras
+                    extra[field] = value
+
+        columns[EXTRA_COLUMN][1].append(self._code(EXTRA_COLUMN, extra) if extra else MISSING_CODE)
+
+        fmt = record.get('fmt')
+        for key in FMT_FLOAT_KEYS:
+            value = fmt.get(key) if isinstance(fmt, dict) else None
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            columns[f"fmt.{key}"][1].append(float(value) if is_number else math.nan)
+
+    def write(self, output_path):
+        """Write the header and column blocks."""
+        blocks = []
+        header_columns = {}
+        offset = 0
+
+        def add_block(data):
+            nonlocal offset
+            padding = -offset % 8
+            blocks.append(b'\0' * padding + data)
+            offset += padding
+            block = {'offset': offset, 'length': len(data)}
+            offset += len(data)
+            return block
+
+        for name, (kind, values) in self.columns.items():
+            if sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            column = {'kind': kind, 'data': add_block(values.tobytes())}
+            if kind == 'dict':
+                dictionary = dumps(self.dictionaries[name], ensure_ascii=False)
+                column['dictionary'] = add_block(dictionary.encode('utf-8'))
+                column['size'] = len(self.dictionaries[name])
+            header_columns[name] = column
+
+        header = dumps({
+            'version': COLUMNAR_VERSION,
+            'count': self.count,
+            'columns': header_columns
+        }, sort_keys=True).encode('utf-8')
+
+        # Column offsets are relative to the first block, which is padded to an 8-byte boundary
+        prefix_length = len(MAGIC) + 4 + len(header)
+        with open(output_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write(b'\0' * (-prefix_length % 8))
+            for block in blocks:
+                f.write(block)
+
+
+class ColumnarMatrix:
+    """Memory-mapped reader for files written by ColumnarMatrixBuilder."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped
+            self._file.close()
+            raise ValueError(f"Not a columnar matrix file: {path}")
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar matrix file: {path}")
+        (header_length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = loads(self._map[header_start:header_start + header_length])
+        if header.get('version') != COLUMNAR_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported columnar matrix version: {header.get('version')}")
+
+        prefix_length = header_start + header_length
+        self._base = prefix_length + (-prefix_length % 8)
+        self.count = header['count']
+        self.columns = header['columns']
+        self._columns = {}
+        self._dictionaries = {}
+        self._codes = {}
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _block(self, block):
+        start = self._base + block['offset']
+        return memoryview(self._map)[start:start + block['length']]
+
+    def column(self, name):
+        """Return a column's raw values: dictionary codes, integers or floats, indexed by row."""
+        values = self._columns.get(name)
+        if values is None:
+            column = self.columns[name]
+            values = array(TYPECODES[column['kind']])
+            # Copy the block out so no view into the map outlives close()
+            with self._block(column['data']) as block:
+                values.frombytes(block)
+            if sys.byteorder != 'little':
+                values.byteswap()
+            self._columns[name] = values
+        return values
+
+    def dictionary(self, name):
+        """Return the distinct values of a dictionary encoded column, indexed by code."""
+        values = self._dictionaries.get(name)
+        if values is None:
+            with self._block(self.columns[name]['dictionary']) as block:
+                values = loads(bytes(block))
+            self._dictionaries[name] = values
+        return values
+
+    def code(self, name, value):
+        """Return the dictionary code of a value in a column, or None when no record has it."""
+        codes = self._codes.get(name)
+        if codes is None:
+            # Key by JSON encoding so values of different types, such as 1 and True, stay distinct
+            codes = {dumps(entry, sort_keys=True): code for code, entry in enumerate(self.dictionary(name))}
+            self._codes[name] = codes
+        return codes.get(dumps(value, sort_keys=True))
+
+    def values(self, name):
+        """Yield a column's decoded values, None where a record doesn't have the field."""
+        column = self.column(name)
+        kind = self.columns[name]['kind']
+        if kind == 'dict':
+            dictionary = self.dictionary(name)
+            return (None if code == MISSING_CODE else dictionary[code] for code in column)
+        if kind == 'int32':
+            return (None if value == MISSING_INT else value for value in column)
+        return (None if math.isnan(value) else value for value in column)
+
+    def where(self, **filters):
+        """Return the rows whose dictionary encoded fields equal all of the given values."""
+        rows = None
+        for name, value in filters.items():
+            code = self.code(name, value)
+            if code is None:
+                return []
+            column = self.column(name)
+            if rows is None:
+                rows = [row for row, row_code in enumerate(column) if row_code == code]
+            else:
+                rows = [row for row in rows if column[row] == code]
+        return list(range(self.count)) if rows is None else rows
+
+    def record(self, row):
+        """Reconstruct the flat record at a row."""
+        record = {}
+        for name in DICT_FIELDS:
+            code = self.column(name)[row]
+            if code != MISSING_CODE:
+                record[name] = self.dictionary(name)[code]
+        for name in INT_FIELDS:
+            value = self.column(name)[row]
+            if value != MISSING_INT:
+                record[name] = value
+        code = self.column(EXTRA_COLUMN)[row]
+        if code != MISSING_CODE:
+            record.update(self.dictionary(EXTRA_COLUMN)[code])
+        return dict(sorted(record.items()))
+
+    def records(self, rows=None):
+        """Yield the reconstructed records at the given rows, or all of them in order."""
+        for row in range(self.count) if rows is None else rows:
+            yield self.record(row)
+
+
+def write_parquet(matrix, output_path):
+    """Write a columnar matrix as a Parquet file with dictionary encoded string columns."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Writing Parquet requires pyarrow (pip install pyarrow)")
+
+    arrays = {}
+    for name, column in matrix.columns.items():
+        if name == EXTRA_COLUMN:
+            continue
+        if column['kind'] == 'dict':
+            dictionary = matrix.dictionary(name)
+            if not all(value is None or isinstance(value, str) for value in dictionary):
+                # Nested values are stored as their JSON encoding
+                dictionary = [None if value is None else _encode_value(value) for value in dictionary]
+            indices = pa.array([None if code == MISSING_CODE else code for code in matrix.column(name)],
+                               type=pa.uint32())
+            arrays[name] = pa.DictionaryArray.from_arrays(indices, pa.array(dictionary, type=pa.string()))
+        else:
+            arrays[name] = pa.array(list(matrix.values(name)),
+                                    type=pa.int32() if column['kind'] == 'int32' else pa.float64())
+
+    pq.write_table(pa.table(arrays), output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a columnar matrix file to flat JSON or Parquet')
+    parser.add_argument('--input', required=True, help='Columnar matrix file path')
+    parser.add_argument('--output', help='Output flat JSON file path')
+    parser.add_argument('--parquet', help='Output Parquet file path (requires pyarrow)')
+    args = parser.parse_args()
+
+    if not args.output and not args.parquet:
+        parser.error('at least one of --output or --parquet is required')
+
+    with ColumnarMatrix(args.input) as matrix:
+        if args.output:
+            with open(args.output, 'w') as f:
+                dump(list(matrix.records()), f, sort_keys=True)
+            print(f"Expanded {len(matrix)} records to {args.output}")
+
+        if args.parquet:
+            try:
+                write_parquet(matrix, args.parquet)
+            except RuntimeError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            print(f"Wrote {len(matrix)} records to {args.parquet}")
+
+
+if __name__ == '__main__':
+    main()
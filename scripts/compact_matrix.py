@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Interned table form of matrix_data.json.
+
+Every flat parameter record repeats its vehicle, its command's hdr/eax/cmd and
+its signal format. The compact form stores each distinct vehicle, command,
+format, signal group list and model year range once in a lookup table. Each
+record becomes a short row of table indexes plus the few fields unique to it:
+
+    {
+      "version": 1,
+      "columns": ["vehicle", "command", "format", "signalGroups", "modelYears",
+                  "pid", "id", "name", "suggestedMetric", "path"],
+      "vehicles": [{"make": ..., "model": ...}, ...],
+      "commands": [{"hdr": ..., "eax": ..., "cmd": {...}, "debug": ...}, ...],
+      "formats": [{"fmt": {...}, "unit": ..., "scaling": ..., "bitOffset": ..., "bitLength": ...}, ...],
+      "signalGroups": [{"signalGroups": [...]}, {}, ...],
+      "modelYears": [{"modelYears": [2019, 2021]}, {}, ...],
+      "rows": [[0, 3, 12, 1, 0, "0C", "RPM", "Engine speed", "engineSpeed", "Engine"], ...]
+    }
+
+Table entries hold exactly the keys present in the original records, so
+expand_compact_matrix() reconstructs the flat records, in the same order, key
+for key. Any record that doesn't fit the row layout is stored as-is in place
+of a row.
+
+Usage:
+    python compact_matrix.py --input public/data/matrix_data_compact.json --output matrix_data.json
+"""
+
+import argparse
+
+from serialization import dump, dumps, load
+
+COMPACT_VERSION = 1
+
+# Tables and the record keys each of them covers
+TABLE_FIELDS = {
+    'vehicles': ('make', 'model'),
+    'commands': ('hdr', 'eax', 'cmd', 'debug'),
+    'formats': ('fmt', 'unit', 'scaling', 'bitOffset', 'bitLength'),
+    'signalGroups': ('signalGroups',),
+    'modelYears': ('modelYears',),
+}
+
+# Record keys stored inline in every row, after the table indexes
+ROW_FIELDS = ('pid', 'id', 'name', 'suggestedMetric', 'path')
+
+COLUMNS = ['vehicle', 'command', 'format', 'signalGroups', 'modelYears'] + list(ROW_FIELDS)
+
+KNOWN_FIELDS = frozenset(ROW_FIELDS).union(*TABLE_FIELDS.values())
+
+
+class CompactMatrixBuilder:
+    """Build the compact form incrementally from normalized records, in output order."""
+
+    def __init__(self):
+        self.tables = {name: [] for name in TABLE_FIELDS}
+        self._indexes = {name: {} for name in TABLE_FIELDS}
+        self.rows = []
+
+    def _intern(self, table, entry):
+        # Records are normalized, so equal entries always encode identically
+        key = dumps(entry)
+        index = self._indexes[table].get(key)
+        if index is None:
+            index = len(self.tables[table])
+            self._indexes[table][key] = index
+            self.tables[table].append(entry)
+        return index
+
+    def add(self, record, line=None):
+        """Add one normalized record; the encoded line is accepted for use as an output sink."""
+        if not KNOWN_FIELDS.issuperset(record) or not all(field in record for field in ROW_FIELDS):
+            self.rows.append(record)
+            return
+
+        row = [
+            self._intern(table, {field: record[field] for field in fields if field in record})
+            for table, fields in TABLE_FIELDS.items()
+        ]
+        row.extend(record[field] for field in ROW_FIELDS)
+        self.rows.append(row)
+
+    def to_dict(self):
+        return dict(version=COMPACT_VERSION, columns=COLUMNS, rows=self.rows, **self.tables)
+
+    def write(self, output_path):
+        """Write the compact form, minified like the other served data files."""
+        with open(output_path, 'w') as f:
+            dump(self.to_dict(), f)
+
+
+def expand_compact_matrix(compact):
+    """Yield the flat parameter records described by a compact matrix, in order."""
+    if compact.get('version') != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact matrix version: {compact.get('version')}")
+
+    tables = [compact[name] for name in TABLE_FIELDS]
+    table_count = len(tables)
+
+    for row in compact['rows']:
+        if isinstance(row, dict):
+            yield row
+            continue
+
+        record = {}
+        for table, index in zip(tables, row):
+            record.update(table[index])
+        record.update(zip(ROW_FIELDS, row[table_count:]))
+        yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expand a compact matrix file back into flat parameter records')
+    parser.add_argument('--input', required=True, help='Compact matrix JSON file path')
+    parser.add_argument('--output', required=True, help='Output flat JSON file path')
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        compact = load(f)
+
+    with open(args.output, 'w') as f:
+        dump(list(expand_compact_matrix(compact)), f, sort_keys=True)
+
+    print(f"Expanded {len(compact['rows'])} records to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Local read-only HTTP API over the extracted data.
+
+Serves an extract_data.py output directory with the standard library's asyncio,
+so it runs offline with nothing to install:
+
+    /data/<path>              Any output file, laid out as the web app fetches it
+    /api                      The output files with their sizes and SHA-256
+    /api/vehicles             vehicles/manifest.json
+    /api/vehicles/<id>        One vehicle's parameters, e.g. /api/vehicles/Ford-F-150
+    /api/query?<filters>      Parameters matching matrix_query.py filters, e.g.
+                              ?make=Toyota&hdr=7E0&unit=celsius,percent&years=2019-2022&limit=100
+
+Every response has a strong ETag: the SHA-256 of the file, computed when the
+server first serves it and again whenever the file's mtime or size changes.
+Query ETags are derived from the hash of matrix_data.json and the normalized
+query. A dashboard that polls with If-None-Match therefore gets an empty 304
+until the data actually changes. Responses are gzipped for clients that accept
+it, using the precompressed artifacts when their recorded hash matches. Range requests (a single
+byte range, optionally with If-Range) are answered from the uncompressed
+content. Small files, shards, query results and their gzipped forms are kept
+in an LRU cache bounded by --cache-mb.
+
+Queries need the matrix_query.json index (extract with --query-index, or run
+matrix_query.py --build). X-Total-Count gives the number of matches before
+limit and offset are applied.
+
+Usage:
+    python data_server.py --data public/data
+    python data_server.py --data public/data --host 0.0.0.0 --port 8077 --cache-mb 256
+"""
+
+import argparse
+import asyncio
+import email.utils
+import gzip
+import hashlib
+import re
+import sys
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from artifacts import ARTIFACT_DIR, ARTIFACT_MANIFEST
+from matrix_query import DATA_FILENAME, QUERY_FIELDS, QUERY_INDEX_FILENAME, MatrixQuery, parse_years
+from serialization import dumps, load
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8077
+DEFAULT_CACHE_MB = 64
+
+# Bodies smaller than this aren't worth compressing
+MIN_GZIP_BYTES = 1024
+GZIP_LEVEL = 6
+
+# Limit on the request line and headers
+MAX_HEADER_BYTES = 16384
+
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 15
+
+# Size of the reads when streaming files too large for the cache
+CHUNK_SIZE = 1 << 20
+
+SHARD_MANIFEST = 'vehicles/manifest.json'
+
+CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.gz': 'application/gzip',
+    '.br': 'application/x-brotli',
+}
+
+STATUS_REASONS = {
+    200: 'OK', 204: 'No Content', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 416: 'Range Not Satisfiable',
+    431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+ALLOWED_METHODS = 'GET, HEAD, OPTIONS'
+
+# Headers that dashboards on another origin need to read
+EXPOSED_HEADERS = 'ETag, Content-Range, X-Total-Count'
+
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+# A response: the content's SHA-256, and either its bytes or the file holding them
+Resource = namedtuple('Resource', ['digest', 'content_type', 'size', 'path', 'body', 'gzip_path', 'headers'])
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SliceCache:
+    """Least recently used response bodies, bounded by their total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # Larger bodies would push out too much else; they are streamed or rebuilt instead
+        self.max_entry_bytes = max_bytes // 4
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        """Cache a value of the given size in bytes, unless it is too large, and return it."""
+        if size > self.max_entry_bytes:
+            return value
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+        return value
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip."""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    if 'gzip' in weights:
+        return weights['gzip'] > 0
+    return weights.get('*', 0) > 0
+
+
+def etag_matches(header, etag):
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 asks)."""
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single byte range.
+
+    Returns None when the header should be ignored and the whole content sent
+    (several ranges or a malformed header), and False when the range is not
+    satisfiable.
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        return (max(0, size - length), size - 1) if length and size else False
+    start = int(first)
+    if start >= size:
+        return False
+    end = min(int(last), size - 1) if last else size - 1
+    return (start, end) if end >= start else None
+
+
+class DataStore:
+    """The output directory, with content hashes, a query index and a slice cache kept up to date."""
+
+    def __init__(self, data_dir, cache_bytes):
+        self.data_dir = Path(data_dir).resolve()
+        self.cache = SliceCache(cache_bytes)
+        self._hashes = {}
+        self._manifests = {}
+        self._query = None
+        self._query_key = None
+
+    def _load_manifest(self, relative_path):
+        """Load a JSON manifest, again only when it changed on disk; None if it is missing."""
+        path = self.data_dir / relative_path
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._manifests.get(relative_path)
+        if cached is None or cached[0] != key:
+            with open(path) as f:
+                cached = self._manifests[relative_path] = (key, load(f))
+        return cached[1]
+
+    async def content_hash(self, path):
+        """SHA-256 of a file in the output directory, hashed again whenever its mtime or size changes."""
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # Manifests can be stale (after --no-artifacts, or a same-size edit), so the file itself is hashed
+        digest = await asyncio.to_thread(file_digest, path)
+        self._hashes[path] = (key, digest)
+        return digest
+
+    def _precompressed(self, relative_path, digest):
+        """The gzip artifact of an output file with this content, if there is one."""
+        artifacts = self._load_manifest(ARTIFACT_MANIFEST) or {}
+        entry = artifacts.get('files', {}).get(relative_path)
+        if entry is None or entry['sha256'] != digest or 'gzip' not in entry['encodings']:
+            return None
+        gzip_path = self.data_dir / entry['encodings']['gzip']['path']
+        return gzip_path if gzip_path.is_file() else None
+
+    async def file_resource(self, relative_path):
+        path = (self.data_dir / relative_path).resolve()
+        if not path.is_relative_to(self.data_dir) or not path.is_file():
+            raise HTTPError(404, f"No such file: {relative_path}")
+        relative_path = path.relative_to(self.data_dir).as_posix()
+        digest = await self.content_hash(path)
+
+        headers = {}
+        if relative_path.startswith(f"{ARTIFACT_DIR}/"):
+            # Artifact names change with their content
+            headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return Resource(digest, CONTENT_TYPES.get(path.suffix, 'application/octet-stream'), path.stat().st_size,
+                        path, None, self._precompressed(relative_path, digest), headers)
+
+    async def vehicle_resource(self, vehicle):
+        shards = self._load_manifest(SHARD_MANIFEST) or {}
+        entry = shards.get('vehicles', {}).get(vehicle)
+        if entry is None:
+            raise HTTPError(404, f"No such vehicle: {vehicle}")
+        return await self.file_resource(f"vehicles/{entry['file']}")
+
+    async def status_resource(self):
+        files = {}
+        for path in sorted(self.data_dir.iterdir()):
+            if path.is_file():
+                files[path.name] = {'bytes': path.stat().st_size, 'sha256': await self.content_hash(path)}
+        shards = self._load_manifest(SHARD_MANIFEST) or {}
+        status = {
+            'files': files,
+            'vehicles': len(shards.get('vehicles', {})),
+            'query': (self.data_dir / QUERY_INDEX_FILENAME).is_file()
+        }
+        body = dumps(status, sort_keys=True).encode('utf-8')
+        return Resource(hashlib.sha256(body).hexdigest(), 'application/json', len(body), None, body, None, {})
+
+    async def matrix_query(self):
+        """The MatrixQuery of the current data, reopened when the data or its index change."""
+        try:
+            data_stat = (self.data_dir / DATA_FILENAME).stat()
+            index_stat = (self.data_dir / QUERY_INDEX_FILENAME).stat()
+        except FileNotFoundError:
+            raise HTTPError(404, f"No {QUERY_INDEX_FILENAME} next to {DATA_FILENAME}; extract with --query-index "
+                                 "or run matrix_query.py --build") from None
+        key = (data_stat.st_mtime_ns, data_stat.st_size, index_stat.st_mtime_ns, index_stat.st_size)
+        if key != self._query_key:
+            if self._query is not None:
+                self._query.close()
+                self._query = self._query_key = None
+            try:
+                self._query = await asyncio.to_thread(MatrixQuery, self.data_dir)
+            except ValueError as e:
+                raise HTTPError(503, str(e)) from None
+            self._query_key = key
+        return self._query
+
+    async def query_resource(self, query):
+        filters = {}
+        since = until = limit = None
+        offset = 0
+        for name, value in parse_qsl(query, keep_blank_values=True):
+            if name in QUERY_FIELDS:
+                filters.setdefault(name, set()).update(value.split(','))
+                continue
+            if name not in ('years', 'limit', 'offset'):
+                raise HTTPError(400, f"Unknown query parameter: {name} (expected one of "
+                                     f"{', '.join(QUERY_FIELDS)}, years, limit or offset)")
+            try:
+                if name == 'years':
+                    since, until = parse_years(value)
+                elif name == 'limit':
+                    limit = int(value)
+                else:
+                    offset = int(value)
+            except ValueError:
+                raise HTTPError(400, f"Invalid {name}: {value}") from None
+            if (limit or 0) < 0 or offset < 0:
+                raise HTTPError(400, f"Invalid {name}: {value}")
+
+        matrix = await self.matrix_query()
+        data_digest = await self.content_hash(self.data_dir / DATA_FILENAME)
+        filters = {name: sorted(values) for name, values in filters.items()}
+        normalized = dumps([filters, since, until, limit, offset], sort_keys=True)
+        digest = hashlib.sha256(f"{data_digest}\n{normalized}".encode('utf-8')).hexdigest()
+
+        cached = self.cache.get(('query', digest))
+        if cached is None:
+            rows = matrix.select(since, until, **filters)
+            selected = rows[offset:None if limit is None else offset + limit]
+            body = b'[' + b','.join(matrix.record_bytes(row) for row in selected) + b']'
+            cached = self.cache.put(('query', digest), (body, len(rows)), len(body))
+        body, total = cached
+        return Resource(digest, 'application/json', len(body), None, body, None, {'X-Total-Count': str(total)})
+
+    async def resolve(self, path, query):
+        """Return the Resource of a request path, or raise HTTPError."""
+        path = unquote(path)
+        if path in ('/api', '/api/'):
+            return await self.status_resource()
+        if path == '/api/vehicles':
+            return await self.file_resource(SHARD_MANIFEST)
+        if path.startswith('/api/vehicles/'):
+            return await self.vehicle_resource(path[len('/api/vehicles/'):])
+        if path == '/api/query':
+            return await self.query_resource(query)
+        if path.startswith('/data/'):
+            return await self.file_resource(path[len('/data/'):])
+        raise HTTPError(404, f"Not found: {path}")
+
+    async def body(self, resource):
+        """The bytes of a resource, read through the cache; None for files too large to cache."""
+        if resource.body is not None:
+            return resource.body
+        if resource.size > self.cache.max_entry_bytes:
+            return None
+        body = self.cache.get(('file', resource.digest))
+        if body is None:
+            body = await asyncio.to_thread(resource.path.read_bytes)
+            self.cache.put(('file', resource.digest), body, len(body))
+        return body
+
+    async def gzip_body(self, resource):
+        """The gzipped bytes of a resource, through the cache; None when it is too large to compress in memory."""
+        body = self.cache.get(('gzip', resource.digest))
+        if body is None:
+            content = await self.body(resource)
+            if content is None:
+                return None
+            body = await asyncio.to_thread(gzip.compress, content, GZIP_LEVEL, mtime=0)
+            self.cache.put(('gzip', resource.digest), body, len(body))
+        return body
+
+
+class DataServer:
+    """Answer HTTP/1.1 requests for a DataStore."""
+
+    def __init__(self, store, quiet=False):
+        self.store = store
+        self.quiet = quiet
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, 'GET', 431, 'Request headers too large', keep_alive=False)
+                    break
+
+                try:
+                    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                    method, target, version = request_line.split(' ')
+                    headers = {}
+                    for line in header_lines:
+                        if line:
+                            name, _, value = line.partition(':')
+                            headers[name.strip().lower()] = value.strip()
+                except ValueError:
+                    await self.send_error(writer, 'GET', 400, 'Malformed request', keep_alive=False)
+                    break
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                # Request bodies are never read, so a connection that sent one can't be reused
+                if headers.get('content-length', '0') != '0' or 'transfer-encoding' in headers:
+                    keep_alive = False
+
+                status = await self.respond(writer, method, target, headers, keep_alive)
+                if not self.quiet:
+                    print(f"{method} {target} {status}", flush=True)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _headers(self, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {STATUS_REASONS[status]}",
+                 f"Date: {email.utils.formatdate(usegmt=True)}",
+                 'Access-Control-Allow-Origin: *',
+                 f"Access-Control-Expose-Headers: {EXPOSED_HEADERS}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if not keep_alive:
+            lines.append('Connection: close')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def send(self, writer, method, status, headers, keep_alive, body=b'', path=None, start=0, length=0):
+        """Send a response whose body is either bytes or length bytes of a file from start."""
+        writer.write(self._headers(status, headers, keep_alive))
+        if method != 'HEAD':
+            if path is None:
+                writer.write(body)
+            else:
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    while length > 0:
+                        chunk = f.read(min(CHUNK_SIZE, length))
+                        if not chunk:
+                            raise ConnectionError(f"{path} changed while it was being sent")
+                        writer.write(chunk)
+                        length -= len(chunk)
+                        await writer.drain()
+        await writer.drain()
+
+    async def send_error(self, writer, method, status, message, keep_alive, headers=None):
+        body = dumps({'error': message}).encode('utf-8')
+        headers = dict(headers or {}, **{'Content-Type': 'application/json', 'Content-Length': len(body),
+                                         'Cache-Control': 'no-store'})
+        await self.send(writer, method, status, headers, keep_alive, body)
+        return status
+
+    async def respond(self, writer, method, target, headers, keep_alive):
+        """Send the response to one request and return its status."""
+        if method == 'OPTIONS':
+            await self.send(writer, method, 204, {
+                'Allow': ALLOWED_METHODS, 'Access-Control-Allow-Methods': ALLOWED_METHODS,
+                'Access-Control-Allow-Headers': 'If-None-Match, If-Range, Range', 'Content-Length': 0
+            }, keep_alive)
+            return 204
+        if method not in ('GET', 'HEAD'):
+            return await self.send_error(writer, method, 405, f"{method} is not supported; this API is read-only",
+                                         keep_alive, {'Allow': ALLOWED_METHODS})
+
+        url = urlsplit(target)
+        try:
+            resource = await self.store.resolve(url.path, url.query)
+        except HTTPError as e:
+            return await self.send_error(writer, method, e.status, str(e), keep_alive)
+        except Exception as e:
+            print(f"❌ Error answering {target}: {e}", file=sys.stderr)
+            return await self.send_error(writer, method, 500, 'Internal error', keep_alive)
+
+        etag = f'"{resource.digest}"'
+        range_header = headers.get('range')
+        if range_header and headers.get('if-range', etag) != etag:
+            range_header = None
+
+        use_gzip = (not range_header and resource.content_type == 'application/json'
+                    and resource.size >= MIN_GZIP_BYTES and accepts_gzip(headers.get('accept-encoding', '')))
+        body = path = None
+        if use_gzip:
+            if resource.gzip_path is not None:
+                path = resource.gzip_path
+            else:
+                body = await self.store.gzip_body(resource)
+                use_gzip = body is not None
+        if use_gzip:
+            # Each encoding is a different representation, so it has its own strong ETag
+            etag = f'"{resource.digest}-gzip"'
+
+        response_headers = {
+            'Content-Type': resource.content_type,
+            'ETag': etag,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'Accept-Ranges': 'bytes',
+        }
+        response_headers.update(resource.headers)
+
+        if etag_matches(headers.get('if-none-match', ''), etag):
+            await self.send(writer, method, 304, response_headers, keep_alive)
+            return 304
+
+        if use_gzip:
+            response_headers['Content-Encoding'] = 'gzip'
+            size = len(body) if path is None else path.stat().st_size
+            response_headers['Content-Length'] = size
+            await self.send(writer, method, 200, response_headers, keep_alive, body, path, 0, size)
+            return 200
+
+        body = await self.store.body(resource)
+        if body is None:
+            path = resource.path
+        size = resource.size if body is None else len(body)
+        status, start, length = 200, 0, size
+        if range_header:
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                return await self.send_error(writer, method, 416, 'Range not satisfiable', keep_alive,
+                                             {'Content-Range': f"bytes */{size}"})
+            if byte_range:
+                status, (start, end) = 206, byte_range
+                length = end - start + 1
+                response_headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+                if body is not None:
+                    body = body[start:end + 1]
+        response_headers['Content-Length'] = length
+        await self.send(writer, method, status, response_headers, keep_alive, body or b'', path, start, length)
+        return status
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        print(f"✅ Serving {self.store.data_dir} at http://{host}:{port}/ (read-only)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the extracted data over a local read-only HTTP API')
+    parser.add_argument('--data', default='public/data', help='Output directory of extract_data.py (default: public/data)')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'Size of the in-memory cache of response bodies in MiB (default: {DEFAULT_CACHE_MB})')
+    parser.add_argument('--quiet', action='store_true', help='Do not log requests')
+    args = parser.parse_args()
+
+    if not Path(args.data).is_dir():
+        print(f"❌ Data directory not found: {args.data}")
+        sys.exit(1)
+
+    server = DataServer(DataStore(args.data, args.cache_mb << 20), args.quiet)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
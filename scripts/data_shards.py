@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Per-vehicle shards of matrix_data.json.
+
+VehicleShardWriter is an output sink for validate_json.write_normalized_stream().
+It splits the normalized parameters by make and model into
+vehicles/<make>-<model>.json, each a minified array in the same order as
+matrix_data.json, and writes vehicles/manifest.json:
+
+    {
+      "version": 1,
+      "vehicles": {
+        "Ford-Transit-Connect": {
+          "make": "Ford", "model": "Transit-Connect",
+          "file": "Ford-Transit-Connect.json",
+          "count": 123, "bytes": 45678, "sha256": "..."
+        }
+      }
+    }
+
+Pages that only need one vehicle can load its shard instead of the whole
+matrix. A shard is only rewritten when its content changes, so unchanged
+shards keep their timestamps and stay cached by browsers and CDNs across
+updates.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from serialization import dump
+
+SHARD_MANIFEST_VERSION = 1
+
+
+def vehicle_id(make, model):
+    """Vehicle identifier used by the web app and in shard filenames."""
+    return f"{make}-{model}"
+
+
+class VehicleShardWriter:
+    """Collect encoded parameters per vehicle and write them as shards."""
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        self.vehicles = {}
+
+    def add(self, record, line):
+        key = (record.get('make', ''), record.get('model', ''))
+        self.vehicles.setdefault(key, []).append(line)
+
+    def write(self):
+        """Write changed shards and the manifest, and remove shards of vehicles that are gone.
+
+        Returns the manifest dict.
+        """
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {}
+        written = 0
+
+        for (make, model), lines in sorted(self.vehicles.items()):
+            shard_id = vehicle_id(make, model)
+            filename = f"{shard_id}.json"
+            content = ('[' + ','.join(lines) + ']').encode('utf-8')
+            digest = hashlib.sha256(content).hexdigest()
+
+            shard_path = self.shard_dir / filename
+            if not shard_path.exists() or hashlib.sha256(shard_path.read_bytes()).hexdigest() != digest:
+                shard_path.write_bytes(content)
+                written += 1
+
+            manifest[shard_id] = {
+                'make': make,
+                'model': model,
+                'file': filename,
+                'count': len(lines),
+                'bytes': len(content),
+                'sha256': digest
+            }
+
+        current_files = {entry['file'] for entry in manifest.values()} | {'manifest.json'}
+        removed = 0
+        for shard_path in self.shard_dir.glob('*.json'):
+            if shard_path.name not in current_files:
+                os.remove(shard_path)
+                removed += 1
+
+        data = {'version': SHARD_MANIFEST_VERSION, 'vehicles': manifest}
+        with open(self.shard_dir / 'manifest.json', 'w') as f:
+            dump(data, f, sort_keys=True)
+
+        print(f"Saved {len(manifest)} vehicle shards to {self.shard_dir} "
+              f"({written} updated, {removed} removed)")
+        return data
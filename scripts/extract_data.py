@@ -1,16 +1,48 @@
 #!/usr/bin/env python3
 import json
 import os
-import shutil
-import subprocess
+import sys
 import argparse
 import re
-import yaml
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 import multiprocessing
 import hashlib
-import sys
+import time
+from collections import deque
+from functools import lru_cache, partial
+
+from artifacts import ARTIFACT_MANIFEST, DEFAULT_BROTLI_QUALITY, DEFAULT_GZIP_LEVEL, ArtifactPublisher
+from change_detection import (ChangeDetector, compare_manifests, has_changes, load_change_manifest,
+                              print_change_report, save_change_manifest)
+from columnar_matrix import ColumnarMatrixBuilder
+from compact_matrix import CompactMatrixBuilder
+from data_shards import VehicleShardWriter
+from extraction_cache import ExtractionCache
+from matrix_index import MatrixIndexBuilder
+from matrix_query import QUERY_INDEX_FILENAME, QueryIndexBuilder
+from parameter_record import Parameter
+from pipeline_metrics import (PipelineMetrics, add_signalset_counts, new_repo_metrics, print_summary, record_signalset,
+                              signalset_counts)
+from repo_sources import (GENERATIONS_PATHS, INGEST_MODES, MODEL_YEARS_PATH, SIGNALSET_DIR, open_repo_source,
+                          repo_name, workspace_entry_mode)
+from repo_fetcher import (DEFAULT_ARCHIVE_URL_TEMPLATE, DEFAULT_CONCURRENCY, DEFAULT_RETRIES, DEFAULT_TIMEOUT,
+                          DEFAULT_URL_TEMPLATE, RepoFetcher, list_org_repos, summarize_fetch)
+from serialization import dump, load_yaml, loads
+from signal_fingerprints import SignalFingerprintIndex, print_clusters
+from validate_json import canonical_encoding, deep_sort_dict, file_sha256, validate_and_normalize_json
+
+# Parse results are only reusable while the parsing code, the record format and
+# the normalization and JSON/YAML backends they go through are unchanged, so the
+# cache is namespaced by a hash of those scripts
+CACHE_VERSION = hashlib.sha256(b''.join(
+    (Path(__file__).parent / script).read_bytes()
+    for script in ('extract_data.py', 'parameter_record.py', 'validate_json.py', 'serialization.py')
+)).hexdigest()[:16]
+
+# Exit statuses for --exit-code; 1 remains the status for errors
+EXIT_NO_CHANGES = 0
+EXIT_CHANGES = 2
 
 # List of vehicle makes to exclude (these are standalone make repos)
 VEHICLE_MAKES = [
@@ -86,62 +118,21 @@ VEHICLE_MAKES = [
     "voyah",
 ]
 
-def handle_repo(org_name, repo, workspace_dir):
-    """Clone or update a single repository."""
-    repo_path = Path(workspace_dir) / repo
-    try:
-        if not repo_path.exists():
-            # Clone new repository
-            subprocess.run(
-                ['gh', 'repo', 'clone', f'{org_name}/{repo}', str(repo_path)],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            print(f"Cloned {repo}")
-        else:
-            # Update existing repository
-            subprocess.run(
-                ['git', 'fetch', '--all'],
-                check=True,
-                cwd=str(repo_path),
-                capture_output=True,
-                text=True
-            )
-            subprocess.run(
-                ['git', 'reset', '--hard', 'origin/main'],
-                check=True,
-                cwd=str(repo_path),
-                capture_output=True,
-                text=True
-            )
-            print(f"Updated {repo}")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error processing {repo}: {e.stderr}")
-        return False
-
-def clone_repos(org_name, workspace_dir):
-    """Clone all repositories from a GitHub organization using parallel processing."""
-    # Create workspace directory if it doesn't exist
-    Path(workspace_dir).mkdir(parents=True, exist_ok=True)
-
-    # Get all repo names using GitHub API with pagination
-    cmd = [
-        'gh', 'api',
-        '-H', 'Accept: application/vnd.github+json',
-        '-H', 'X-GitHub-Api-Version: 2022-11-28',
-        f'/orgs/{org_name}/repos',
-        '--jq', '.[].name',
-        '-X', 'GET',
-        '--paginate'
-    ]
+def clone_repos(org_name, workspace_dir, fetcher=None, repos=None):
+    """Clone or update all repositories of a GitHub organization concurrently.
 
-    try:
-        repos = subprocess.check_output(cmd).decode().strip().split('\n')
-    except subprocess.CalledProcessError as e:
-        print(f"Error fetching repositories: {e}")
-        return
+    fetcher is the RepoFetcher to use (see repo_fetcher.py); repos is the list of
+    repository names, which is fetched from the GitHub API when not given.
+
+    Returns a (repo_heads, changed_repos, failed_repos) tuple: the commit each
+    repository is at after the update, the set of repositories whose HEAD moved
+    or that were newly cloned, and the repositories that could not be fetched.
+    All three are None if the repository list could not be fetched.
+    """
+    if repos is None:
+        repos = list_org_repos(org_name)
+        if repos is None:
+            return None, None, None
 
     # Filter out excluded repos
     filtered_repos = [
@@ -151,163 +142,190 @@ def clone_repos(org_name, workspace_dir):
 
     print(f"Found {len(filtered_repos)} repositories to process")
 
-    # Determine optimal number of workers based on CPU cores
-    num_workers = min(32, multiprocessing.cpu_count() * 2)  # Cap at 32 workers
-
-    # Process repositories in parallel
-    successful = 0
-    failed = 0
-
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        # Submit all tasks
-        future_to_repo = {
-            executor.submit(handle_repo, org_name, repo, workspace_dir): repo
-            for repo in filtered_repos
-        }
-
-        # Process completed tasks
-        for future in as_completed(future_to_repo):
-            repo = future_to_repo[future]
-            try:
-                if future.result():
-                    successful += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                print(f"Error processing {repo}: {str(e)}")
-                failed += 1
-
-    print(f"\nProcessing completed:")
-    print(f"Successfully processed: {successful}")
-    print(f"Failed: {failed}")
-    if failed > 0:
-        print("Check the error messages above for details about failed repositories.")
+    fetcher = fetcher or RepoFetcher(workspace_dir)
+    results = fetcher.fetch_all(org_name, filtered_repos)
+
+    repo_heads = {}
+    changed_repos = set()
+    failed_repos = []
+    for result in results:
+        if not result['success']:
+            failed_repos.append(result['repo'])
+        if result['head_after']:
+            repo_heads[result['repo']] = result['head_after']
+        if result['head_after'] != result['head_before']:
+            changed_repos.add(result['repo'])
+
+    summarize_fetch(results)
+    print(f"Changed since last fetch: {len(changed_repos)}")
+
+    return repo_heads, changed_repos, failed_repos
+
+@lru_cache(maxsize=None)
+def compile_group_regex(matching_regex):
+    """Compile a signal group regex once per process; many repos share the same patterns."""
+    return re.compile(matching_regex)
+
+# Backreferences would point at the wrong group once patterns are combined
+BACKREFERENCE_PATTERN = re.compile(r'\\[1-9]|\(\?P=')
+
+# Inline global flags such as (?i) or (?x); within a combined pattern, Python 3.10
+# only warns about them and applies them to every alternative
+GLOBAL_FLAGS_PATTERN = re.compile(r'\(\?[aiLmsux]+\)')
+
+@lru_cache(maxsize=None)
+def compile_group_prefilter(matching_regexes):
+    """Combine a signalset's group regexes into one alternation, or None if that isn't safe.
+
+    The combined pattern matches an id exactly when at least one of the group
+    regexes does, so a single search can rule out ids that belong to no group.
+    """
+    if len(matching_regexes) < 2 or any(BACKREFERENCE_PATTERN.search(r) or GLOBAL_FLAGS_PATTERN.search(r)
+                                        for r in matching_regexes):
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{regex})' for regex in matching_regexes))
+    except re.error:
+        # e.g. duplicate group names across patterns
+        return None
 
 def process_signal_groups(signalset_data, parameters, make, model):
     """Process signal groups and assign group membership to parameters."""
     if 'signalGroups' not in signalset_data:
         return parameters
 
-    for param in parameters:
-        param['signalGroups'] = []  # Initialize empty list for signal groups this parameter belongs to
-
+    # Compile every group's regex and build its reference info once per signalset
+    groups = []
     for group in signalset_data.get('signalGroups', []):
         group_id = group.get('id')
         matching_regex = group.get('matchingRegex')
-        group_name = group.get('name', group_id)
-        group_path = group.get('path', '')
-        suggested_metric_group = group.get('suggestedMetricGroup', '')
 
         if not group_id or not matching_regex:
             continue
 
         try:
-            pattern = re.compile(matching_regex)
-
-            # Check each parameter against the regex
-            for param in parameters:
-                param_id = param.get('id', '')
-                if pattern.search(param_id):
-                    # Create a group reference with basic info
-                    group_info = {
-                        'id': group_id,
-                        'name': group_name,
-                        'path': group_path
-                    }
-
-                    # Add suggestedMetricGroup if it exists
-                    if suggested_metric_group:
-                        group_info['suggestedMetricGroup'] = suggested_metric_group
-
-                    # Store the regex match result to extract subgroups if needed
+            pattern = compile_group_regex(matching_regex)
+        except re.error as e:
+            print(f"Error with regex pattern '{matching_regex}' in signal group '{group_id}': {e}")
+            continue
+
+        # Create a group reference with basic info
+        group_info = {
+            'id': group_id,
+            'name': group.get('name', group_id),
+            'path': group.get('path', '')
+        }
+
+        # Add suggestedMetricGroup if it exists
+        suggested_metric_group = group.get('suggestedMetricGroup', '')
+        if suggested_metric_group:
+            group_info['suggestedMetricGroup'] = suggested_metric_group
+
+        groups.append((pattern, group_info))
+
+    prefilter = compile_group_prefilter(tuple(pattern.pattern for pattern, _ in groups))
+
+    # The same signal id appears once per pid of its command, so match each id only once.
+    # Each id's normalized group list is shared by its parameters and never mutated
+    groups_by_param_id = {}
+    for param in parameters:
+        param_id = param.id
+        signal_groups = groups_by_param_id.get(param_id)
+        if signal_groups is None:
+            signal_groups = []
+            if prefilter is None or prefilter.search(param_id):
+                for pattern, group_info in groups:
                     match = pattern.search(param_id)
-                    if match and match.groups():
+                    if not match:
+                        continue
+                    if match.groups():
                         # Extract capture groups from the regex match
-                        group_info['matchDetails'] = {}
-                        for i, group_value in enumerate(match.groups(), 1):
-                            group_info['matchDetails'][f'group{i}'] = group_value
+                        group_info = dict(group_info, matchDetails={
+                            f'group{i}': group_value for i, group_value in enumerate(match.groups(), 1)
+                        })
+                    signal_groups.append(group_info)
+            signal_groups = groups_by_param_id[param_id] = deep_sort_dict(signal_groups)
 
-                    # Add this group to the parameter's signalGroups list
-                    param['signalGroups'].append(group_info)
-        except re.error as e:
-            print(f"Error with regex pattern '{matching_regex}' in signal group '{group_id}': {e}")
+        param.signalGroups = signal_groups
 
     return parameters
 
-def parse_signalset(file_path, make, model, years=None):
-    """Parse a signalset JSON file and extract parameter information."""
-    with open(file_path) as f:
-        data = json.load(f)
+def parse_signalset(content, make, model, years=None, metrics=None):
+    """Parse the content of a signalset JSON file and extract parameter information.
 
-    parameters = []
-    for cmd in data.get('commands', []):
-        hdr = cmd.get('hdr', '')
+    Returns a list of Parameter records (see parameter_record.py). When metrics
+    is given, the signalset's counts and signal group matching time are added to
+    it (see pipeline_metrics.py).
+    """
+    data = loads(content)
 
-        # Extract extended address (eax) from command
-        eax = cmd.get('eax', '')
+    # Model years are the same for every parameter of the signalset
+    model_years = sorted(years) if years else None
 
-        # Extract debug flag from command
-        debug_flag = cmd.get('dbg', False)
+    parameters = []
+    for cmd in data.get('commands', []):
+        # Values are normalized once per command and signal (see deep_sort_dict()) and
+        # shared by the parameters of every pid; scalars are returned unchanged
+        hdr, eax, debug_flag, pids = map(deep_sort_dict, (
+            cmd.get('hdr', ''),
+            # Extract extended address (eax) from command
+            cmd.get('eax', ''),
+            # Extract debug flag from command
+            cmd.get('dbg', False),
+            cmd.get('cmd', {})
+        ))
+
+        signals = []
+        for signal in cmd.get('signals', []):
+            fmt = signal.get('fmt', {})
+            scaling = ''
+
+            # Generate scaling equation
+            if 'map' in fmt:
+                scaling = f"Mapped values: {fmt['map']}"
+            else:
+                components = []
+                if 'mul' in fmt:
+                    components.append(f"*{fmt['mul']}")
+                if 'div' in fmt:
+                    components.append(f"/{fmt['div']}")
+                if 'add' in fmt:
+                    components.append(f"+{fmt['add']}")
+
+                scaling = f"raw{' '.join(components)}"
+
+                # Add clamping if min/max are specified
+                if 'min' in fmt or 'max' in fmt:
+                    clamping = []
+                    if 'min' in fmt:
+                        clamping.append(str(fmt['min']))
+                    if 'max' in fmt:
+                        clamping.append(str(fmt['max']))
+                    scaling += f" clamped to [{', '.join(clamping)}]"
+
+            signals.append(tuple(map(deep_sort_dict, (
+                signal.get('id', ''),
+                signal.get('name', ''),
+                fmt.get('unit', ''),
+                signal.get('suggestedMetric', ''),
+                scaling,
+                signal.get('path', ''),
+                fmt.get('bix', 0),  # bit index/offset
+                fmt.get('len', 8),  # bit length, default to 8 if not specified
+                fmt  # Include the complete fmt object for reference
+            ))))
 
         for pid, value in cmd.get('cmd', {}).items():
-            for signal in cmd.get('signals', []):
-                fmt = signal.get('fmt', {})
-                scaling = ''
-
-                # Generate scaling equation
-                if 'map' in fmt:
-                    scaling = f"Mapped values: {fmt['map']}"
-                else:
-                    components = []
-                    if 'mul' in fmt:
-                        components.append(f"*{fmt['mul']}")
-                    if 'div' in fmt:
-                        components.append(f"/{fmt['div']}")
-                    if 'add' in fmt:
-                        components.append(f"+{fmt['add']}")
-
-                    scaling = f"raw{' '.join(components)}"
-
-                    # Add clamping if min/max are specified
-                    if 'min' in fmt or 'max' in fmt:
-                        clamping = []
-                        if 'min' in fmt:
-                            clamping.append(str(fmt['min']))
-                        if 'max' in fmt:
-                            clamping.append(str(fmt['max']))
-                        scaling += f" clamped to [{', '.join(clamping)}]"
-
-                # Extract bit information
-                bit_offset = fmt.get('bix', 0)  # bit index/offset
-                bit_length = fmt.get('len', 8)  # bit length, default to 8 if not specified
-
-                parameter = {
-                    'hdr': hdr,
-                    'eax': eax,
-                    'pid': pid,
-                    'cmd': cmd.get('cmd', {}),
-                    'id': signal.get('id', ''),
-                    'name': signal.get('name', ''),
-                    'unit': fmt.get('unit', ''),
-                    'suggestedMetric': signal.get('suggestedMetric', ''),
-                    'scaling': scaling,
-                    'path': signal.get('path', ''),
-                    'make': make,
-                    'model': model,
-                    'bitOffset': bit_offset,
-                    'bitLength': bit_length,
-                    'debug': debug_flag,
-                    'fmt': fmt  # Include the complete fmt object for reference
-                }
-
-                # Add model year information if available
-                if years:
-                    parameter['modelYears'] = years
-
-                parameters.append(parameter)
+            for signal_id, name, unit, suggested_metric, scaling, path, bit_offset, bit_length, fmt in signals:
+                parameters.append(Parameter(hdr, eax, pid, pids, signal_id, name, unit, suggested_metric, scaling,
+                                            path, make, model, bit_offset, bit_length, debug_flag, fmt,
+                                            model_years))
 
     # Process signal groups and assign to parameters
+    start = time.perf_counter()
     parameters = process_signal_groups(data, parameters, make, model)
+    if metrics is not None:
+        record_signalset(metrics, data, parameters, time.perf_counter() - start)
 
     return parameters
 
@@ -324,15 +342,14 @@ def extract_year_range_from_filename(filename):
 
     return None
 
-def load_model_year_data(repo_dir, make, model):
+def load_model_year_data(source, make, model):
     """Load model year PID support data if it exists."""
-    model_years_path = repo_dir / 'service01' / 'modelyears.json'
-    if not model_years_path.exists():
+    content = source.read(MODEL_YEARS_PATH)
+    if content is None:
         return None
 
     try:
-        with open(model_years_path) as f:
-            data = json.load(f)
+        data = loads(content)
 
         # Add make and model information to the data
         return {
@@ -344,18 +361,19 @@ def load_model_year_data(repo_dir, make, model):
         print(f"Error loading model year data for {make}-{model}: {e}")
         return None
 
-def load_generations_data(repo_dir, repo_name):
+def load_generations_data(source, repo_name):
     """Load generation data from generations.yml or generations.yaml if it exists."""
     # Check for both .yml and .yaml extensions
-    generations_path = repo_dir / 'generations.yml'
-    if not generations_path.exists():
-        generations_path = repo_dir / 'generations.yaml'
-        if not generations_path.exists():
-            return None
+    content = None
+    for generations_path in GENERATIONS_PATHS:
+        content = source.read(generations_path)
+        if content is not None:
+            break
+    if content is None:
+        return None
 
     try:
-        with open(generations_path) as f:
-            data = yaml.safe_load(f)
+        data = load_yaml(content)
 
         # Validate structure
         if not data or 'generations' not in data:
@@ -380,144 +398,471 @@ def load_generations_data(repo_dir, repo_name):
         print(f"Error loading generations data for {repo_name}: {e}")
         return None
 
-def calculate_hash(data):
-    """Calculate a hash from the sorted and normalized data for easy comparison."""
-    # Sort the data deterministically
-    data_copy = sorted(data, key=lambda x: (x['make'], x['model'], x['hdr'], x['id']))
-    # Convert to a string and hash
-    data_str = json.dumps(data_copy, sort_keys=True)
-    return hashlib.sha256(data_str.encode()).hexdigest()
-
-def extract_data(workspace_dir, output_dir, force=False):
-    """Extract matrix data from all repositories."""
-    matrix_data = []
-    model_year_data = []
-    generations_data = {}
-    temp_output_path = Path(output_dir) / 'matrix_data_temp.json'
-    final_output_path = Path(output_dir) / 'matrix_data.json'
-    model_years_output_path = Path(output_dir) / 'model_years_data.json'
-    generations_output_path = Path(output_dir) / 'generations_data.json'
+def find_vehicle_repos(workspace_dir, ingest='worktree'):
+    """List the vehicle repositories in the workspace that are in the ingest mode's form.
 
-    # Process each repository
+    These are checked-out directories for 'worktree', bare <repo>.git directories
+    for 'git' and <repo>.tar.gz archives for 'archive' (see repo_sources.py).
+    """
+    repo_dirs = []
     for repo_dir in Path(workspace_dir).iterdir():
-        if not repo_dir.is_dir():
+        if workspace_entry_mode(repo_dir) != ingest:
             continue
 
         # Skip if the repo is in the VEHICLE_MAKES list
-        if repo_dir.name.lower() in VEHICLE_MAKES:
-            print(f"Skipping standalone make repo: {repo_dir.name}")
+        if repo_name(repo_dir).lower() in VEHICLE_MAKES:
+            print(f"Skipping standalone make repo: {repo_name(repo_dir)}")
             continue
 
-        signalsets_dir = repo_dir / 'signalsets' / 'v3'
-        if not signalsets_dir.exists():
-            print(f"No signalset directory found for {repo_dir.name}, skipping...")
-            continue
+        repo_dirs.append(repo_dir)
+    return repo_dirs
+
+def process_repo(repo_dir, head=None, cache_dir=None):
+    """Extract parameters, model year and generations data from a single repository.
+
+    This runs in a worker process when extraction is parallelized, so it only
+    takes and returns picklable values and does not touch shared state.
+
+    When the repository's HEAD is known (because it was just reset to it by the
+    fetch step, or because a git or archive source records it) and it was
+    already extracted at that commit, the result is rebuilt from the cache
+    without reading or hashing any of its files.
+
+    The result's 'metrics' hold the repository's wall and CPU time and the
+    counts collected while parsing it.
+    """
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    with open_repo_source(repo_dir) as source:
+        result = process_source(source, head, cache_dir)
+    if result:
+        result['metrics'].update(wall=round(time.perf_counter() - start_wall, 6),
+                                 cpu=round(time.process_time() - start_cpu, 6),
+                                 signal_groups_seconds=round(result['metrics']['signal_groups_seconds'], 6))
+    return result
+
+def process_source(source, head=None, cache_dir=None):
+    """process_repo() for an open repository source."""
+    cache = ExtractionCache(cache_dir, CACHE_VERSION) if cache_dir else None
+    repo_key = None
+    head = head or source.head()
+    if cache and head:
+        repo_key = cache.make_key('repo', [(source.name, head)])
+        result = load_unchanged_repo(cache, repo_key)
+        if result is not None:
+            print(f"Unchanged since last extraction: {source.name}")
+            return result
+
+    result = parse_repo(source, cache)
+    if result and repo_key:
+        # Keep the repo entry small by pointing at the per-signalset entries
+        summary = {k: v for k, v in result.items() if k not in ('parameters', 'metrics')}
+        cache.put(repo_key, summary)
+        result['cache_keys'].append(repo_key)
+    return result
+
+def load_unchanged_repo(cache, repo_key):
+    """Rebuild a process_repo() result from a repo-level cache entry, or return None."""
+    found, summary = cache.get(repo_key)
+    if not found or summary is None:
+        return None
 
-        # Extract make and model from repo name
-        make, model = repo_dir.name.split('-', 1) if '-' in repo_dir.name else (repo_dir.name, '')
+    parameters = []
+    metrics = new_repo_metrics()
+    for key in summary['signalset_keys']:
+        found, value = cache.get(key)
+        if not found:
+            return None
+        parameters.extend(map(Parameter.from_row, value['rows']))
+        add_signalset_counts(metrics, value['counts'])
 
-        print(f"Processing {make} {model}...")
+    metrics.update(parameters=len(parameters), cached=True)
+    return dict(summary, parameters=parameters, cache_hits=len(summary['signalset_keys']),
+                cache_misses=0, cache_keys=summary['cache_keys'] + [repo_key], metrics=metrics)
 
-        # Find all signalset files in the v3 directory
-        signalset_files = list(signalsets_dir.glob('*.json'))
+def parse_repo(source, cache=None):
+    """Parse the signalsets, model year and generations files of a repository source."""
+    if not source.has_signalsets():
+        print(f"No signalset directory found for {source.name}, skipping...")
+        return None
 
-        if not signalset_files:
-            print(f"No signalset files found for {make} {model}, skipping...")
-            continue
+    # Extract make and model from repo name
+    make, model = source.name.split('-', 1) if '-' in source.name else (source.name, '')
 
-        # Process each signalset file
-        for signalset_path in signalset_files:
-            # Extract year range from filename if available
-            years = None
-            if signalset_path.name != 'default.json':
-                years = extract_year_range_from_filename(signalset_path.name)
-                if years:
-                    print(f"  Processing signalset for years {years[0]}-{years[1]}")
-                else:
-                    print(f"  Processing signalset: {signalset_path.name}")
-            else:
-                print(f"  Processing default signalset")
+    print(f"Processing {make} {model}...")
 
-            # Parse the signalset file
-            parameters = parse_signalset(signalset_path, make, model, years)
-            matrix_data.extend(parameters)
+    # Find all signalset files in the v3 directory
+    signalset_files = source.list_signalsets()
+
+    if not signalset_files:
+        print(f"No signalset files found for {make} {model}, skipping...")
+        return None
+
+    def cache_key(kind, paths):
+        # Keyed by each existing file's path and content digest
+        return cache.make_key(kind, [
+            (f"{source.name}/{path}", source.digest(path)) for path in paths
+        ])
+
+    def load(kind, paths, compute):
+        if cache is None:
+            return compute()
+        return cache.load_key(cache_key(kind, paths), compute)
+
+    metrics = new_repo_metrics()
+
+    def parse_file(path, years):
+        return parse_signalset(source.read(path), make, model, years, metrics)
+
+    def parse_rows(path, years):
+        # Cache entries hold each parameter as a list of field values, and the
+        # signalset's counts so a hit adds the same metrics as parsing it
+        signalset_metrics = new_repo_metrics()
+        parameters = parse_signalset(source.read(path), make, model, years, signalset_metrics)
+        metrics['signal_groups_seconds'] += signalset_metrics['signal_groups_seconds']
+        return {'rows': [parameter.to_row() for parameter in parameters],
+                'counts': signalset_counts(signalset_metrics)}
+
+    # Process each signalset file
+    parameters = []
+    signalset_keys = []
+    for signalset_name in signalset_files:
+        # Extract year range from filename if available
+        years = None
+        if signalset_name != 'default.json':
+            years = extract_year_range_from_filename(signalset_name)
+            if years:
+                print(f"  Processing signalset for years {years[0]}-{years[1]}")
+            else:
+                print(f"  Processing signalset: {signalset_name}")
+        else:
+            print(f"  Processing default signalset")
 
-        # Check for model year PID support data
-        my_data = load_model_year_data(repo_dir, make, model)
-        if my_data:
-            model_year_data.append(my_data)
-            print(f"  Found model year PID data for {make} {model}")
+        # Parse the signalset file
+        signalset_path = f"{SIGNALSET_DIR}/{signalset_name}"
+        if cache is None:
+            parameters.extend(parse_file(signalset_path, years))
+        else:
+            key = cache_key('signalset', [signalset_path])
+            signalset_keys.append(key)
+            entry = cache.load_key(key, partial(parse_rows, signalset_path, years))
+            parameters.extend(map(Parameter.from_row, entry['rows']))
+            add_signalset_counts(metrics, entry['counts'])
+
+    model_years = load(
+        'modelyears', [MODEL_YEARS_PATH],
+        partial(load_model_year_data, source, make, model)
+    )
+    generations = load(
+        'generations', GENERATIONS_PATHS,
+        partial(load_generations_data, source, source.name)
+    )
+
+    return {
+        'repo': source.name,
+        'make': make,
+        'model': model,
+        'parameters': parameters,
+        'model_years': model_years,
+        'generations': generations,
+        'signalset_keys': signalset_keys,
+        'cache_hits': cache.hits if cache else 0,
+        'cache_misses': cache.misses if cache else 0,
+        'cache_keys': sorted(cache.used_keys) if cache else [],
+        'metrics': dict(metrics, parameters=len(parameters), cached=False)
+    }
+
+def iter_repo_results(repo_dirs, jobs=1, cache_dir=None, repo_heads=None):
+    """Yield process_repo() results in repo order, using a process pool when jobs > 1."""
+    worker = partial(process_repo, cache_dir=cache_dir)
+    heads = [(repo_heads or {}).get(repo_name(repo_dir)) for repo_dir in repo_dirs]
+    if jobs <= 1 or len(repo_dirs) <= 1:
+        for repo_dir, head in zip(repo_dirs, heads):
+            yield worker(repo_dir, head=head)
+        return
 
-        # Check for generations data
-        gen_data = load_generations_data(repo_dir, repo_dir.name)
-        if gen_data:
-            generations_data[gen_data['repo']] = gen_data['generations']
-            print(f"  Found generations data for {repo_dir.name}")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Results are handed back in submission order, which keeps the merged output
+        # identical to the serial path no matter which worker finishes first. Only a
+        # small window of repos is in flight so parsed results don't pile up in memory.
+        pending = deque()
+        for repo_dir, head in zip(repo_dirs, heads):
+            pending.append(executor.submit(worker, repo_dir, head))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+@lru_cache(maxsize=None)
+def extractor_version():
+    """
+    Hash of the extractor's own modules as loaded by this run.
+
+    Any change to the parsing code or to an output format changes it, so the
+    outputs are rebuilt even when no repository moved.
+    """
+    script_dir = Path(__file__).resolve().parent
+    paths = sorted({
+        Path(module.__file__).resolve() for module in list(sys.modules.values())
+        if getattr(module, '__file__', None) and Path(module.__file__).resolve().parent == script_dir
+    })
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode('utf-8') + b'\0' + path.read_bytes())
+    return digest.hexdigest()[:16]
+
+def expected_outputs(output_dir, options):
+    """The output files that an extraction with the given extract_data() options always writes."""
+    outputs = {
+        'matrix_data.json': True,
+        'matrix_data_compact.json': options['compact'],
+        'vehicles/manifest.json': options['shards'],
+        'matrix_index.json': options['index'],
+        'matrix_data.columns': options['columnar'],
+        'signal_fingerprints.json': options['fingerprints'],
+        QUERY_INDEX_FILENAME: options['query_index'],
+        ARTIFACT_MANIFEST: options['artifacts'],
+    }
+    return [Path(output_dir) / name for name, written in outputs.items() if written]
+
+def extraction_state(output_dir, options, repo_heads=None):
+    """What a set of outputs was extracted from: the extractor, where and with which options, and the HEADs."""
+    return {
+        'version': extractor_version(),
+        'output': str(Path(output_dir).resolve()),
+        'options': options,
+        'heads': repo_heads or {}
+    }
+
+def load_extraction_state(cache_dir):
+    """Load the state recorded by the last successful extraction, or None."""
+    try:
+        with open(Path(cache_dir) / 'repo_heads.json') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Older state files were only the HEADs, which can't tell whether the outputs are current
+    return state if isinstance(state, dict) and 'heads' in state else None
+
+def save_extraction_state(cache_dir, state):
+    """Record the state that the current outputs were extracted from."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(cache_dir) / 'repo_heads.json', 'w') as f:
+        json.dump(state, f, sort_keys=True, indent=2)
+
+def extract_data(workspace_dir, output_dir, force=False, jobs=1, cache_dir=None, repo_heads=None,
+                 compact=True, shards=True, index=True, columnar=False, fingerprints=False, query_index=False,
+                 artifacts=True, gzip_level=DEFAULT_GZIP_LEVEL, brotli_quality=DEFAULT_BROTLI_QUALITY,
+                 change_manifest_path=None, ingest='worktree', metrics=None):
+    """Extract matrix data from all repositories.
+
+    The keyword options mirror main()'s flags: how the workspace is read, the
+    extraction cache and which derived outputs are written (see --help and the
+    README). repo_heads maps repositories to the commit the fetch step reset
+    them to, so those already extracted at that commit are skipped, and
+    change_manifest_path is where the per-vehicle digests are kept between runs.
+
+    Returns a dict with the number of parameters written ('count'), whether any
+    data changed ('changed'), the names of the changed output files ('files')
+    and the per-vehicle comparison ('vehicles', None when there was no previous
+    manifest).
+
+    When metrics, a PipelineMetrics (see pipeline_metrics.py), is given, each
+    stage is timed and every repository's metrics are recorded with it. The
+    'extraction' stage covers parsing the repositories as well as validating,
+    sorting and writing matrix_data.json, since parameters are streamed from one
+    to the other.
+    """
+    metrics = metrics or PipelineMetrics()
+    model_year_data = []
+    generations_data = {}
+    final_output_path = Path(output_dir) / 'matrix_data.json'
+    model_years_output_path = Path(output_dir) / 'model_years_data.json'
+    generations_output_path = Path(output_dir) / 'generations_data.json'
+    compact_output_path = Path(output_dir) / 'matrix_data_compact.json'
+    index_output_path = Path(output_dir) / 'matrix_index.json'
+    columnar_output_path = Path(output_dir) / 'matrix_data.columns'
+    fingerprints_output_path = Path(output_dir) / 'signal_fingerprints.json'
+    query_index_output_path = Path(output_dir) / QUERY_INDEX_FILENAME
+
+    with metrics.stage('discovery'):
+        repo_dirs = find_vehicle_repos(workspace_dir, ingest)
+    if jobs > 1:
+        print(f"Extracting {len(repo_dirs)} repositories with {jobs} worker processes")
+
+    cache_stats = {'hits': 0, 'misses': 0, 'keys': set()}
+
+    def iter_parameters():
+        """Stream parameters repo by repo, collecting the per-repo side outputs on the way."""
+        for result in iter_repo_results(repo_dirs, jobs, cache_dir, repo_heads):
+            if result is None:
+                continue
+
+            cache_stats['hits'] += result['cache_hits']
+            cache_stats['misses'] += result['cache_misses']
+            cache_stats['keys'].update(result['cache_keys'])
+            metrics.add_repo(result['repo'], dict(result['metrics'], cache_hits=result['cache_hits']))
+
+            # Check for model year PID support data
+            if result['model_years']:
+                model_year_data.append(result['model_years'])
+                print(f"  Found model year PID data for {result['make']} {result['model']}")
+
+            # Check for generations data
+            gen_data = result['generations']
+            if gen_data:
+                generations_data[gen_data['repo']] = gen_data['generations']
+                print(f"  Found generations data for {result['repo']}")
+
+            # Records are converted to the JSON shape only as they are written
+            for parameter in result['parameters']:
+                yield parameter.to_dict()
 
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
 
-    # Check if we need to update the file
-    current_hash = calculate_hash(matrix_data)
+    # Hash the previous outputs before they are replaced so the comparison is meaningful
+    tracked_outputs = [final_output_path, model_years_output_path, generations_output_path]
+    old_hashes = {path.name: file_sha256(path) for path in tracked_outputs if path.exists()}
 
-    # Write to temporary file first (minified for serving)
-    with open(temp_output_path, 'w') as f:
-        json.dump(matrix_data, f, sort_keys=True, separators=(',', ':'))
+    # Validate, sort and write the parameters as they are parsed
+    schema_path = Path(__file__).parent / 'matrix_data_schema.json'
+    if not schema_path.exists():
+        print(f"Warning: schema not found at {schema_path}, skipping validation")
+        schema_path = None
 
-    # Run the validation and normalization process
+    # Invalid records are still written, as before, so one bad signalset doesn't
+    # hold back every other vehicle's data
     print("Running validation and normalization...")
-    validate_script = Path(__file__).parent / 'validate_json.py'
-
-    if not validate_script.exists():
-        print(f"Warning: validate_json.py not found at {validate_script}, skipping validation")
-        shutil.move(temp_output_path, final_output_path)
-    else:
-        try:
-            # Use the validation script for consistent outputs
-            subprocess.run([
-                sys.executable,
-                str(validate_script),
-                '--input', str(temp_output_path),
-                '--output', str(final_output_path)
-            ], check=True)
-
-            # Clean up temp file
-            os.remove(temp_output_path)
-        except subprocess.CalledProcessError as e:
-            print(f"Error validating JSON: {e}")
-            # Fall back to raw output if validation fails
-            shutil.move(temp_output_path, final_output_path)
+    compact_matrix = CompactMatrixBuilder() if compact else None
+    vehicle_shards = VehicleShardWriter(Path(output_dir) / 'vehicles') if shards else None
+    matrix_index = MatrixIndexBuilder() if index else None
+    columnar_matrix = ColumnarMatrixBuilder() if columnar else None
+    signal_fingerprints = SignalFingerprintIndex() if fingerprints else None
+    query_index_builder = QueryIndexBuilder() if query_index else None
+    change_detector = ChangeDetector() if change_manifest_path else None
+    sinks = [sink for sink in (compact_matrix, vehicle_shards, matrix_index, columnar_matrix, signal_fingerprints,
+                               query_index_builder, change_detector) if sink]
+    with metrics.stage('extraction'):
+        # Parameter.to_dict() records are already normalized, so they are encoded as they are
+        stats = validate_and_normalize_json(iter_parameters(), final_output_path, schema_path, strict=False,
+                                            sinks=sinks, encode=canonical_encoding)
+
+    publisher = ArtifactPublisher(output_dir, gzip_level, brotli_quality, force=force) if artifacts else None
+    if publisher and stats['written']:
+        publisher.submit(final_output_path)
+
+    if cache_dir:
+        with metrics.stage('cache_prune'):
+            pruned = ExtractionCache(cache_dir).prune(cache_stats['keys'])
+        print(f"Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{pruned} stale entries pruned")
 
     # Save model year data (minified for serving)
     if model_year_data:
-        with open(model_years_output_path, 'w') as f:
-            json.dump(model_year_data, f, sort_keys=True, separators=(',', ':'))
+        with metrics.stage('model_years'), open(model_years_output_path, 'w') as f:
+            dump(model_year_data, f, sort_keys=True)
         print(f"Saved model year data to {model_years_output_path} ({len(model_year_data)} vehicles)")
+        if publisher:
+            publisher.submit(model_years_output_path)
     else:
         print("No model year data found.")
 
     # Save generations data (minified for serving)
     if generations_data:
-        with open(generations_output_path, 'w') as f:
-            json.dump(generations_data, f, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        with metrics.stage('generations'), open(generations_output_path, 'w') as f:
+            dump(generations_data, f, sort_keys=True, ensure_ascii=False)
         print(f"Saved generations data to {generations_output_path} ({len(generations_data)} vehicles)")
+        if publisher:
+            publisher.submit(generations_output_path)
     else:
         print("No generations data found.")
 
-    print(f"Saved matrix data to {final_output_path} ({len(matrix_data)} parameters total)")
+    print(f"Saved matrix data to {final_output_path} ({stats['count']} parameters total)")
+
+    if compact_matrix:
+        with metrics.stage('compact'):
+            compact_matrix.write(compact_output_path)
+        print(f"Saved compact matrix data to {compact_output_path} "
+              f"({compact_output_path.stat().st_size} bytes vs {final_output_path.stat().st_size})")
+        if publisher:
+            publisher.submit(compact_output_path)
+
+    if vehicle_shards:
+        with metrics.stage('shards'):
+            vehicle_shards.write()
+
+    if matrix_index:
+        with metrics.stage('index'):
+            matrix_index.write(index_output_path)
+        print(f"Saved matrix indexes to {index_output_path}")
+        if publisher:
+            publisher.submit(index_output_path)
+
+    if columnar_matrix:
+        with metrics.stage('columnar'):
+            columnar_matrix.write(columnar_output_path)
+        print(f"Saved columnar matrix data to {columnar_output_path}")
+
+    if signal_fingerprints:
+        with metrics.stage('fingerprints'):
+            clusters = signal_fingerprints.write(fingerprints_output_path)
+        print(f"Saved {len(signal_fingerprints.signals)} distinct signal definitions and {len(clusters)} "
+              f"clusters of similar vehicles to {fingerprints_output_path}")
+        print_clusters(clusters[:5])
+        if publisher:
+            publisher.submit(fingerprints_output_path)
+
+    if query_index_builder:
+        with metrics.stage('query_index'):
+            query_index_builder.write(query_index_output_path, stats['sha256'])
+        print(f"Saved query indexes to {query_index_output_path}")
+
+    if publisher:
+        # Only the compression still running after the other outputs were written
+        with metrics.stage('artifacts'):
+            publisher.finish()
+
+    # Compare with the previous outputs
+    new_hashes = {final_output_path.name: stats['sha256']}
+    new_hashes.update((path.name, file_sha256(path)) for path in tracked_outputs[1:] if path.exists())
+    changed_files = sorted(name for name in new_hashes if new_hashes[name] != old_hashes.get(name))
+
+    vehicle_changes = None
+    if change_detector:
+        with metrics.stage('change_detection'):
+            manifest = change_detector.manifest()
+            previous_manifest = load_change_manifest(change_manifest_path)
+            if previous_manifest is None:
+                print("No previous change manifest found, recording a baseline.")
+            else:
+                vehicle_changes = compare_manifests(previous_manifest, manifest)
+                print_change_report(vehicle_changes)
+            save_change_manifest(change_manifest_path, manifest)
+
+    changed = force or bool(changed_files) or bool(vehicle_changes and has_changes(vehicle_changes))
+    if changed_files:
+        print(f"Changes detected in the data: {', '.join(changed_files)}")
+    elif changed:
+        print("Changes detected in the data.")
+    else:
+        print("No changes detected in the data.")
 
-    # Compare with previous version if it exists
-    if final_output_path.exists() and not force:
-        with open(final_output_path) as f:
-            old_data = json.load(f)
-        old_hash = calculate_hash(old_data)
+    if cache_dir and repo_heads is not None:
+        options = {
+            'compact': compact, 'shards': shards, 'index': index, 'columnar': columnar,
+            'fingerprints': fingerprints, 'query_index': query_index, 'artifacts': artifacts,
+            'gzip_level': gzip_level, 'brotli_quality': brotli_quality
+        }
+        save_extraction_state(cache_dir, extraction_state(output_dir, options, repo_heads))
 
-        if old_hash == current_hash:
-            print("No changes detected in the data.")
-        else:
-            print("Changes detected in the matrix data.")
+    return {'count': stats['count'], 'changed': changed, 'files': changed_files, 'vehicles': vehicle_changes}
 
-    return matrix_data
+def write_change_report(report_path, result):
+    """Write the change summary returned by extract_data() as JSON."""
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(result, f, sort_keys=True, indent=2)
 
 def main():
     parser = argparse.ArgumentParser(description='Extract OBD parameter data for the OBDb Explorer')
@@ -526,21 +871,148 @@ def main():
     parser.add_argument('--output', default='public/data', help='Output directory for JSON data')
     parser.add_argument('--fetch', action='store_true', help='Fetch/update repositories before extraction')
     parser.add_argument('--force', action='store_true', help='Force update even if no changes detected')
+    parser.add_argument('--ingest', choices=INGEST_MODES, default='worktree',
+                        help='How repositories are stored in the workspace and read: checked-out working trees, '
+                             'bare git repositories read from their objects, or snapshot archives (default: worktree)')
+    parser.add_argument('--fetch-concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Number of repositories fetched at once (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--fetch-retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'Retries per repository, with exponential backoff (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--fetch-timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help=f'Timeout in seconds for each git command (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--repo-url-template', default=DEFAULT_URL_TEMPLATE,
+                        help='Repository URL with {org} and {repo} placeholders, e.g. a path to local bare repos')
+    parser.add_argument('--archive-url-template', default=DEFAULT_ARCHIVE_URL_TEMPLATE,
+                        help='Archive URL with {org}, {repo} and {commit} placeholders, used with --ingest archive')
+    parser.add_argument('--repo-list', help='File with one repository name per line, instead of listing them with the GitHub API')
+    parser.add_argument('--allow-fetch-failures', action='store_true',
+                        help='Extract even if some repositories could not be fetched')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes for extraction (0 = one per CPU core)')
+    parser.add_argument('--cache-dir',
+                        help='Extraction cache directory; results for unchanged files are reused and entries for '
+                             'deleted files pruned (default: WORKSPACE/.extract_cache)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-parse every file instead of using the extraction cache')
+    parser.add_argument('--no-compact', action='store_true',
+                        help='Skip writing matrix_data_compact.json, the interned table form of the matrix')
+    parser.add_argument('--no-shards', action='store_true',
+                        help='Skip writing per-vehicle shards and their manifest to OUTPUT/vehicles')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Skip writing the inverted indexes of matrix_index.json')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Also write the binary columnar form to OUTPUT/matrix_data.columns')
+    parser.add_argument('--fingerprints', action='store_true',
+                        help='Also write the signal definitions shared between vehicles and the clusters of '
+                             'similar vehicles to OUTPUT/signal_fingerprints.json')
+    parser.add_argument('--query-index', action='store_true',
+                        help=f'Also write the indexes for matrix_query.py to OUTPUT/{QUERY_INDEX_FILENAME}')
+    parser.add_argument('--no-artifacts', action='store_true',
+                        help='Skip writing precompressed, content-addressed artifacts to OUTPUT/dist and '
+                             'their index, artifacts.json')
+    parser.add_argument('--gzip-level', type=int, default=DEFAULT_GZIP_LEVEL, choices=range(1, 10),
+                        metavar='LEVEL', help=f'Gzip compression level for artifacts (default: {DEFAULT_GZIP_LEVEL})')
+    parser.add_argument('--brotli-quality', type=int, default=DEFAULT_BROTLI_QUALITY, choices=range(0, 12),
+                        metavar='QUALITY',
+                        help=f'Brotli quality for artifacts (default: {DEFAULT_BROTLI_QUALITY})')
+    parser.add_argument('--exit-code', action='store_true',
+                        help=f'Exit with status {EXIT_CHANGES} if the data changed and {EXIT_NO_CHANGES} if it did not')
+    parser.add_argument('--change-report', help='Write a JSON report of the changed files, vehicles and signals')
+    parser.add_argument('--metrics', help='Write stage and per-repository metrics to this file as JSON lines')
+    parser.add_argument('--metrics-summary', help='Write a JSON summary of the run metrics to this file')
+    parser.add_argument('--profile', help='Profile the main process with cProfile and save the stats to this file')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='Trace memory allocations of the main process and list the largest in the summary')
     args = parser.parse_args()
 
-    # Only clone/update repositories if --fetch is specified
-    if args.fetch:
-        print("Fetching repositories...")
-        clone_repos(args.org, args.workspace)
-    elif not Path(args.workspace).exists():
-        print(f"Error: Workspace directory '{args.workspace}' does not exist. Use --fetch to clone repositories.")
-        return
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+    state_dir = args.cache_dir or str(Path(args.workspace) / '.extract_cache')
+    cache_dir = None if args.no_cache else state_dir
+
+    metrics = PipelineMetrics(args.metrics)
+    if args.profile:
+        metrics.enable_profiler(args.profile)
+    if args.tracemalloc:
+        metrics.enable_tracemalloc()
 
-    # Extract data from the repositories
-    print("Extracting data from repositories...")
-    extract_data(args.workspace, args.output, args.force)
+    # Options of extract_data() that decide which output files are written and what they contain
+    options = {
+        'compact': not args.no_compact, 'shards': not args.no_shards, 'index': not args.no_index,
+        'columnar': args.columnar, 'fingerprints': args.fingerprints, 'query_index': args.query_index,
+        'artifacts': not args.no_artifacts, 'gzip_level': args.gzip_level, 'brotli_quality': args.brotli_quality
+    }
 
-    print(f"Data extraction complete. The JSON file is ready for use in the React application.")
+    # The summary is written on every exit, including failed fetches and skipped extractions
+    try:
+        # Only clone/update repositories if --fetch is specified
+        repo_heads = None
+        if args.fetch:
+            print("Fetching repositories...")
+            fetcher = RepoFetcher(args.workspace, url_template=args.repo_url_template, mode=args.ingest,
+                                  archive_url_template=args.archive_url_template,
+                                  concurrency=max(1, args.fetch_concurrency), retries=args.fetch_retries,
+                                  timeout=args.fetch_timeout)
+            repos = None
+            if args.repo_list:
+                with open(args.repo_list) as f:
+                    repos = [line.strip() for line in f if line.strip()]
+            with metrics.stage('fetch'):
+                repo_heads, changed_repos, failed_repos = clone_repos(args.org, args.workspace, fetcher, repos)
+            if repo_heads is not None:
+                metrics.count('fetched_repos', len(repo_heads))
+                metrics.count('fetch_changed_repos', len(changed_repos))
+                metrics.count('fetch_failed_repos', len(failed_repos))
+
+            # Extracting after failed fetches would ship stale or missing vehicles as if they were current
+            if repo_heads is None or (failed_repos and not args.allow_fetch_failures):
+                print("Error: fetching repositories failed, not extracting (use --allow-fetch-failures to extract anyway)")
+                sys.exit(1)
+
+            # Compare against the commits the current outputs were built from rather than
+            # just this fetch, so a previously failed extraction is still retried. The outputs
+            # are only current if the same extractor wrote all of them with the same options.
+            if repo_heads is not None and cache_dir and not args.force:
+                state = load_extraction_state(cache_dir) or {}
+                extracted_heads = state.get('heads', {})
+                changed_repos = {
+                    repo for repo in set(repo_heads) | set(extracted_heads)
+                    if repo_heads.get(repo) != extracted_heads.get(repo)
+                }
+                print(f"Repositories changed since last extraction: {len(changed_repos)}")
+                if not changed_repos:
+                    missing_outputs = [path for path in expected_outputs(args.output, options) if not path.exists()]
+                    if state != extraction_state(args.output, options, repo_heads):
+                        print("The extractor, its output options or the output directory changed since the last "
+                              "extraction, extracting anyway.")
+                    elif missing_outputs:
+                        print(f"Outputs missing ({', '.join(path.name for path in missing_outputs)}), "
+                              "extracting anyway.")
+                    else:
+                        print("No repository changes detected, skipping extraction.")
+                        if args.change_report:
+                            write_change_report(args.change_report,
+                                                {'count': None, 'changed': False, 'files': [], 'vehicles': None})
+                        sys.exit(EXIT_NO_CHANGES)
+        elif not Path(args.workspace).exists():
+            print(f"Error: Workspace directory '{args.workspace}' does not exist. Use --fetch to clone repositories.")
+            sys.exit(1)
+
+        # Extract data from the repositories
+        print("Extracting data from repositories...")
+        result = extract_data(args.workspace, args.output, args.force, jobs, cache_dir, repo_heads, **options,
+                              change_manifest_path=Path(state_dir) / 'change_manifest.json',
+                              ingest=args.ingest, metrics=metrics)
+
+        if args.change_report:
+            write_change_report(args.change_report, result)
+
+        print(f"Data extraction complete. The JSON file is ready for use in the React application.")
+
+        if args.exit_code:
+            sys.exit(EXIT_CHANGES if result['changed'] else EXIT_NO_CHANGES)
+    finally:
+        summary = metrics.finish(args.metrics_summary)
+        if args.metrics or args.metrics_summary or args.profile or args.tracemalloc:
+            print_summary(summary)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache for parsed repository files.
+
+Entries are keyed by the file's path within its repository plus a digest of
+its content (a SHA-256, or the blob id for files read from git objects), so an
+unchanged signalset is served straight from the cache while a touched one is
+re-parsed. Each entry is a small JSON file, which keeps the cache
+safe to share between the worker processes used by extract_data.py --jobs.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from serialization import dump, load
+
+
+class ExtractionCache:
+    """Content-addressed store of parse results under a cache directory."""
+
+    def __init__(self, cache_dir, version=''):
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.used_keys = set()
+
+    def make_key(self, kind, entries):
+        """Build a cache key from (name, content digest) pairs, skipping entries without a digest.
+
+        Names are paths within a repository and digests come from its repository
+        source (see repo_sources.py), so the key doesn't depend on where the
+        workspace is or how the repository was ingested.
+        """
+        digest = hashlib.sha256(f"{self.version}\0{kind}".encode())
+        for name, content_digest in entries:
+            if content_digest is None:
+                continue
+            digest.update(f"\0{name}\0{content_digest}".encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return (found, value) for a cache key."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                entry = load(f)
+        except (OSError, ValueError):
+            return False, None
+        return True, entry['value']
+
+    def put(self, key, value):
+        """Store a value, writing through a temp file so readers never see partial entries."""
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            dump({'value': value}, f)
+        os.replace(temp_path, entry_path)
+
+    def load_key(self, key, compute):
+        """Return the cached value for a precomputed key, calling compute() on a miss."""
+        self.used_keys.add(key)
+
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def prune(self, keep_keys):
+        """Delete entries that were not used by the latest extraction run."""
+        removed = 0
+        if not self.cache_dir.exists():
+            return removed
+        for entry_path in self.cache_dir.glob('*/*.json'):
+            if entry_path.stem not in keep_keys:
+                entry_path.unlink()
+                removed += 1
+        return removed
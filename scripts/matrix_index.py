@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Inverted indexes over matrix_data.json.
+
+MatrixIndexBuilder is an output sink for validate_json.write_normalized_stream().
+It maps the values of commonly filtered fields to the offsets of the records
+that have them, where an offset is the record's position in the
+matrix_data.json array:
+
+    {
+      "version": 1,
+      "count": 5249,
+      "fields": {
+        "id": {"FORD_SOC": [12, 873], ...},
+        "suggestedMetric": {...}, "hdr": {...}, "pid": {...}, "unit": {...},
+        "make": {...}, "vehicle": {"Ford-Transit-Connect": [...], ...}
+      },
+      "tokens": {"battery": [3, 4, 98], ...}
+    }
+
+"tokens" is a search index of the lowercased words in each parameter's id and
+name, where a word is a run of letters or digits in any script. Offset lists
+are in ascending order. Building the indexes here, at extraction time, saves
+the web app from filtering the whole matrix once per vehicle and metric on
+every page load.
+"""
+
+import re
+
+from serialization import dump, load
+
+INDEX_VERSION = 1
+
+# Record fields with an index of value -> offsets
+INDEXED_FIELDS = ('id', 'suggestedMetric', 'hdr', 'pid', 'unit', 'make')
+
+# Runs of letters and digits in any script; underscores separate words as in ids like FORD_SOC
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Split text into the lowercase words used by the search index."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class MatrixIndexBuilder:
+    """Build the inverted indexes from normalized records, in output order."""
+
+    def __init__(self):
+        self.count = 0
+        self.fields = {field: {} for field in INDEXED_FIELDS + ('vehicle',)}
+        self.tokens = {}
+
+    def add(self, record, line=None):
+        offset = self.count
+        self.count += 1
+
+        for field in INDEXED_FIELDS:
+            value = record.get(field)
+            if value:
+                self.fields[field].setdefault(value, []).append(offset)
+
+        vehicle = f"{record.get('make', '')}-{record.get('model', '')}"
+        self.fields['vehicle'].setdefault(vehicle, []).append(offset)
+
+        for token in set(tokenize(record.get('id')) + tokenize(record.get('name'))):
+            self.tokens.setdefault(token, []).append(offset)
+
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'count': self.count,
+            'fields': self.fields,
+            'tokens': self.tokens
+        }
+
+    def write(self, output_path):
+        with open(output_path, 'w') as f:
+            dump(self.to_dict(), f, sort_keys=True)
+
+
+def load_matrix_index(index_path):
+    """Load a matrix index written by MatrixIndexBuilder."""
+    with open(index_path) as f:
+        index = load(f)
+    if index.get('version') != INDEX_VERSION:
+        raise ValueError(f"Unsupported matrix index version: {index.get('version')}")
+    return index
+
+
+def lookup(index, field, value):
+    """Return the offsets of records whose field equals value."""
+    return index['fields'].get(field, {}).get(value, [])
+
+
+def search(index, text):
+    """Return the offsets of records whose id or name contains every word of text."""
+    offsets = None
+    for token in tokenize(text):
+        matches = set(index['tokens'].get(token, []))
+        offsets = matches if offsets is None else offsets & matches
+    return sorted(offsets or [])
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Indexed queries over matrix_data.json.
+
+QueryIndexBuilder is an output sink for validate_json.write_normalized_stream()
+that records where each parameter starts in matrix_data.json and which records
+have each value of the filterable fields, and writes it as matrix_query.json
+next to the data:
+
+    {
+      "version": 2,
+      "count": 5249,
+      "size": 2718340,
+      "sha256": "5d9c0e7a...",
+      "offsets": [1, 525, ...],
+      "fields": {
+        "make": {"Ford": [0, 1, ...]}, "model": {...}, "vehicle": {"Ford-Transit-Connect": [...]},
+        "hdr": {...}, "pid": {...}, "id": {...}, "unit": {...}, "suggestedMetric": {...},
+        "signalGroups": {"TPMS": [...]}
+      },
+      "years": {"2019-2022": [...], "": [...]}
+    }
+
+Record numbers are positions in the matrix_data.json array and offsets are
+byte offsets of the records in the file, and size and sha256 identify the
+file the index was built from; MatrixQuery refuses to use an index whose
+data file has changed since. signalGroups is indexed by group id,
+and years by the modelYears range of each record; "" lists the records without
+one, which apply to every model year. MatrixQuery loads the index once and
+turns the record lists it is asked about into bitmaps (Python ints, kept in
+an LRU cache), so a query is one AND per filter and a scan for the set bits,
+well under a millisecond once its values are cached. Only the matching
+records are read from the memory-mapped data file and parsed.
+
+    with MatrixQuery('public/data') as matrix:
+        rows = matrix.select(make='Toyota', hdr='7E0', unit='celsius', since=2019, until=2022)
+        records = matrix.records(rows)
+
+Usage:
+    python matrix_query.py --data public/data --build
+    python matrix_query.py --data public/data make=Toyota hdr=7E0 unit=celsius years=2019-2022
+    python matrix_query.py --data public/data suggestedMetric=stateOfCharge --fields make,model,id --limit 20
+"""
+
+import argparse
+import hashlib
+import mmap
+import re
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from data_shards import vehicle_id
+from serialization import dump, dumps, load, loads
+
+QUERY_INDEX_VERSION = 2
+
+DATA_FILENAME = 'matrix_data.json'
+QUERY_INDEX_FILENAME = 'matrix_query.json'
+
+# Record fields that are indexed as they are
+SCALAR_FIELDS = ('make', 'model', 'hdr', 'pid', 'id', 'unit', 'suggestedMetric')
+
+# Fields that can be filtered on; signalGroups by group id and vehicle as Make-Model
+QUERY_FIELDS = SCALAR_FIELDS + ('signalGroups', 'vehicle')
+
+# Key of the records without modelYears in the years index
+ALL_YEARS = ''
+
+# Stand-ins for open year ranges
+FIRST_YEAR = 0
+LAST_YEAR = 9999
+
+# Bitmaps of field values (and year ranges) that MatrixQuery keeps
+BITMAP_CACHE_SIZE = 1024
+
+# Runs of bytes of a bitmap with at least one record in them
+NONZERO_RUN = re.compile(rb'[^\x00]+')
+
+# The bits set in each byte value
+BIT_POSITIONS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class QueryIndexBuilder:
+    """Build the query index from normalized records and their encoded lines, in output order."""
+
+    def __init__(self):
+        self.count = 0
+        # The first record follows the opening '['
+        self.position = 1
+        self.offsets = array('Q')
+        self.fields = {field: {} for field in QUERY_FIELDS}
+        self.years = {}
+
+    def add(self, record, line):
+        row = self.count
+        self.count += 1
+        self.offsets.append(self.position)
+        # Each record is followed by ',' or the closing ']'
+        self.position += (len(line) if line.isascii() else len(line.encode('utf-8'))) + 1
+
+        fields = self.fields
+        for field in SCALAR_FIELDS:
+            value = record.get(field)
+            if value and isinstance(value, str):
+                fields[field].setdefault(value, []).append(row)
+        for group in record.get('signalGroups') or ():
+            group_id = group.get('id')
+            if group_id:
+                fields['signalGroups'].setdefault(group_id, []).append(row)
+        fields['vehicle'].setdefault(vehicle_id(record.get('make', ''), record.get('model', '')), []).append(row)
+
+        model_years = record.get('modelYears')
+        key = f"{model_years[0]}-{model_years[-1]}" if model_years else ALL_YEARS
+        self.years.setdefault(key, []).append(row)
+
+    @property
+    def size(self):
+        """Size in bytes of the matrix_data.json the added records were written to."""
+        return self.position if self.count else 2
+
+    def to_dict(self, sha256):
+        return {
+            'version': QUERY_INDEX_VERSION,
+            'count': self.count,
+            'size': self.size,
+            'sha256': sha256,
+            'offsets': self.offsets.tolist(),
+            'fields': self.fields,
+            'years': self.years
+        }
+
+    def write(self, output_path, sha256):
+        """Write the index for the matrix_data.json with this SHA-256."""
+        with open(output_path, 'w') as f:
+            dump(self.to_dict(sha256), f, sort_keys=True)
+
+
+def build_query_index(data_dir):
+    """Build matrix_query.json for an existing, normalized matrix_data.json and return the builder."""
+    data_path = Path(data_dir) / DATA_FILENAME
+    content = data_path.read_bytes()
+    records = loads(content)
+    builder = QueryIndexBuilder()
+    for record in records:
+        builder.add(record, dumps(record))
+    if builder.size != len(content):
+        raise ValueError(f"{data_path} is not in normalized form; normalize it with validate_json.py first")
+    builder.write(Path(data_dir) / QUERY_INDEX_FILENAME, hashlib.sha256(content).hexdigest())
+    return builder
+
+
+def parse_years(text):
+    """Parse a year range such as 2019-2022, 2019-, -2022 or 2020 into (since, until)."""
+    since, separator, until = text.partition('-')
+    if not separator:
+        until = since
+    return (int(since) if since else None), (int(until) if until else None)
+
+
+class MatrixQuery:
+    """Query matrix_data.json in data_dir through its matrix_query.json index."""
+
+    def __init__(self, data_dir, cache_size=BITMAP_CACHE_SIZE):
+        data_dir = Path(data_dir)
+        with open(data_dir / QUERY_INDEX_FILENAME) as f:
+            index = load(f)
+        if index.get('version') != QUERY_INDEX_VERSION:
+            raise ValueError(f"Unsupported query index version: {index.get('version')}; rebuild it with "
+                             "matrix_query.py --build")
+
+        self.data_path = data_dir / DATA_FILENAME
+        self._file = open(self.data_path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped, and no index matches one
+            self._file.close()
+            raise ValueError(f"{data_dir / QUERY_INDEX_FILENAME} does not match {self.data_path}; rebuild it")
+        # The mapped bytes are the ones records are read from, so they are what is checked
+        if len(self._data) != index['size'] or hashlib.sha256(self._data).hexdigest() != index['sha256']:
+            self.close()
+            raise ValueError(f"{data_dir / QUERY_INDEX_FILENAME} does not match {self.data_path}; rebuild it "
+                             "with matrix_query.py --build")
+
+        self.count = index['count']
+        self.size = index['size']
+        self.offsets = array('Q', index['offsets'])
+        self.fields = index['fields']
+        self.years = {
+            key: tuple(int(year) for year in key.split('-')) if key != ALL_YEARS else None
+            for key in index['years']
+        }
+        self.fields['years'] = index['years']
+        self._bitmaps = OrderedDict()
+        self._cache_size = cache_size
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def values(self, field):
+        """Return the indexed values of a field."""
+        return sorted(self.fields[field])
+
+    def _bitmap(self, field, values):
+        """Return the bitmap of the records with any of the values, from the cache when possible."""
+        key = (field, values)
+        bits = self._bitmaps.get(key)
+        if bits is not None:
+            self._bitmaps.move_to_end(key)
+            return bits
+
+        if len(values) == 1:
+            # Set bits in a bytearray; growing an int one bit at a time would copy it every time
+            bitmap = bytearray(self.count // 8 + 1)
+            for row in self.fields[field].get(values[0], ()):
+                bitmap[row >> 3] |= 1 << (row & 7)
+            bits = int.from_bytes(bitmap, 'little')
+        else:
+            bits = 0
+            for value in values:
+                bits |= self._bitmap(field, (value,))
+
+        self._bitmaps[key] = bits
+        if len(self._bitmaps) > self._cache_size:
+            self._bitmaps.popitem(last=False)
+        return bits
+
+    def _year_keys(self, since, until):
+        since = FIRST_YEAR if since is None else since
+        until = LAST_YEAR if until is None else until
+        return tuple(sorted(
+            key for key, years in self.years.items()
+            if years is None or (years[0] <= until and years[1] >= since)
+        ))
+
+    def _rows(self, bits):
+        """Return the record numbers set in a bitmap, in ascending order."""
+        data = bits.to_bytes(self.count // 8 + 1, 'little')
+        rows = []
+        # Skip the runs of empty bytes in C rather than byte by byte
+        for run in NONZERO_RUN.finditer(data):
+            base = run.start() << 3
+            for byte in run.group():
+                if byte:
+                    rows.extend(map(base.__add__, BIT_POSITIONS[byte]))
+                base += 8
+        return rows
+
+    def select(self, since=None, until=None, **filters):
+        """
+        Return the record numbers that match every filter, in ascending order.
+
+        Each filter is a field of QUERY_FIELDS and a value or a list of values,
+        any of which matches. since and until select records whose modelYears
+        overlap the range; records without modelYears apply to every year and
+        always match.
+        """
+        terms = []
+        for field, values in filters.items():
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"Unknown query field: {field} (expected one of {', '.join(QUERY_FIELDS)})")
+            values = (values,) if isinstance(values, str) else tuple(values)
+            terms.append((sum(len(self.fields[field].get(value, ())) for value in values), field, values))
+        if since is not None or until is not None:
+            keys = self._year_keys(since, until)
+            terms.append((sum(len(self.fields['years'][key]) for key in keys), 'years', keys))
+
+        if not terms:
+            return list(range(self.count))
+
+        # The smallest term first, so a query with no matches stops early
+        terms.sort()
+        if not terms[0][0]:
+            return []
+        bits = -1
+        for _, field, values in terms:
+            bits &= self._bitmap(field, values)
+            if not bits:
+                return []
+        return self._rows(bits)
+
+    def record_bytes(self, row):
+        """Return one record as it is encoded in matrix_data.json."""
+        start = self.offsets[row]
+        end = self.offsets[row + 1] - 1 if row + 1 < self.count else self.size - 1
+        return self._data[start:end]
+
+    def record(self, row):
+        """Read and parse one record."""
+        return loads(self.record_bytes(row))
+
+    def records(self, rows):
+        """Read and parse the given records."""
+        return [self.record(row) for row in rows]
+
+
+def parse_terms(terms):
+    """Parse field=value[,value...] and years=RANGE terms into select() arguments."""
+    filters = {}
+    since = until = None
+    for term in terms:
+        field, separator, value = term.partition('=')
+        if not separator:
+            raise ValueError(f"Expected field=value, got {term!r}")
+        if field == 'years':
+            since, until = parse_years(value)
+        else:
+            filters[field] = value.split(',')
+    return filters, since, until
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the extracted matrix data through its indexes')
+    parser.add_argument('terms', nargs='*', metavar='FIELD=VALUE',
+                        help=f"Filters on {', '.join(QUERY_FIELDS)} (comma-separated values match any) "
+                             "or years=2019-2022")
+    parser.add_argument('--data', default='public/data', help='Directory of matrix_data.json (default: public/data)')
+    parser.add_argument('--build', action='store_true', help=f'Build {QUERY_INDEX_FILENAME} from {DATA_FILENAME}')
+    parser.add_argument('--fields', help='Comma-separated fields to print as tab-separated columns')
+    parser.add_argument('--count', action='store_true', help='Only print the number of matching records')
+    parser.add_argument('--limit', type=int, help='Print at most this many records')
+    args = parser.parse_args()
+
+    if args.build:
+        start = time.perf_counter()
+        builder = build_query_index(args.data)
+        print(f"Indexed {builder.count} records in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        if not args.terms:
+            return
+
+    try:
+        filters, since, until = parse_terms(args.terms)
+        with MatrixQuery(args.data) as matrix:
+            start = time.perf_counter()
+            rows = matrix.select(since, until, **filters)
+            elapsed = time.perf_counter() - start
+            if args.count:
+                print(len(rows))
+            else:
+                fields = args.fields.split(',') if args.fields else None
+                for record in matrix.records(rows[:args.limit] if args.limit is not None else rows):
+                    if fields:
+                        print('\t'.join(str(record.get(field, '')) for field in fields))
+                    else:
+                        print(dumps(record, ensure_ascii=False))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{len(rows)} of {matrix.count} records matched in {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
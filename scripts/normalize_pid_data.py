@@ -6,15 +6,26 @@ for the OBDb Explorer project.
 This script processes CSV files containing information about which service 01 PIDs
 are supported by different model years and ECUs.
 
+Rows are streamed, so memory is bounded by the number of distinct (model year,
+ECU, PID) entries rather than the size of the export, and PIDs are deduplicated
+with sets. Several CSV files can be given; they are parsed in parallel with
+--jobs and merged as if they were one file. The output is written as it is
+encoded, in the same format as before: indented JSON with sorted keys, where
+each ECU's list of two-digit PIDs is kept on one line.
+
 Usage:
     python normalize_pid_data.py --input exportconfirmedservice01pidsbymodelyear.csv --output pid_support.json
+    python normalize_pid_data.py --input exports/*.csv --output pid_support.json --jobs 0
 """
 
 import argparse
 import csv
 import json
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -28,13 +39,57 @@ MODEL_YEAR_PATTERN = re.compile(r'^(\d{4})::(.+)$')
 # Regular expression to match ECU header and PID format
 ECU_PID_PATTERN = re.compile(r'^([\dA-Fa-f]{3,4})(?:\.([\dA-Fa-f]{3,4}))?\.(?:01)?([01][\dA-Fa-f]+)$')
 
-def parse_csv(file_path):
-    """Parse the PID support CSV file."""
+# ECU for PIDs listed without a header
+DEFAULT_ECU = "7E0"
+
+# PID lists that are written on a single line
+COMPACT_PID = re.compile(r'[0-9A-F]{2}')
+
+# Distinct PID entries cached by normalize_pid()
+PID_CACHE_SIZE = 1 << 16
+
+@lru_cache(maxsize=PID_CACHE_SIZE)
+def normalize_pid(pid):
+    """
+    Return the (ECU header, PID) of a PID from the CSV, or None for a blank entry.
+
+    Exports repeat the same few thousand PIDs on every row, so results are cached.
+    """
+    pid = pid.strip()
+    if not pid:
+        return None
+
+    ecu_match = ECU_PID_PATTERN.match(pid)
+    if not ecu_match:
+        # For PIDs without ECU header, we'll use the default ECU
+        return DEFAULT_ECU, pid
+
+    # Skip receive filter (group 2) as mentioned
+    pid_value = ecu_match.group(3).upper()
+    if len(pid_value) == 4:
+        pid_value = pid_value[2:]
+    return ecu_match.group(1).upper(), pid_value
+
+def add_commands(pid_data, commands):
+    """Add the PIDs of one row's commands column to a model year -> ECU -> set of PIDs mapping."""
+    year_match = MODEL_YEAR_PATTERN.match(commands)
+    if not year_match:
+        return
+
+    model_year, pid_list_text = year_match.groups()
+    ecus = pid_data.setdefault(model_year, {})
+    for entry in map(normalize_pid, pid_list_text.split(',')):
+        if entry:
+            ecu_header, pid_value = entry
+            pids = ecus.get(ecu_header)
+            if pids is None:
+                pids = ecus[ecu_header] = set()
+            pids.add(pid_value)
+
+def collect_pids(file_path, pid_data=None):
+    """Stream a PID support CSV file into a model year -> ECU -> set of PIDs mapping."""
     logger.info(f"Parsing CSV file: {file_path}")
-
-    # Data structure to store normalized data
-    pid_data = {
-    }
+    pid_data = {} if pid_data is None else pid_data
 
     try:
         with open(file_path, 'r', encoding='utf-8') as csvfile:
@@ -43,58 +98,8 @@ def parse_csv(file_path):
             next(reader, None)
 
             for row in reader:
-                if not row or len(row) < 2:
-                    continue
-
-                commands = row[0]
-
-                # Process model years from the text
-                year_match = MODEL_YEAR_PATTERN.match(commands)
-                if year_match:
-                    model_year = year_match.group(1)
-                    pid_list_text = year_match.group(2)
-
-                    # Parse the PIDs
-                    pids = [pid.strip() for pid in pid_list_text.split(',') if pid.strip()]
-
-                    # Initialize model year if not exists
-                    if model_year not in pid_data:
-                        pid_data[model_year] = {}
-
-                    # Simple PIDs (without ECU header specified)
-                    for pid in pids:
-                        # Check if this is a complex PID format (with ECU header)
-                        ecu_match = ECU_PID_PATTERN.match(pid)
-
-                        if ecu_match:
-                            # Extract ECU header and PID
-                            ecu_header = ecu_match.group(1).upper()
-                            # Skip receive filter (group 2) as mentioned
-                            pid_value = ecu_match.group(3).upper()
-
-                            # Initialize ECU if not exists
-                            if ecu_header not in pid_data[model_year]:
-                                pid_data[model_year][ecu_header] = []
-
-                            if len(pid_value) == 4:
-                                pid_value = pid_value[2:]
-
-                            # Add PID to ECU's supported list
-                            if pid_value not in pid_data[model_year][ecu_header]:
-                                pid_data[model_year][ecu_header].append(pid_value)
-                        else:
-                            # For PIDs without ECU header, we'll use the default ECU
-                            if "7E0" not in pid_data[model_year]:
-                                pid_data[model_year]["7E0"] = []
-
-                            # Add PID to default ECU's supported list
-                            if pid not in pid_data[model_year]["7E0"]:
-                                pid_data[model_year]["7E0"].append(pid)
-
-        # Sort PIDs in each ECU for better readability
-        for model_year in pid_data:
-            for ecu in pid_data[model_year]:
-                pid_data[model_year][ecu].sort()
+                if len(row) >= 2:
+                    add_commands(pid_data, row[0])
 
         return pid_data
 
@@ -102,6 +107,67 @@ def parse_csv(file_path):
         logger.error(f"Error parsing CSV file: {e}")
         raise
 
+def merge_pid_data(pid_data, other):
+    """Merge another model year -> ECU -> PIDs mapping into pid_data."""
+    for model_year, ecus in other.items():
+        merged_ecus = pid_data.setdefault(model_year, {})
+        for ecu, pids in ecus.items():
+            merged_ecus.setdefault(ecu, set()).update(pids)
+    return pid_data
+
+def collect_files(file_paths, jobs=1):
+    """Collect the PIDs of several CSV files, in a process pool when jobs > 1."""
+    if jobs <= 1 or len(file_paths) <= 1:
+        pid_data = {}
+        for file_path in file_paths:
+            collect_pids(file_path, pid_data)
+        return pid_data
+
+    pid_data = {}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(file_paths))) as executor:
+        for file_data in executor.map(collect_pids, file_paths):
+            merge_pid_data(pid_data, file_data)
+    return pid_data
+
+def parse_csv(file_path):
+    """Parse the PID support CSV file into model year -> ECU -> sorted list of PIDs."""
+    pid_data = collect_pids(file_path)
+    return {
+        model_year: {ecu: sorted(pids) for ecu, pids in ecus.items()}
+        for model_year, ecus in pid_data.items()
+    }
+
+def iter_json(data):
+    """
+    Yield the JSON text of a model year -> ECU -> PIDs mapping in chunks.
+
+    This is json.dumps(data, indent=2, sort_keys=True) with the PIDs sorted,
+    except that lists of two-digit PIDs are written on one line as
+    [ "00", "01" ].
+    """
+    if not data:
+        yield "{}"
+        return
+
+    yield "{"
+    for year_index, model_year in enumerate(sorted(data)):
+        ecus = data[model_year]
+        separator = "," if year_index else ""
+        if not ecus:
+            yield f"{separator}\n  {json.dumps(model_year)}: {{}}"
+            continue
+
+        yield f"{separator}\n  {json.dumps(model_year)}: {{"
+        for ecu_index, ecu in enumerate(sorted(ecus)):
+            pids = [json.dumps(pid) for pid in sorted(ecus[ecu])]
+            separator = "," if ecu_index else ""
+            if all(COMPACT_PID.fullmatch(pid) for pid in ecus[ecu]):
+                yield f"{separator}\n    {json.dumps(ecu)}: [ {', '.join(pids)} ]"
+            else:
+                yield f"{separator}\n    {json.dumps(ecu)}: [\n      " + ",\n      ".join(pids) + "\n    ]"
+        yield "\n  }"
+    yield "\n}"
+
 def write_json(data, output_path):
     """Write the normalized data to a JSON file."""
     logger.info(f"Writing JSON data to: {output_path}")
@@ -112,19 +178,8 @@ def write_json(data, output_path):
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
         with open(output_path, 'w', encoding='utf-8') as f:
-            # Use custom JSON encoder to format arrays on single lines
-            class CompactJSONEncoder(json.JSONEncoder):
-                def encode(self, obj):
-                    if isinstance(obj, list) and all(isinstance(x, str) for x in obj):
-                        # For arrays of strings (PID arrays), keep them on one line
-                        parts = [self.encode(item) for item in obj]
-                        return "[" + ", ".join(parts) + "]"
-                    return super().encode(obj)
-
-            json_str = json.dumps(data, cls=CompactJSONEncoder, indent=2, sort_keys=True)
-            # Further compact ECU command arrays by regex replacing multi-line arrays
-            json_str = re.sub(r'\[\n\s+("[0-9A-F]{2}",?\s*)+\n\s+\]', lambda m: m.group(0).replace('\n', ' ').replace('  ', ''), json_str)
-            f.write(json_str)
+            for chunk in iter_json(data):
+                f.write(chunk)
 
         logger.info(f"Successfully wrote JSON data to: {output_path}")
 
@@ -135,14 +190,17 @@ def write_json(data, output_path):
 def main():
     """Main function to run the script."""
     parser = argparse.ArgumentParser(description='Normalize PID support data from CSV to JSON')
-    parser.add_argument('--input', required=True, help='Input CSV file path')
+    parser.add_argument('--input', required=True, nargs='+', help='Input CSV file paths, merged into one output')
     parser.add_argument('--output', required=True, help='Output JSON file path')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes for parsing input files (0 = one per CPU core)')
 
     args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
 
     try:
-        # Parse CSV and get normalized data
-        pid_data = parse_csv(args.input)
+        # Parse the CSV files and merge their normalized data
+        pid_data = collect_files([Path(path) for path in args.input], jobs)
 
         # Write to JSON file
         write_json(pid_data, args.output)
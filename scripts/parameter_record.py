@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory record for an extracted parameter.
+
+parse_signalset() creates one record per signal and PID, so there are
+hundreds of thousands of them. A Parameter keeps its fields in __slots__
+instead of a per-record dict. Strings that repeat across vehicles (make, model,
+hdr, unit, ...) are interned, and nested values (cmd, fmt, modelYears and
+signalGroups) are shared between the records of a signalset and stored already
+normalized (see deep_sort_dict() in validate_json.py). Records are converted
+to the JSON schema shape only when they are written: to_dict() returns a
+record in canonical form, so encoding it gives the output line directly.
+
+Records pickle and cache (see extraction_cache.py) as plain lists of field
+values, in FIELDS order.
+"""
+
+import sys
+from operator import attrgetter
+
+# The fields of a matrix_data.json record, in constructor order
+FIELDS = ('hdr', 'eax', 'pid', 'cmd', 'id', 'name', 'unit', 'suggestedMetric', 'scaling', 'path', 'make', 'model',
+          'bitOffset', 'bitLength', 'debug', 'fmt', 'modelYears', 'signalGroups')
+
+# Fields that are left out of the record when None
+OPTIONAL_FIELDS = ('modelYears', 'signalGroups')
+
+# Field order of a normalized record
+SORTED_FIELDS = tuple(sorted(FIELDS))
+
+_get_fields = attrgetter(*FIELDS)
+_get_sorted_fields = attrgetter(*SORTED_FIELDS)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Parameter:
+    """One parameter of a signalset; see FIELDS for its attributes."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, hdr, eax, pid, cmd, id, name, unit, suggestedMetric, scaling, path, make, model,
+                 bitOffset, bitLength, debug, fmt, modelYears=None, signalGroups=None):
+        self.hdr = _intern(hdr)
+        self.eax = _intern(eax)
+        self.pid = _intern(pid)
+        self.cmd = cmd
+        self.id = id
+        self.name = name
+        self.unit = _intern(unit)
+        self.suggestedMetric = _intern(suggestedMetric)
+        self.scaling = scaling
+        self.path = _intern(path)
+        self.make = _intern(make)
+        self.model = _intern(model)
+        self.bitOffset = bitOffset
+        self.bitLength = bitLength
+        self.debug = debug
+        self.fmt = fmt
+        self.modelYears = modelYears
+        self.signalGroups = signalGroups
+
+    @classmethod
+    def from_row(cls, row):
+        """Create a record from the field values returned by to_row()."""
+        return cls(*row)
+
+    def to_row(self):
+        """Return the field values as a list in FIELDS order, e.g. for JSON cache entries."""
+        return list(_get_fields(self))
+
+    def to_dict(self):
+        """Return the record in the JSON schema shape, with its keys in normalized order."""
+        record = dict(zip(SORTED_FIELDS, _get_sorted_fields(self)))
+        for field in OPTIONAL_FIELDS:
+            if record[field] is None:
+                del record[field]
+        return record
+
+    def __reduce__(self):
+        return Parameter, _get_fields(self)
+
+    def __repr__(self):
+        return f"Parameter({self.make!r}, {self.model!r}, {self.hdr!r}, {self.pid!r}, {self.id!r})"
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Bitmap form of model year PID support data.
+
+model_years_data.json (and each repository's modelyears.json) lists the
+supported Service 01 PIDs of every model year and ECU as sorted two-digit hex
+strings. Here each (year, ECU) list is a 256-bit bitmap instead, where bit n is
+set when PID n is supported. As a Python int, unions, intersections and
+differences across years and vehicles are single operations, and in JSON a
+bitmap is a 64-character hex string (bit 0 is the last digit) or 44 characters
+of base64 (the same 32 bytes, big-endian).
+
+A list is only replaced by a bitmap when decoding the bitmap gives back exactly
+the same list, so lists with other PIDs (lower case, three digits, duplicates
+or out of order) are kept as they are and conversion is always lossless. The
+converter decodes its output and compares it with the input before writing.
+
+Usage:
+    python pid_bitmap.py --input public/data/model_years_data.json --output model_years_bitmaps.json
+    python pid_bitmap.py --input model_years_bitmaps.json --output model_years_data.json --decode
+    python pid_bitmap.py --input public/data/model_years_data.json --pid 5C --since 2018
+"""
+
+import argparse
+import base64
+import binascii
+import os
+import re
+import sys
+
+from serialization import dump, load
+
+PID_COUNT = 256
+BITMAP_BYTES = PID_COUNT // 8
+
+# Lengths of an encoded bitmap, which tell the encodings apart
+HEX_LENGTH = BITMAP_BYTES * 2
+BASE64_LENGTH = 44
+
+ENCODINGS = ('hex', 'base64')
+
+# PIDs a bitmap can represent, as they are written in the lists
+PID_PATTERN = re.compile(r'[0-9A-F]{2}')
+
+
+def pids_to_bitmap(pids, strict=True):
+    """
+    Return the bitmap of a list of two-digit hex PIDs.
+
+    With strict unset, PIDs are matched case-insensitively and any that can't
+    be represented are skipped instead of raising ValueError.
+    """
+    bits = 0
+    for pid in pids:
+        if not strict:
+            pid = pid.upper() if isinstance(pid, str) else pid
+            if not isinstance(pid, str) or not PID_PATTERN.fullmatch(pid):
+                continue
+        elif not isinstance(pid, str) or not PID_PATTERN.fullmatch(pid):
+            raise ValueError(f"Not a two-digit hex PID: {pid!r}")
+        bits |= 1 << int(pid, 16)
+    return bits
+
+
+def bitmap_to_pids(bits):
+    """Return the sorted two-digit hex PIDs set in a bitmap."""
+    return [f'{pid:02X}' for pid in range(PID_COUNT) if bits >> pid & 1]
+
+
+def encode_bitmap(bits, encoding='hex'):
+    """Encode a bitmap as a fixed-length hex or base64 string."""
+    if encoding == 'hex':
+        return f'{bits:0{HEX_LENGTH}x}'
+    if encoding == 'base64':
+        return base64.b64encode(bits.to_bytes(BITMAP_BYTES, 'big')).decode('ascii')
+    raise ValueError(f"Unknown bitmap encoding: {encoding!r}")
+
+
+def decode_bitmap(text):
+    """Decode a bitmap string in either encoding, telling them apart by length."""
+    try:
+        if len(text) == HEX_LENGTH:
+            return int(text, 16)
+        if len(text) == BASE64_LENGTH:
+            return int.from_bytes(base64.b64decode(text, validate=True), 'big')
+    except (ValueError, binascii.Error):
+        pass
+    raise ValueError(f"Not an encoded PID bitmap: {text!r}")
+
+
+def is_bitmap_exact(pids):
+    """Whether a PID list is exactly what decoding its bitmap gives back."""
+    try:
+        return pids == bitmap_to_pids(pids_to_bitmap(pids))
+    except ValueError:
+        return False
+
+
+def encode_model_years(model_years, encoding='hex'):
+    """Convert a year -> ECU -> PID list mapping to bitmaps, keeping lists a bitmap can't reproduce."""
+    return {
+        year: {
+            ecu: encode_bitmap(pids_to_bitmap(pids), encoding) if is_bitmap_exact(pids) else pids
+            for ecu, pids in ecus.items()
+        }
+        for year, ecus in model_years.items()
+    }
+
+
+def decode_model_years(model_years):
+    """Convert a year -> ECU -> bitmap mapping back to PID lists; lists are returned as they are."""
+    return {
+        year: {
+            ecu: bitmap_to_pids(decode_bitmap(pids)) if isinstance(pids, str) else pids
+            for ecu, pids in ecus.items()
+        }
+        for year, ecus in model_years.items()
+    }
+
+
+def model_year_bitmaps(model_years):
+    """Return year -> ECU -> int bitmaps for either form, skipping PIDs a bitmap can't represent."""
+    return {
+        year: {
+            ecu: decode_bitmap(pids) if isinstance(pids, str) else pids_to_bitmap(pids, strict=False)
+            for ecu, pids in ecus.items()
+        }
+        for year, ecus in model_years.items()
+    }
+
+
+def convert(data, decode=False, encoding='hex'):
+    """Convert model_years_data.json vehicles, or a single year -> ECU mapping, to or from bitmaps."""
+    convert_years = decode_model_years if decode else lambda years: encode_model_years(years, encoding)
+    if isinstance(data, list):
+        return [dict(vehicle, modelYears=convert_years(vehicle['modelYears'])) for vehicle in data]
+    return convert_years(data)
+
+
+def union(bitmaps):
+    """PIDs set in any of the bitmaps."""
+    bits = 0
+    for bitmap in bitmaps:
+        bits |= bitmap
+    return bits
+
+
+def intersection(bitmaps):
+    """PIDs set in every one of the bitmaps (none if there are no bitmaps)."""
+    bits = None
+    for bitmap in bitmaps:
+        bits = bitmap if bits is None else bits & bitmap
+    return bits or 0
+
+
+def difference(bitmap, other):
+    """PIDs set in bitmap but not in other."""
+    return bitmap & ~other
+
+
+def _year_in_range(year, since, until):
+    if since is None and until is None:
+        return True
+    if not str(year).isdigit():
+        return False
+    return (since is None or int(year) >= since) and (until is None or int(year) <= until)
+
+
+class PidSupportIndex:
+    """Bitmaps of the model year PID support of every vehicle in model_years_data.json, in either form."""
+
+    def __init__(self, vehicles):
+        self.vehicles = {
+            (vehicle['make'], vehicle['model']): model_year_bitmaps(vehicle['modelYears'])
+            for vehicle in vehicles
+        }
+
+    def year_bitmaps(self, vehicle, since=None, until=None, ecu=None):
+        """Return year -> bitmap of a (make, model) vehicle, over all ECUs or only the given one."""
+        return {
+            year: ecus.get(ecu, 0) if ecu else union(ecus.values())
+            for year, ecus in self.vehicles.get(vehicle, {}).items()
+            if _year_in_range(year, since, until)
+        }
+
+    def bitmap(self, vehicle, since=None, until=None, ecu=None):
+        """PIDs a vehicle supports in any model year within the range."""
+        return union(self.year_bitmaps(vehicle, since, until, ecu).values())
+
+    def vehicles_supporting(self, pid, since=None, until=None, ecu=None, every_year=False):
+        """
+        Return the (make, model) of each vehicle that supports a PID within a model year range.
+
+        pid is an int or a two-digit hex string. By default a vehicle matches
+        when any of its model years in the range supports the PID; with
+        every_year set, all of them must.
+        """
+        bit = 1 << (int(pid, 16) if isinstance(pid, str) else pid)
+        matches = []
+        for vehicle in self.vehicles:
+            bitmaps = list(self.year_bitmaps(vehicle, since, until, ecu).values())
+            if not bitmaps:
+                continue
+            combined = intersection(bitmaps) if every_year else union(bitmaps)
+            if combined & bit:
+                matches.append(vehicle)
+        return sorted(matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert model year PID support data to and from bitmaps')
+    parser.add_argument('--input', required=True,
+                        help='model_years_data.json or a single modelyears.json, as lists or bitmaps')
+    parser.add_argument('--output', help='Converted output file path')
+    parser.add_argument('--decode', action='store_true', help='Convert bitmaps back to PID lists')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='hex', help='Bitmap encoding (default: hex)')
+    parser.add_argument('--pid', help='List the vehicles that support this PID (hex, e.g. 5C)')
+    parser.add_argument('--since', type=int, help='First model year for --pid')
+    parser.add_argument('--until', type=int, help='Last model year for --pid')
+    parser.add_argument('--ecu', help='Only consider this ECU header for --pid')
+    parser.add_argument('--every-year', action='store_true',
+                        help='With --pid, require support in every model year of the range')
+    args = parser.parse_args()
+
+    if not args.output and not args.pid:
+        parser.error('give --output, --pid or both')
+
+    with open(args.input) as f:
+        data = load(f)
+
+    if args.pid:
+        vehicles = data if isinstance(data, list) else [{'make': '', 'model': args.input, 'modelYears': data}]
+        index = PidSupportIndex(vehicles)
+        matches = index.vehicles_supporting(args.pid, args.since, args.until, args.ecu, args.every_year)
+        for make, model in matches:
+            print(f"{make} {model}".strip())
+        print(f"{len(matches)} of {len(index.vehicles)} vehicles support PID {args.pid.upper()}")
+
+    if args.output:
+        converted = convert(data, args.decode, args.encoding)
+
+        # Lists survive the round trip exactly, so anything else is a bug
+        if not args.decode and convert(converted, decode=True) != data:
+            print(f"❌ Converting {args.output} back does not reproduce {args.input}; not writing it")
+            sys.exit(1)
+
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            dump(converted, f, sort_keys=True)
+        if args.decode:
+            print(f"✅ Wrote {args.output}")
+        else:
+            print(f"✅ Wrote {args.output}, which converts back to {args.input} exactly")
+
+
+if __name__ == '__main__':
+    main()
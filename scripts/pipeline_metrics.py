@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Structured metrics for the extraction pipeline.
+
+PipelineMetrics times the stages of a run (wall and CPU time, including worker
+processes once they have exited), collects the per-repository metrics that
+parse_repo() returns with each result, and tracks peak resident memory. Events
+are written as JSON lines while the run progresses, one object per line:
+
+    {"event": "stage", "name": "discovery", "wall": 0.01, "cpu": 0.01, "ts": ...}
+    {"event": "repo", "repo": "Ford-Transit-Connect", "wall": 0.2, "parsed_files": 3, ...}
+    {"event": "summary", ...}
+
+and finish() writes the summary, which lists the slowest repositories and the
+signal groups with the most matches, as a single JSON file. cProfile and
+tracemalloc can be enabled for the main process; their top entries are
+included in the summary and the profile can be saved for pstats or snakeviz.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+METRICS_VERSION = 1
+
+# Number of repositories, signal groups, functions and allocation sites listed in the summary
+SUMMARY_TOP = 10
+
+# Counts summed over the per-repository metrics
+REPO_COUNTS = ('parsed_files', 'cache_hits', 'commands', 'signals', 'parameters', 'group_matches')
+
+# Counts of a signalset that are stored with its cache entry and added back on a hit
+SIGNALSET_COUNTS = ('parsed_files', 'commands', 'signals', 'group_matches')
+
+
+def new_repo_metrics():
+    """Return the empty per-repository metrics that parse_signalset() adds to."""
+    return {'parsed_files': 0, 'commands': 0, 'signals': 0, 'parameters': 0, 'group_matches': 0,
+            'signal_groups_seconds': 0.0, 'groups': {}}
+
+
+def record_signalset(metrics, signalset_data, parameters, signal_groups_seconds):
+    """Add a parsed signalset's counts and signal group matches to per-repository metrics."""
+    commands = signalset_data.get('commands', [])
+    metrics['parsed_files'] += 1
+    metrics['commands'] += len(commands)
+    metrics['signals'] += sum(len(command.get('signals', [])) for command in commands)
+    metrics['signal_groups_seconds'] += signal_groups_seconds
+    groups = metrics['groups']
+    for parameter in parameters:
+        for group in parameter.signalGroups or ():
+            groups[group['id']] = groups.get(group['id'], 0) + 1
+            metrics['group_matches'] += 1
+
+
+def signalset_counts(metrics):
+    """Return the counts and signal group matches recorded in metrics, to store with a cached signalset."""
+    return dict({name: metrics[name] for name in SIGNALSET_COUNTS}, groups=metrics['groups'])
+
+
+def add_signalset_counts(metrics, counts):
+    """Add counts returned by signalset_counts() to per-repository metrics."""
+    for name in SIGNALSET_COUNTS:
+        metrics[name] += counts[name]
+    groups = metrics['groups']
+    for group_id, matches in counts['groups'].items():
+        groups[group_id] = groups.get(group_id, 0) + matches
+
+
+def cpu_times():
+    """Return the CPU seconds used by this process and by its exited child processes."""
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process and of its largest exited child, if known."""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+class PipelineMetrics:
+    """Collect stage and repository metrics, writing them as JSON lines to events_path if given."""
+
+    def __init__(self, events_path=None):
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._start_wall = time.perf_counter()
+        self._start_cpu = cpu_times()
+        self.stages = {}
+        self.repos = []
+        self.counts = Counter()
+        self.groups = Counter()
+        self._profiler = None
+        self._profile_path = None
+
+        self._events = None
+        if events_path:
+            Path(events_path).parent.mkdir(parents=True, exist_ok=True)
+            self._events = open(events_path, 'w')
+
+    def emit(self, event, **fields):
+        if self._events:
+            self._events.write(json.dumps(dict(event=event, ts=round(time.time(), 3), **fields)) + '\n')
+            self._events.flush()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; repeated stages of the same name are added together."""
+        start_wall = time.perf_counter()
+        start_cpu = sum(cpu_times())
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = sum(cpu_times()) - start_cpu
+            stage = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+            stage['wall'] += wall
+            stage['cpu'] += cpu
+            stage['calls'] += 1
+            self.emit('stage', name=name, wall=round(wall, 6), cpu=round(cpu, 6), rss=peak_rss_bytes()[0])
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def add_repo(self, repo, metrics):
+        """Record the metrics returned with a repository's result."""
+        metrics = dict(metrics)
+        groups = metrics.pop('groups', {})
+        self.groups.update(groups)
+        self.counts['repos'] += 1
+        if metrics.get('cached'):
+            self.counts['cached_repos'] += 1
+        for name in REPO_COUNTS:
+            self.counts[name] += metrics.get(name, 0)
+
+        entry = dict(metrics, repo=repo)
+        self.repos.append(entry)
+        self.emit('repo', **entry)
+
+    def enable_profiler(self, profile_path=None):
+        """Profile the main process with cProfile until finish(), saving the stats to profile_path if given."""
+        self._profile_path = profile_path
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def enable_tracemalloc(self, frames=1):
+        """Trace memory allocations of the main process until finish()."""
+        tracemalloc.start(frames)
+
+    def _profile_summary(self):
+        self._profiler.disable()
+        if self._profile_path:
+            self._profiler.dump_stats(self._profile_path)
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:SUMMARY_TOP]
+        return {
+            'path': str(self._profile_path) if self._profile_path else None,
+            'top': [{
+                'function': f"{filename}:{line}({function})",
+                'calls': calls,
+                'total': round(total, 6),
+                'cumulative': round(cumulative, 6)
+            } for (filename, line, function), (_, calls, total, cumulative, _) in top]
+        }
+
+    def _tracemalloc_summary(self):
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'peak_bytes': peak,
+            'top': [{'location': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:SUMMARY_TOP]]
+        }
+
+    def summary(self):
+        """Return the summary of the run so far, stopping the profiler and tracemalloc if enabled."""
+        cpu, children_cpu = cpu_times()
+        rss, children_rss = peak_rss_bytes()
+        summary = {
+            'version': METRICS_VERSION,
+            'started_at': self.started_at,
+            'wall': round(time.perf_counter() - self._start_wall, 6),
+            'cpu': round(cpu - self._start_cpu[0], 6),
+            'children_cpu': round(children_cpu - self._start_cpu[1], 6),
+            'peak_rss': rss,
+            'children_peak_rss': children_rss,
+            'stages': {name: dict(stage, wall=round(stage['wall'], 6), cpu=round(stage['cpu'], 6))
+                       for name, stage in self.stages.items()},
+            'counts': dict(sorted(self.counts.items())),
+            'slowest_repos': sorted(self.repos, key=lambda repo: repo.get('wall', 0), reverse=True)[:SUMMARY_TOP],
+            'top_signal_groups': [{'id': group_id, 'matches': matches}
+                                  for group_id, matches in self.groups.most_common(SUMMARY_TOP)],
+            'profile': None,
+            'tracemalloc': None
+        }
+        if self._profiler:
+            summary['profile'] = self._profile_summary()
+            self._profiler = None
+        if tracemalloc.is_tracing():
+            summary['tracemalloc'] = self._tracemalloc_summary()
+        return summary
+
+    def finish(self, summary_path=None):
+        """Emit the summary event, write it to summary_path if given and close the event log."""
+        summary = self.summary()
+        self.emit('summary', **summary)
+        if summary_path:
+            Path(summary_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(summary_path, 'w') as f:
+                json.dump(summary, f, indent=2)
+        if self._events:
+            self._events.close()
+            self._events = None
+        return summary
+
+
+def print_summary(summary):
+    """Print the stage timings and slowest repositories of a summary."""
+    print(f"Run took {summary['wall']:.2f}s wall, {summary['cpu']:.2f}s CPU "
+          f"(+{summary['children_cpu']:.2f}s in workers)")
+    if summary['peak_rss']:
+        print(f"Peak memory: {summary['peak_rss'] / 2 ** 20:.1f} MiB")
+    for name, stage in summary['stages'].items():
+        print(f"  {name:<18} {stage['wall']:8.3f}s wall {stage['cpu']:8.3f}s CPU")
+    for repo in summary['slowest_repos'][:5]:
+        print(f"  slowest: {repo['repo']} {repo.get('wall', 0):.3f}s "
+              f"({repo.get('signal_groups_seconds', 0):.3f}s matching signal groups)")
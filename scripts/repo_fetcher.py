@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Concurrent fetcher for the OBDb vehicle repositories.
+
+RepoFetcher clones or updates repositories with asyncio subprocesses, running
+at most `concurrency` git commands at a time. Clones are shallow and
+single-branch and updates fetch only the tip of the branch, which is all the
+extractor reads. Failed attempts, such as those caused by GitHub rate limiting,
+are retried with exponential backoff and jitter, and a repository that still
+fails is reported as failed rather than silently left out.
+
+New clones are made in WORKSPACE/.fetch-tmp and only moved into place once
+complete, so an interrupted clone never leaves a partial repository behind.
+
+Repositories are stored in the form of the ingest mode (see repo_sources.py):
+'worktree' makes regular clones, 'git' makes bare clones without a working
+tree, and 'archive' downloads a tarball of the branch tip, skipping the
+download when `git ls-remote` shows the tip is the commit already stored.
+
+Repository URLs come from a template with {org} and {repo} placeholders, so
+local bare repositories can stand in for GitHub:
+
+    fetcher = RepoFetcher('workspace', url_template='/srv/mirrors/{repo}.git')
+    results = fetcher.fetch_all('OBDb', ['Ford-Transit-Connect'])
+"""
+
+import asyncio
+import base64
+import os
+import random
+import shutil
+import subprocess
+import time
+import urllib.request
+from pathlib import Path
+
+from repo_sources import read_archive_commit, workspace_entry_path
+
+DEFAULT_URL_TEMPLATE = 'https://github.com/{org}/{repo}.git'
+DEFAULT_ARCHIVE_URL_TEMPLATE = 'https://codeload.github.com/{org}/{repo}/tar.gz/{commit}'
+DEFAULT_BRANCH = 'main'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0
+DEFAULT_TIMEOUT = 300
+
+# Directory inside the workspace where new clones are made before being moved into place
+FETCH_TEMP_DIR = '.fetch-tmp'
+
+
+def object_store_bytes(repo_path):
+    """Return the size of a repository's object store.
+
+    Fetched objects are stored as received, either as the transferred pack or
+    as the loose objects it is unpacked into, so the growth of the object store
+    over a clone or fetch measures what was transferred.
+    """
+    git_dir = Path(repo_path) / '.git'
+    if not git_dir.exists():
+        # A bare repository is its own git directory
+        git_dir = Path(repo_path)
+    total = 0
+    for root, _, files in os.walk(git_dir / 'objects'):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def format_bytes(count):
+    if count < 1024:
+        return f"{count} bytes"
+    if count < 1024 ** 2:
+        return f"{count / 1024:.1f} KiB"
+    return f"{count / 1024 ** 2:.1f} MiB"
+
+
+def github_token():
+    return os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN')
+
+
+def github_auth_env(url):
+    """Return environment variables that authenticate git's HTTPS requests to GitHub with GITHUB_TOKEN, if set.
+
+    The header is passed as GIT_CONFIG_* variables rather than -c arguments so
+    it doesn't show up in process listings.
+    """
+    token = github_token()
+    if not token or not url.startswith('https://github.com/'):
+        return {}
+    credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+    # Added after any config entries already passed through the environment
+    index = int(os.environ.get('GIT_CONFIG_COUNT') or 0)
+    return {
+        'GIT_CONFIG_COUNT': str(index + 1),
+        f'GIT_CONFIG_KEY_{index}': 'http.https://github.com/.extraheader',
+        f'GIT_CONFIG_VALUE_{index}': f"AUTHORIZATION: basic {credentials}"
+    }
+
+
+def download(url, output_path, timeout):
+    """Download a URL to a file through a temporary path and return the number of bytes written."""
+    request = urllib.request.Request(url)
+    token = github_token()
+    if token and url.startswith('https://codeload.github.com/'):
+        request.add_header('Authorization', f"token {token}")
+
+    temp_path = output_path.with_name(output_path.name + '.tmp')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response, open(temp_path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        os.replace(temp_path, output_path)
+    finally:
+        if temp_path.exists():
+            os.remove(temp_path)
+    return output_path.stat().st_size
+
+
+class GitCommandError(Exception):
+    def __init__(self, command, message):
+        super().__init__(f"git {command}: {message}")
+        self.message = message
+
+
+class RepoFetcher:
+    """Clone or update many repositories concurrently, with retries."""
+
+    def __init__(self, workspace_dir, url_template=DEFAULT_URL_TEMPLATE, branch=DEFAULT_BRANCH,
+                 concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 timeout=DEFAULT_TIMEOUT, mode='worktree', archive_url_template=DEFAULT_ARCHIVE_URL_TEMPLATE):
+        self.workspace_dir = Path(workspace_dir)
+        self.url_template = url_template
+        self.archive_url_template = archive_url_template
+        self.mode = mode
+        self.branch = branch
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def repo_url(self, org_name, repo):
+        return self.url_template.format(org=org_name, repo=repo)
+
+    async def _git(self, args, cwd=None, env=None):
+        """Run a git command and return its output; env adds environment variables, such as credentials."""
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0', **(env or {}))
+        process = await asyncio.create_subprocess_exec(
+            'git', *args,
+            cwd=str(cwd) if cwd else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise GitCommandError(args[0], f"timed out after {self.timeout}s")
+
+        if process.returncode != 0:
+            lines = stderr.decode(errors='replace').replace('\r', '\n').strip().splitlines()
+            errors = [line for line in lines if line.startswith(('fatal:', 'error:'))]
+            message = (errors or lines or [f"exit status {process.returncode}"])[0]
+            raise GitCommandError(args[0], message)
+        return stdout.decode(errors='replace')
+
+    async def _head(self, repo_path):
+        if self.mode == 'archive':
+            return await asyncio.to_thread(read_archive_commit, repo_path)
+        try:
+            stdout = await self._git(['rev-parse', 'HEAD'], cwd=repo_path)
+        except (GitCommandError, OSError):
+            return None
+        return stdout.strip()
+
+    async def _clone(self, url, repo_path):
+        temp_path = self.workspace_dir / FETCH_TEMP_DIR / repo_path.name
+        shutil.rmtree(temp_path, ignore_errors=True)
+        temp_path.parent.mkdir(parents=True, exist_ok=True)
+        bare = ['--bare'] if self.mode == 'git' else []
+        await self._git([
+            'clone', *bare, '--depth', '1', '--single-branch', '--branch', self.branch, '--no-tags',
+            url, str(temp_path)
+        ], env=github_auth_env(url))
+        received = object_store_bytes(temp_path)
+        os.replace(temp_path, repo_path)
+        return received
+
+    async def _update(self, url, repo_path):
+        # Fetch from the URL rather than a configured remote so the template applies to existing clones
+        stored = object_store_bytes(repo_path)
+        if self.mode == 'git':
+            # A bare repository has no working tree to reset, so update the branch directly
+            await self._git([
+                'fetch', '--depth', '1', '--no-tags', url, f"+refs/heads/{self.branch}:refs/heads/{self.branch}"
+            ], cwd=repo_path, env=github_auth_env(url))
+        else:
+            await self._git([
+                'fetch', '--depth', '1', '--no-tags', url, self.branch
+            ], cwd=repo_path, env=github_auth_env(url))
+            await self._git(['reset', '--hard', 'FETCH_HEAD'], cwd=repo_path)
+        return max(0, object_store_bytes(repo_path) - stored)
+
+    async def _download_archive(self, org_name, repo, url, repo_path, head_before):
+        """Download a tarball of the branch tip unless it is the commit already stored."""
+        output = await self._git(['ls-remote', url, f"refs/heads/{self.branch}"],
+                                 env=github_auth_env(url))
+        if not output.strip():
+            raise GitCommandError('ls-remote', f"branch {self.branch} not found")
+        commit = output.split()[0]
+        if commit == head_before:
+            return 0
+
+        archive_url = self.archive_url_template.format(org=org_name, repo=repo, commit=commit,
+                                                       branch=self.branch)
+        return await asyncio.to_thread(download, archive_url, repo_path, self.timeout)
+
+    async def fetch_repo(self, org_name, repo, semaphore):
+        """Clone or update one repository, retrying failures, and return its result dict."""
+        repo_path = workspace_entry_path(self.workspace_dir, repo, self.mode)
+        url = self.repo_url(org_name, repo)
+
+        async with semaphore:
+            head_before = await self._head(repo_path) if repo_path.exists() else None
+        cloning = not repo_path.exists()
+        start = time.monotonic()
+        error = None
+
+        for attempt in range(1, self.retries + 2):
+            # The semaphore is only held while git runs, so a failing repository doesn't keep a slot while it waits
+            async with semaphore:
+                try:
+                    if self.mode == 'archive':
+                        received = await self._download_archive(org_name, repo, url, repo_path, head_before)
+                    elif cloning:
+                        received = await self._clone(url, repo_path)
+                    else:
+                        received = await self._update(url, repo_path)
+                    error = None
+                    break
+                except (GitCommandError, OSError) as e:
+                    error = str(e)
+            if attempt > self.retries:
+                break
+            delay = self.backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5)
+            print(f"Attempt {attempt} for {repo} failed, retrying in {delay:.1f}s: {error}")
+            await asyncio.sleep(delay)
+
+        seconds = time.monotonic() - start
+        if error:
+            print(f"Error processing {repo}: {error}")
+            return {'repo': repo, 'success': False, 'head_before': head_before, 'head_after': head_before,
+                    'seconds': seconds, 'bytes': 0, 'attempts': attempt, 'error': error}
+
+        async with semaphore:
+            head_after = await self._head(repo_path)
+        if self.mode == 'archive':
+            action = 'Downloaded' if received else 'Unchanged'
+        else:
+            action = 'Cloned' if cloning else 'Updated'
+        print(f"{action} {repo} in {seconds:.1f}s ({format_bytes(received)})")
+        return {'repo': repo, 'success': True, 'head_before': head_before, 'head_after': head_after,
+                'seconds': seconds, 'bytes': received, 'attempts': attempt, 'error': None}
+
+    async def _fetch_all(self, org_name, repos):
+        self.workspace_dir.mkdir(parents=True, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self.fetch_repo(org_name, repo, semaphore) for repo in repos))
+        shutil.rmtree(self.workspace_dir / FETCH_TEMP_DIR, ignore_errors=True)
+        return results
+
+    def fetch_all(self, org_name, repos):
+        """Clone or update every repository and return their result dicts in the order given."""
+        return asyncio.run(self._fetch_all(org_name, repos))
+
+
+def list_org_repos(org_name, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """List an organization's repository names with the GitHub API, retrying failures.
+
+    Returns None if the list could not be fetched.
+    """
+    cmd = [
+        'gh', 'api',
+        '-H', 'Accept: application/vnd.github+json',
+        '-H', 'X-GitHub-Api-Version: 2022-11-28',
+        f'/orgs/{org_name}/repos',
+        '--jq', '.[].name',
+        '-X', 'GET',
+        '--paginate'
+    ]
+
+    for attempt in range(1, retries + 2):
+        try:
+            output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            return [repo for repo in output.split('\n') if repo]
+        except (subprocess.CalledProcessError, OSError) as e:
+            message = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) else str(e)
+            if attempt > retries:
+                print(f"Error fetching repositories: {message}")
+                return None
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5)
+            print(f"Listing repositories failed, retrying in {delay:.1f}s: {message}")
+            time.sleep(delay)
+
+
+def summarize_fetch(results, slowest=5):
+    """Print totals and the slowest repositories for a list of fetch results."""
+    succeeded = [result for result in results if result['success']]
+    failed = [result for result in results if not result['success']]
+    total_bytes = sum(result['bytes'] for result in results)
+    retried = sum(1 for result in results if result['attempts'] > 1)
+
+    print(f"\nProcessing completed:")
+    print(f"Successfully processed: {len(succeeded)}")
+    print(f"Failed: {len(failed)}")
+    print(f"Retried: {retried}")
+    print(f"Received: {format_bytes(total_bytes)}")
+    if results:
+        print(f"Slowest repositories:")
+        for result in sorted(results, key=lambda result: result['seconds'], reverse=True)[:slowest]:
+            print(f"  {result['repo']}: {result['seconds']:.1f}s, {format_bytes(result['bytes'])}")
+    if failed:
+        print("Failed repositories:")
+        for result in failed:
+            print(f"  {result['repo']}: {result['error']}")
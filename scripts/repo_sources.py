@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Readers for the files extraction needs from each vehicle repository.
+
+Extraction only reads signalsets/v3/*.json, service01/modelyears.json and
+generations.y(a)ml, so a repository doesn't need a checked-out working tree.
+It can be present in the workspace in one of three forms, one per ingest mode:
+
+    worktree   workspace/<repo>/          a regular clone, read from disk
+    git        workspace/<repo>.git/      a bare clone, read from its git objects
+    archive    workspace/<repo>.tar.gz    a snapshot archive, streamed once
+
+Every form is read through a source with the same small interface: list the
+signalset files, read a file by its path in the repository, and give a digest
+of a file's content for the extraction cache. The digest is the file's git
+blob id in every form, so the cache is shared between ingest modes, and git
+object sources recognize unchanged files without reading them.
+
+Git and archive sources also know the commit they were taken from, which lets
+the extractor reuse a whole repository's cached results without reading any of
+its files.
+"""
+
+import hashlib
+import subprocess
+import tarfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+INGEST_MODES = ('worktree', 'git', 'archive')
+
+SIGNALSET_DIR = 'signalsets/v3'
+MODEL_YEARS_PATH = 'service01/modelyears.json'
+GENERATIONS_PATHS = ('generations.yml', 'generations.yaml')
+
+GIT_SUFFIX = '.git'
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar')
+
+
+def is_needed_path(path):
+    """Whether a path in a repository is one of the files extraction reads."""
+    if path == MODEL_YEARS_PATH or path in GENERATIONS_PATHS:
+        return True
+    directory, _, name = path.rpartition('/')
+    return directory == SIGNALSET_DIR and name.endswith('.json')
+
+
+def repo_name(path):
+    """Repository name of a workspace entry, without any .git or archive suffix."""
+    name = Path(path).name
+    for suffix in (GIT_SUFFIX,) + ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def workspace_entry_mode(path):
+    """Return the ingest mode a workspace entry belongs to, or None if it isn't a repository."""
+    path = Path(path)
+    if path.name.startswith('.'):
+        return None
+    if path.is_dir():
+        if path.name.endswith(GIT_SUFFIX) and (path / 'objects').is_dir():
+            return 'git'
+        return 'worktree'
+    if path.is_file() and path.name.endswith(ARCHIVE_SUFFIXES):
+        return 'archive'
+    return None
+
+
+def workspace_entry_path(workspace_dir, repo, mode):
+    """Path of a repository in the workspace for an ingest mode."""
+    suffix = {'worktree': '', 'git': GIT_SUFFIX, 'archive': '.tar.gz'}[mode]
+    return Path(workspace_dir) / f"{repo}{suffix}"
+
+
+def blob_id(content):
+    """Return the id git gives a blob with this content."""
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+class RepoSource(ABC):
+    """Common interface of the repository sources."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = repo_name(path)
+
+    @abstractmethod
+    def has_signalsets(self):
+        """Whether the repository has a signalsets directory."""
+
+    @abstractmethod
+    def list_signalsets(self):
+        """Return the signalset file names, sorted."""
+
+    @abstractmethod
+    def read(self, path):
+        """Return the content of a file by its path in the repository, or None if it doesn't exist."""
+
+    def digest(self, path):
+        """Return the git blob id of a file's content, or None if it doesn't exist."""
+        content = self.read(path)
+        return None if content is None else f"git:{blob_id(content)}"
+
+    def head(self):
+        """Return the commit the content was taken from, or None if it isn't known."""
+        return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class WorkingTreeSource(RepoSource):
+    """A checked-out repository. Its files may differ from any commit, so head() is None."""
+
+    def has_signalsets(self):
+        return (self.path / SIGNALSET_DIR).is_dir()
+
+    def list_signalsets(self):
+        return sorted(path.name for path in (self.path / SIGNALSET_DIR).glob('*.json'))
+
+    def read(self, path):
+        try:
+            return (self.path / path).read_bytes()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+
+class GitObjectSource(RepoSource):
+    """A bare (or any) git repository, read at a revision without checking anything out."""
+
+    def __init__(self, path, rev='HEAD'):
+        super().__init__(path)
+        self.rev = rev
+        self._batch = None
+        self.blobs = {}
+
+        # One ls-tree call lists the blob id of every needed file
+        output = self._git('ls-tree', '-r', '-z', rev, '--', SIGNALSET_DIR, MODEL_YEARS_PATH,
+                           *GENERATIONS_PATHS)
+        for entry in output.split(b'\0'):
+            if not entry:
+                continue
+            info, _, file_path = entry.partition(b'\t')
+            _, object_type, object_id = info.split()
+            file_path = file_path.decode('utf-8')
+            if object_type == b'blob' and is_needed_path(file_path):
+                self.blobs[file_path] = object_id.decode('ascii')
+
+    def _git(self, *args):
+        return subprocess.run(['git', '--git-dir', str(self.path), *args],
+                              check=True, capture_output=True).stdout
+
+    def has_signalsets(self):
+        return any(path.startswith(SIGNALSET_DIR + '/') for path in self.blobs)
+
+    def list_signalsets(self):
+        return sorted(path.rpartition('/')[2] for path in self.blobs if path.startswith(SIGNALSET_DIR + '/'))
+
+    def read(self, path):
+        object_id = self.blobs.get(path)
+        if object_id is None:
+            return None
+
+        # A single cat-file --batch process serves every read
+        if self._batch is None:
+            self._batch = subprocess.Popen(['git', '--git-dir', str(self.path), 'cat-file', '--batch'],
+                                           stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._batch.stdin.write(object_id.encode('ascii') + b'\n')
+        self._batch.stdin.flush()
+        header = self._batch.stdout.readline().split()
+        if len(header) != 3:
+            raise OSError(f"git cat-file failed for {path} in {self.path}")
+        content = self._batch.stdout.read(int(header[2]))
+        self._batch.stdout.read(1)
+        return content
+
+    def digest(self, path):
+        object_id = self.blobs.get(path)
+        return None if object_id is None else f"git:{object_id}"
+
+    def head(self):
+        try:
+            return self._git('rev-parse', self.rev).decode('ascii').strip()
+        except subprocess.CalledProcessError:
+            return None
+
+    def close(self):
+        if self._batch is not None:
+            self._batch.stdin.close()
+            self._batch.wait()
+            self._batch = None
+
+
+def read_archive_commit(path):
+    """Return the commit id git stores in an archive's pax header, or None."""
+    try:
+        with tarfile.open(path, 'r|*') as archive:
+            archive.next()
+            return archive.pax_headers.get('comment')
+    except (OSError, tarfile.TarError):
+        return None
+
+
+class ArchiveSource(RepoSource):
+    """A tar snapshot of a repository, such as GitHub's tarball or git archive output.
+
+    The archive is streamed once and only the needed members are kept. Members
+    may sit under a single top-level directory, as in GitHub's tarballs.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.files = {}
+        with tarfile.open(self.path, 'r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                file_path = member.name[2:] if member.name.startswith('./') else member.name
+                if not is_needed_path(file_path):
+                    file_path = file_path.partition('/')[2]
+                    if not is_needed_path(file_path):
+                        continue
+                self.files[file_path] = archive.extractfile(member).read()
+            self.commit = archive.pax_headers.get('comment')
+
+    def has_signalsets(self):
+        return any(path.startswith(SIGNALSET_DIR + '/') for path in self.files)
+
+    def list_signalsets(self):
+        return sorted(path.rpartition('/')[2] for path in self.files if path.startswith(SIGNALSET_DIR + '/'))
+
+    def read(self, path):
+        return self.files.get(path)
+
+    def head(self):
+        return self.commit
+
+
+def open_repo_source(path):
+    """Open the source for a workspace entry, choosing the reader from its form."""
+    mode = workspace_entry_mode(path)
+    if mode == 'git':
+        return GitObjectSource(path)
+    if mode == 'archive':
+        return ArchiveSource(path)
+    return WorkingTreeSource(path)
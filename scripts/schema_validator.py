@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Compiled validator for the draft-07 subset used by the OBDb Explorer schemas.
+
+compile_schema() turns a schema into a tree of small closures, one per
+keyword, so validating a record is a handful of dict lookups and type checks
+instead of a walk through jsonschema's generic keyword dispatch. Subschemas
+that use keywords outside the supported subset are handed to jsonschema, so
+the result never silently accepts something jsonschema would reject.
+
+The compiled validator exposes iter_errors() like a jsonschema validator and
+reports every error in a record rather than stopping at the first one.
+"""
+
+from collections import namedtuple
+
+# Keywords that carry no validation semantics
+ANNOTATION_KEYWORDS = {'$schema', '$id', 'title', 'description', 'default', 'examples', '$comment'}
+
+SUPPORTED_KEYWORDS = ANNOTATION_KEYWORDS | {
+    'type', 'properties', 'additionalProperties', 'required', 'items',
+    'minItems', 'maxItems', 'minimum', 'maximum', 'enum',
+}
+
+ValidationIssue = namedtuple('ValidationIssue', ['path', 'message'])
+
+
+def _is_integer(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    return isinstance(value, float) and value.is_integer()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Same type semantics as jsonschema's draft-07 type checker
+TYPE_CHECKS = {
+    'string': lambda value: isinstance(value, str),
+    'integer': _is_integer,
+    'number': _is_number,
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+    'array': lambda value: isinstance(value, list),
+    'object': lambda value: isinstance(value, dict),
+}
+
+# Exact Python types that satisfy each schema type without further checks
+EXACT_TYPES = {
+    'string': {str},
+    'integer': {int},
+    'number': {int, float},
+    'boolean': {bool},
+    'null': {type(None)},
+    'array': {list},
+    'object': {dict},
+}
+
+
+def _compile_type(expected):
+    names = [expected] if isinstance(expected, str) else list(expected)
+    exact = set().union(*(EXACT_TYPES[name] for name in names))
+    checks = [TYPE_CHECKS[name] for name in names]
+    description = ', '.join(repr(name) for name in names)
+
+    def check(value, path, errors):
+        if type(value) in exact or any(test(value) for test in checks):
+            return True
+        errors.append(ValidationIssue(path, f"{value!r} is not of type {description}"))
+        return False
+
+    return check
+
+
+def _compile_generic(schema):
+    """Validate a subschema with jsonschema when it uses unsupported keywords."""
+    import jsonschema
+
+    validator = jsonschema.Draft7Validator(schema)
+
+    def check(value, path, errors):
+        for error in validator.iter_errors(value):
+            errors.append(ValidationIssue(path + tuple(error.absolute_path), error.message))
+
+    return check
+
+
+def _compile(schema):
+    if schema is True or schema == {}:
+        return None
+    if schema is False:
+        return lambda value, path, errors: errors.append(
+            ValidationIssue(path, f"False schema does not allow {value!r}"))
+    if set(schema) - SUPPORTED_KEYWORDS:
+        return _compile_generic(schema)
+
+    checks = []
+
+    type_check = _compile_type(schema['type']) if 'type' in schema else None
+
+    if 'enum' in schema:
+        options = schema['enum']
+
+        def check_enum(value, path, errors):
+            if value not in options:
+                errors.append(ValidationIssue(path, f"{value!r} is not one of {options!r}"))
+        checks.append(check_enum)
+
+    if 'minimum' in schema or 'maximum' in schema:
+        minimum = schema.get('minimum')
+        maximum = schema.get('maximum')
+
+        def check_range(value, path, errors):
+            if not _is_number(value):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(ValidationIssue(path, f"{value!r} is less than the minimum of {minimum!r}"))
+            if maximum is not None and value > maximum:
+                errors.append(ValidationIssue(path, f"{value!r} is greater than the maximum of {maximum!r}"))
+        checks.append(check_range)
+
+    if 'items' in schema or 'minItems' in schema or 'maxItems' in schema:
+        if isinstance(schema.get('items'), list):
+            return _compile_generic(schema)
+        item_check = _compile(schema.get('items', True))
+        min_items = schema.get('minItems')
+        max_items = schema.get('maxItems')
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(ValidationIssue(path, f"{value!r} is too short"))
+            if max_items is not None and len(value) > max_items:
+                errors.append(ValidationIssue(path, f"{value!r} is too long"))
+            if item_check is not None:
+                for index, item in enumerate(value):
+                    item_check(item, path + (index,), errors)
+        checks.append(check_array)
+
+    if 'properties' in schema or 'required' in schema or 'additionalProperties' in schema:
+        property_checks = {
+            name: _compile(subschema) for name, subschema in schema.get('properties', {}).items()
+        }
+        required = schema.get('required', [])
+        additional = schema.get('additionalProperties', True)
+        additional_check = None if additional is False else _compile(additional)
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(ValidationIssue(path, f"{name!r} is a required property"))
+            unexpected = []
+            for name, item in value.items():
+                if name in property_checks:
+                    check = property_checks[name]
+                elif additional is False:
+                    unexpected.append(name)
+                    continue
+                else:
+                    check = additional_check
+                if check is not None:
+                    check(item, path + (name,), errors)
+            if unexpected:
+                names = ', '.join(repr(name) for name in unexpected)
+                verb = 'was' if len(unexpected) == 1 else 'were'
+                errors.append(ValidationIssue(
+                    path, f"Additional properties are not allowed ({names} {verb} unexpected)"))
+        checks.append(check_object)
+
+    def check(value, path, errors):
+        # Like jsonschema, the other keywords are still applied after a type mismatch
+        if type_check is not None:
+            type_check(value, path, errors)
+        for keyword_check in checks:
+            keyword_check(value, path, errors)
+
+    if not checks:
+        return type_check
+    return check
+
+
+class CompiledValidator:
+    """Validator built once from a schema and reused for every instance."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._check = _compile(schema)
+
+    def iter_errors(self, instance):
+        """Yield a ValidationIssue for every problem found in the instance."""
+        if self._check is None:
+            return iter(())
+        errors = []
+        self._check(instance, (), errors)
+        return iter(errors)
+
+    def is_valid(self, instance):
+        return next(self.iter_errors(instance), None) is None
+
+
+def compile_schema(schema):
+    """Compile a JSON schema into a reusable CompiledValidator."""
+    return CompiledValidator(schema)
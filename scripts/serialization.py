@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+JSON and YAML loading and dumping with optional fast backends.
+
+The extractor spends much of its time loading signalsets and encoding records.
+This module uses orjson or ujson for JSON and libyaml's CSafeLoader for YAML
+when they are installed (pip install orjson), and the standard library
+otherwise. Either way the results are the same as with json and
+yaml.safe_load:
+
+- loads() falls back to json.loads() whenever the fast backend rejects the
+  input, such as NaN literals or non UTF-8 bytes, so anything json accepts is
+  still accepted and errors are still json's. Input with a run of 19 or more
+  digits, which could be an integer beyond 64 bits that some versions of
+  orjson decode as a float, is parsed with json too.
+- dumps() only produces compact output (separators=(',', ':')). The fast
+  backends format some floats differently from json, such as those in
+  exponent notation and NaN, so any output that could contain one of those is
+  encoded again with json. Non-ASCII characters are escaped the way json's
+  ensure_ascii does. Output is byte-identical to
+  json.dumps(obj, separators=(',', ':'), sort_keys=..., ensure_ascii=...).
+
+tests/test_serialization.py checks every installed backend against json on
+a set of edge cases. Setting OBDB_JSON_BACKEND=json forces the standard
+library.
+"""
+
+import json
+import os
+import re
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+if orjson is not None:
+    # Types json can't encode are passed through so they raise instead of being encoded
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+    ORJSON_SORTED_OPTIONS = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS
+
+# Exponents as the fast backends write them, e.g. 1e16 or 5e-324, where json writes 1e+16
+EXPONENT = re.compile(rb'e[-+0-9]')
+
+# Characters json escapes with ensure_ascii, which the fast backends write as UTF-8
+NON_ASCII_BYTES = re.compile(rb'[^\x00-\x7e]')
+NON_ASCII = re.compile('[^\x00-\x7e]')
+
+# Digit runs long enough to be an integer beyond 64 bits
+LONG_NUMBER = re.compile(rb'[0-9]{19}')
+LONG_NUMBER_TEXT = re.compile('[0-9]{19}')
+
+def _std_loads(content):
+    return json.loads(content)
+
+
+def _std_dumps(obj, sort_keys=False, ensure_ascii=True):
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+
+
+def _escape_non_ascii(match):
+    # The same escapes as json's ensure_ascii, with surrogate pairs beyond the BMP
+    code = ord(match.group())
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+
+def _fast_loads(backend_loads):
+    def loads(content):
+        if (LONG_NUMBER_TEXT if isinstance(content, str) else LONG_NUMBER).search(content):
+            return json.loads(content)
+        try:
+            return backend_loads(content)
+        except (ValueError, TypeError, OverflowError):
+            return json.loads(content)
+    return loads
+
+
+def _may_differ(output):
+    """
+    Whether fast backend output may differ from json's.
+
+    That is output with a float in exponent notation, a float below 1e-4 (which
+    json writes in exponent notation) or null (which orjson writes for NaN).
+    These are checked with substring searches rather than by parsing, so a
+    string that happens to contain one of them just goes through json too.
+    """
+    return b'null' in output or b'0.0000' in output or EXPONENT.search(output) is not None
+
+
+def _fast_dumps(backend_dumps):
+    def dumps(obj, sort_keys=False, ensure_ascii=True):
+        try:
+            output = backend_dumps(obj, sort_keys)
+        except (TypeError, ValueError, OverflowError):
+            return _std_dumps(obj, sort_keys, ensure_ascii)
+        if _may_differ(output):
+            return _std_dumps(obj, sort_keys, ensure_ascii)
+        if ensure_ascii and NON_ASCII_BYTES.search(output):
+            return NON_ASCII.sub(_escape_non_ascii, output.decode('utf-8'))
+        return output.decode('utf-8')
+    return dumps
+
+
+def _orjson_dumps(obj, sort_keys):
+    return orjson.dumps(obj, option=ORJSON_SORTED_OPTIONS if sort_keys else ORJSON_OPTIONS)
+
+
+def _ujson_dumps(obj, sort_keys):
+    # NaN and Infinity raise, so they are left to json
+    return ujson.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, escape_forward_slashes=False,
+                       reject_bytes=True, allow_nan=False).encode('utf-8')
+
+
+def available_backends():
+    """Return the (name, loads, dumps) of each installed fast JSON backend, in order of preference."""
+    backends = []
+    if orjson is not None:
+        backends.append(('orjson', _fast_loads(orjson.loads), _fast_dumps(_orjson_dumps)))
+    if ujson is not None:
+        backends.append(('ujson', _fast_loads(ujson.loads), _fast_dumps(_ujson_dumps)))
+    return backends
+
+
+def _select_backend():
+    """Return the name, loads and dumps of the preferred backend, or of json if there is none."""
+    backends = available_backends()
+    if backends and os.environ.get('OBDB_JSON_BACKEND', '') != 'json':
+        return backends[0]
+    return 'json', _std_loads, _std_dumps
+
+
+JSON_BACKEND, loads, dumps = _select_backend()
+loads.__doc__ = "Parse JSON from a str or bytes, exactly like json.loads()."
+dumps.__doc__ = "Encode obj as compact JSON, exactly like json.dumps() with separators=(',', ':')."
+
+
+def load(f):
+    """Parse JSON from an open file, exactly like json.load()."""
+    return loads(f.read())
+
+
+def dump(obj, f, sort_keys=False, ensure_ascii=True):
+    """Write obj to an open text file as compact JSON, exactly like json.dump() with compact separators."""
+    f.write(dumps(obj, sort_keys, ensure_ascii))
+
+
+def load_yaml(content):
+    """Parse YAML like yaml.safe_load(), with libyaml's C loader when it is available."""
+    return yaml.load(content, Loader=YAML_LOADER)
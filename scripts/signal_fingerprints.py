@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Signal definitions shared across vehicles.
+
+Sibling models often have identical commands and signals. SignalFingerprintIndex
+is an output sink for validate_json.write_normalized_stream() that fingerprints
+each parameter's command (its hdr, eax and cmd) and its whole signal definition,
+which is the record without the fields that belong to the vehicle (make, model,
+modelYears and signalGroups). Every distinct definition is stored once with
+the vehicles that have it:
+
+    {
+      "version": 1,
+      "commands": {"3f2a...": {"hdr": "7E0", "eax": "", "cmd": {"01": "0C"}, "vehicles": [...]}},
+      "signals": {"9c41...": {"command": "3f2a...", "definition": {...}, "vehicles": [...]}},
+      "vehicles": {"Ford-Transit-Connect": {"FORD_SOC": ["9c41..."], ...}},
+      "clusters": [{"vehicles": [...], "similarity": 0.96, "shared_signals": 212}]
+    }
+
+so which vehicles share a vehicle's exact signal is two lookups (see
+vehicles_sharing()). Vehicles are clustered by the Jaccard similarity of their
+sets of signal definitions: vehicles at least --similarity alike are linked,
+and each cluster lists the lowest similarity between two of its vehicles and
+the number of definitions all of them share.
+
+Usage:
+    python signal_fingerprints.py --input public/data/matrix_data.json --output signal_fingerprints.json
+    python signal_fingerprints.py --index signal_fingerprints.json --vehicle Ford-Transit-Connect --signal FORD_SOC
+    python signal_fingerprints.py --index signal_fingerprints.json --clusters
+"""
+
+import argparse
+import hashlib
+import os
+
+from data_shards import vehicle_id
+from serialization import dumps, load
+
+FINGERPRINT_VERSION = 1
+
+# Length of the hex fingerprints; 64 bits leave collisions out of reach at OBDb's scale
+FINGERPRINT_LENGTH = 16
+
+# Record fields that describe the vehicle rather than the signal
+VEHICLE_FIELDS = frozenset(['make', 'model', 'modelYears', 'signalGroups'])
+
+# Vehicles at least this alike (Jaccard similarity of their signal definitions) are clustered
+DEFAULT_SIMILARITY = 0.9
+
+
+def fingerprint(encoded):
+    """Fingerprint the canonical encoding of a normalized value."""
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=FINGERPRINT_LENGTH // 2).hexdigest()
+
+
+def signal_definition(record):
+    """Return a normalized record without the fields that belong to the vehicle."""
+    return {key: value for key, value in record.items() if key not in VEHICLE_FIELDS}
+
+
+class SignalFingerprintIndex:
+    """
+    Collect command and signal fingerprints, and the vehicles of each, from normalized records.
+
+    Definitions are kept as their canonical encoding, which is both what is
+    fingerprinted and what is written, so each is encoded only once.
+    """
+
+    def __init__(self):
+        self.commands = {}
+        self.signals = {}
+        self.vehicles = {}
+
+    def add(self, record, line=None):
+        """Add one normalized record; the encoded line is accepted for use as an output sink."""
+        vehicle = vehicle_id(record.get('make', ''), record.get('model', ''))
+
+        definition = dumps(signal_definition(record))
+        signal_fingerprint = fingerprint(definition)
+        entry = self.signals.get(signal_fingerprint)
+        if entry is None:
+            # The command is part of the definition, so it only needs fingerprinting for new definitions
+            command = {'hdr': record.get('hdr', ''), 'eax': record.get('eax', ''), 'cmd': record.get('cmd', {})}
+            command_fingerprint = fingerprint(dumps(command))
+            if command_fingerprint not in self.commands:
+                self.commands[command_fingerprint] = dict(command, vehicles=set())
+            entry = self.signals[signal_fingerprint] = {
+                'command': command_fingerprint, 'definition': definition, 'vehicles': set()
+            }
+        entry['vehicles'].add(vehicle)
+        self.commands[entry['command']]['vehicles'].add(vehicle)
+
+        signals = self.vehicles.setdefault(vehicle, {})
+        fingerprints = signals.setdefault(record.get('id', ''), [])
+        if signal_fingerprint not in fingerprints:
+            fingerprints.append(signal_fingerprint)
+
+    def clusters(self, threshold=DEFAULT_SIMILARITY):
+        """
+        Group vehicles whose signal definitions are at least threshold alike.
+
+        Each vehicle's definitions are a bitset, so the size of an intersection
+        is one AND and a popcount. Vehicles are compared in order of size, and
+        a pair is skipped when their sizes alone rule out the threshold.
+        """
+        positions = {signal_fingerprint: position for position, signal_fingerprint in enumerate(self.signals)}
+        bitsets = {}
+        for vehicle, signals in self.vehicles.items():
+            # Set bits in a bytearray; growing an int one bit at a time would copy it every time
+            bitmap = bytearray(len(positions) // 8 + 1)
+            for fingerprints in signals.values():
+                for signal_fingerprint in fingerprints:
+                    position = positions[signal_fingerprint]
+                    bitmap[position >> 3] |= 1 << (position & 7)
+            bitsets[vehicle] = int.from_bytes(bitmap, 'little')
+        sizes = {vehicle: bitset.bit_count() for vehicle, bitset in bitsets.items()}
+
+        def similarity(a, b):
+            shared = (bitsets[a] & bitsets[b]).bit_count()
+            return shared / (sizes[a] + sizes[b] - shared)
+
+        parents = {vehicle: vehicle for vehicle in bitsets}
+
+        def find(vehicle):
+            while parents[vehicle] != vehicle:
+                parents[vehicle] = parents[parents[vehicle]]
+                vehicle = parents[vehicle]
+            return vehicle
+
+        ordered = sorted(bitsets, key=lambda vehicle: (sizes[vehicle], vehicle))
+        for i, vehicle in enumerate(ordered):
+            for other in ordered[i + 1:]:
+                # Similarity is at most the ratio of the sizes, which only falls from here
+                if sizes[vehicle] < threshold * sizes[other]:
+                    break
+                if similarity(vehicle, other) >= threshold:
+                    parents[find(vehicle)] = find(other)
+
+        groups = {}
+        for vehicle in ordered:
+            groups.setdefault(find(vehicle), []).append(vehicle)
+
+        clusters = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            members.sort()
+            shared = bitsets[members[0]]
+            for vehicle in members[1:]:
+                shared &= bitsets[vehicle]
+            clusters.append({
+                'vehicles': members,
+                'similarity': round(min(similarity(a, b) for i, a in enumerate(members) for b in members[i + 1:]), 4),
+                'shared_signals': shared.bit_count()
+            })
+        clusters.sort(key=lambda cluster: (-len(cluster['vehicles']), cluster['vehicles']))
+        return clusters
+
+    def write(self, output_path, threshold=DEFAULT_SIMILARITY):
+        """
+        Write the index and return its clusters.
+
+        The file is the same as dumping the whole index with sorted keys, but
+        the encoded definitions are written as they are.
+        """
+        clusters = self.clusters(threshold)
+        commands = {
+            command_fingerprint: dict(entry, vehicles=sorted(entry['vehicles']))
+            for command_fingerprint, entry in self.commands.items()
+        }
+        vehicles = {
+            vehicle: {signal_id: sorted(fingerprints) for signal_id, fingerprints in signals.items()}
+            for vehicle, signals in self.vehicles.items()
+        }
+
+        with open(output_path, 'w') as f:
+            f.write(f'{{"clusters":{dumps(clusters, sort_keys=True)},"commands":{dumps(commands, sort_keys=True)}')
+            f.write(',"signals":{')
+            for index, signal_fingerprint in enumerate(sorted(self.signals)):
+                entry = self.signals[signal_fingerprint]
+                f.write(f'{"," if index else ""}"{signal_fingerprint}":{{"command":"{entry["command"]}",'
+                        f'"definition":{entry["definition"]},"vehicles":{dumps(sorted(entry["vehicles"]))}}}')
+            f.write(f'}},"vehicles":{dumps(vehicles, sort_keys=True)},"version":{FINGERPRINT_VERSION}}}')
+        return clusters
+
+
+def load_fingerprint_index(index_path):
+    """Load an index written by SignalFingerprintIndex."""
+    with open(index_path) as f:
+        index = load(f)
+    if index.get('version') != FINGERPRINT_VERSION:
+        raise ValueError(f"Unsupported signal fingerprint index version: {index.get('version')}")
+    return index
+
+
+def vehicles_sharing(index, vehicle, signal_id):
+    """Return the other vehicles with exactly the same definition of one of a vehicle's signals."""
+    vehicles = set()
+    for signal_fingerprint in index['vehicles'].get(vehicle, {}).get(signal_id, []):
+        vehicles.update(index['signals'][signal_fingerprint]['vehicles'])
+    vehicles.discard(vehicle)
+    return sorted(vehicles)
+
+
+def print_clusters(clusters):
+    for cluster in clusters:
+        print(f"{len(cluster['vehicles'])} vehicles, {cluster['similarity']:.0%} alike, "
+              f"{cluster['shared_signals']} shared signals: {', '.join(cluster['vehicles'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the index of signal definitions shared by vehicles')
+    parser.add_argument('--input', help='matrix_data.json to build the index from')
+    parser.add_argument('--output', help='Index file to write with --input')
+    parser.add_argument('--similarity', type=float, default=DEFAULT_SIMILARITY,
+                        help=f'Least similarity of clustered vehicles (default: {DEFAULT_SIMILARITY})')
+    parser.add_argument('--index', help='Index file to query')
+    parser.add_argument('--vehicle', help='Vehicle (Make-Model) whose signal to look up')
+    parser.add_argument('--signal', help='Signal id to find in other vehicles, with --vehicle')
+    parser.add_argument('--clusters', action='store_true', help='Print the clusters of similar vehicles')
+    args = parser.parse_args()
+
+    if args.input:
+        if not args.output:
+            parser.error('--input needs --output')
+        with open(args.input) as f:
+            records = load(f)
+        builder = SignalFingerprintIndex()
+        for record in records:
+            builder.add(record)
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        clusters = builder.write(args.output, args.similarity)
+        print(f"Saved {len(builder.signals)} distinct signal definitions of {len(records)} parameters "
+              f"and {len(clusters)} vehicle clusters to {args.output}")
+        index = load_fingerprint_index(args.output) if args.vehicle or args.clusters else None
+    elif args.index:
+        index = load_fingerprint_index(args.index)
+    else:
+        parser.error('give --input and --output, or --index')
+
+    if args.vehicle and args.signal:
+        vehicles = vehicles_sharing(index, args.vehicle, args.signal)
+        for vehicle in vehicles:
+            print(vehicle)
+        print(f"{len(vehicles)} other vehicles share {args.vehicle}'s definition of {args.signal}")
+    if args.clusters:
+        print_clusters(index['clusters'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic workspace shaped like the cloned OBDb vehicle repositories.
+
+Each repository gets signalsets/v3/default.json plus optional model-year
+signalsets, and some get service01/modelyears.json and generations.yml, so
+extract_data.py can run against it without cloning the real organization.
+Signal ids follow the real naming scheme (<MODEL>_<FAMILY>_<POSITION>) and
+signal groups use the same kinds of regexes as the real repositories, such as
+per-wheel alternations and numbered battery cells with capture groups.
+
+Output is fully determined by the options and the seed, so two workspaces
+generated with the same arguments are identical.
+
+Usage:
+    python synthetic_workspace.py --output /tmp/obdb-workspace --repos 300
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+MAKES = ['Ford', 'Toyota', 'Hyundai', 'Kia', 'Chevrolet', 'Nissan', 'Volkswagen', 'Subaru', 'Honda', 'Tesla']
+
+HEADERS = ['7E0', '7E2', '7E4', '7E5', '750', '720', '7B0', '7C0']
+
+UNITS = ['celsius', 'kilometersPerHour', 'percent', 'volts', 'amps', 'kilopascal', 'bars', 'kilometers']
+
+METRICS = ['speed', 'stateOfCharge', 'odometer', 'batteryVoltage', 'fuelTankLevel', 'cabinTemperature']
+
+WHEELS = ['FL', 'FR', 'RL', 'RR']
+
+# Signal families: (id family, name, unit, positions, group id, group regex template, group path)
+SIGNAL_FAMILIES = [
+    ('TP', 'Tire pressure', 'kilopascal', WHEELS, 'TP', r'{tag}_TP_(FL|FR|RL|RR)$', 'Tires'),
+    ('TT', 'Tire temperature', 'celsius', WHEELS, 'TT', r'{tag}_TT_(FL|FR|RL|RR)$', 'Tires'),
+    ('WHL_SPD', 'Wheel speed', 'kilometersPerHour', WHEELS, 'WHL_SPD', r'{tag}_WHL_SPD_(\w{{2}})', 'Chassis'),
+    ('DOOR', 'Door open', None, WHEELS, 'DOOR', r'^{tag}_DOOR_(FL|FR|RL|RR)$', 'Doors'),
+    ('CELL_V', 'Cell voltage', 'volts', [f"{i:02d}" for i in range(1, 97)], 'CELL_V',
+     r'{tag}_CELL_V_(\d+)', 'Battery.Cells'),
+    ('CELL_T', 'Cell temperature', 'celsius', [f"{i:02d}" for i in range(1, 17)], 'CELL_T',
+     r'{tag}_CELL_T_(\d+)', 'Battery.Cells'),
+]
+
+# Signals that don't belong to any group
+SCALAR_SIGNALS = ['ODO', 'SPEED', 'SOC', 'SOH', 'HVBAT_V', 'HVBAT_A', 'AAT', 'CABIN_T', 'FLI', 'RPM', 'ECT', 'GEAR',
+                  'RANGE', 'CHG_STATE', 'VIN', 'IGN']
+
+DEFAULTS = {
+    'repos': 300,
+    'signalsets': 3,
+    'commands': 20,
+    'signals': 6,
+    'signal_groups': 4,
+    'seed': 1,
+}
+
+
+def make_format(rng, unit):
+    fmt = {'len': rng.choice([1, 8, 8, 16, 16, 24]), 'bix': rng.choice([0, 0, 8, 16, 24])}
+    if unit:
+        fmt['unit'] = unit
+    if rng.random() < 0.5:
+        fmt['mul'] = rng.choice([0.1, 0.25, 0.5, 2, 10])
+    if rng.random() < 0.3:
+        fmt['div'] = rng.choice([10, 100, 1000, 3])
+    if rng.random() < 0.3:
+        fmt['add'] = rng.choice([-40, -1.5, -100])
+    if rng.random() < 0.3:
+        fmt['max'] = rng.choice([255, 1000, 65535])
+    if rng.random() < 0.1:
+        fmt['min'] = 0
+    if fmt['len'] == 1 and rng.random() < 0.5:
+        fmt = {'len': 1, 'bix': fmt['bix'], 'map': {'0': {'description': 'Off', 'value': 'OFF'},
+                                                    '1': {'description': 'On', 'value': 'ON'}}}
+    return fmt
+
+
+def make_signal(rng, tag, family_signals):
+    """Build one signal, drawing either from a grouped family or from the scalar signals."""
+    if family_signals and rng.random() < 0.6:
+        family, name, unit, positions = rng.choice(family_signals)
+        position = rng.choice(positions)
+        signal = {'id': f"{tag}_{family}_{position}", 'name': f"{name} {position}",
+                  'fmt': make_format(rng, unit)}
+    else:
+        base = rng.choice(SCALAR_SIGNALS)
+        signal = {'id': f"{tag}_{base}", 'name': base.replace('_', ' ').title(),
+                  'fmt': make_format(rng, rng.choice(UNITS + [None]))}
+        if rng.random() < 0.4:
+            signal['suggestedMetric'] = rng.choice(METRICS)
+    if rng.random() < 0.7:
+        signal['path'] = rng.choice(['Engine', 'Battery', 'Trips', 'Climate', 'Chassis'])
+    return signal
+
+
+def make_signalset(rng, tag, commands, signals, signal_groups):
+    families = rng.sample(SIGNAL_FAMILIES, min(signal_groups, len(SIGNAL_FAMILIES)))
+    family_signals = [(family, name, unit, positions) for family, name, unit, positions, *_ in families]
+
+    command_list = []
+    for _ in range(max(1, int(rng.gauss(commands, commands / 4)))):
+        did = f"{rng.randint(0, 0xFFFF):04X}"
+        command = {
+            'hdr': rng.choice(HEADERS),
+            'cmd': {'22': did} if rng.random() < 0.9 else {'21': did[:2]},
+            'freq': rng.choice([0.25, 1, 5, 10]),
+            'signals': [make_signal(rng, tag, family_signals)
+                        for _ in range(max(1, int(rng.gauss(signals, signals / 3))))]
+        }
+        if rng.random() < 0.1:
+            command['eax'] = rng.choice(['40', '60'])
+        if rng.random() < 0.05:
+            command['dbg'] = True
+        command_list.append(command)
+
+    data = {'commands': command_list}
+    if families:
+        data['signalGroups'] = [{
+            'id': f"{tag}_{group_id}",
+            'name': name,
+            'path': path,
+            'matchingRegex': regex.format(tag=tag),
+            'suggestedMetricGroup': group_id.lower()
+        } for _, name, _, _, group_id, regex, path in families]
+    return data
+
+
+def generate_workspace(output_dir, repos=DEFAULTS['repos'], signalsets=DEFAULTS['signalsets'],
+                       commands=DEFAULTS['commands'], signals=DEFAULTS['signals'],
+                       signal_groups=DEFAULTS['signal_groups'], seed=DEFAULTS['seed']):
+    """
+    Write a synthetic workspace and return counts of what was generated.
+
+    signalsets is the most signalset files per repository, commands and signals
+    are the mean commands per signalset and signals per command, and
+    signal_groups is the number of signal groups per signalset.
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    stats = {'repos': 0, 'signalsets': 0, 'commands': 0, 'signals': 0}
+
+    for index in range(repos):
+        make = MAKES[index % len(MAKES)]
+        model = f"Model-{index:05d}"
+        tag = f"{make[:3].upper()}{index:05d}"
+        repo_dir = output_dir / f"{make}-{model}"
+        signalset_dir = repo_dir / 'signalsets' / 'v3'
+        signalset_dir.mkdir(parents=True, exist_ok=True)
+
+        names = ['default.json']
+        start_year = rng.randint(2005, 2020)
+        for _ in range(rng.randint(0, max(0, signalsets - 1))):
+            end_year = start_year + rng.randint(1, 4)
+            names.append(f"{start_year}-{end_year}.json")
+            start_year = end_year + 1
+
+        for name in names:
+            data = make_signalset(rng, tag, commands, signals, signal_groups)
+            (signalset_dir / name).write_text(json.dumps(data, indent=2))
+            stats['signalsets'] += 1
+            stats['commands'] += len(data['commands'])
+            stats['signals'] += sum(len(command['signals']) for command in data['commands'])
+
+        if rng.random() < 0.5:
+            (repo_dir / 'service01').mkdir(exist_ok=True)
+            model_years = {str(year): {'7E0': sorted(rng.sample(['01', '0C', '0D', '2F', '5C', 'A6'], 3))}
+                           for year in range(start_year - 3, start_year + 1)}
+            (repo_dir / 'service01' / 'modelyears.json').write_text(json.dumps(model_years))
+
+        if rng.random() < 0.5:
+            (repo_dir / 'generations.yml').write_text(
+                "generations:\n"
+                f"  - name: Generation 1\n    start_year: {start_year - 6}\n    end_year: {start_year - 1}\n"
+                f"    description: First generation\n"
+                f"  - name: Generation 2\n    start_year: {start_year}\n    end_year: null\n"
+                f"    description: Current generation\n"
+            )
+
+        stats['repos'] += 1
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic workspace of OBDb-style vehicle repositories')
+    parser.add_argument('--output', required=True, help='Workspace directory to write')
+    parser.add_argument('--repos', type=int, default=DEFAULTS['repos'], help='Number of repositories')
+    parser.add_argument('--signalsets', type=int, default=DEFAULTS['signalsets'],
+                        help='Most signalset files per repository')
+    parser.add_argument('--commands', type=int, default=DEFAULTS['commands'], help='Mean commands per signalset')
+    parser.add_argument('--signals', type=int, default=DEFAULTS['signals'], help='Mean signals per command')
+    parser.add_argument('--signal-groups', type=int, default=DEFAULTS['signal_groups'],
+                        help=f'Signal groups per signalset (at most {len(SIGNAL_FAMILIES)})')
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'], help='Random seed')
+    args = parser.parse_args()
+
+    stats = generate_workspace(args.output, args.repos, args.signalsets, args.commands, args.signals,
+                               args.signal_groups, args.seed)
+    print(f"Generated {stats['repos']} repositories with {stats['signalsets']} signalsets, "
+          f"{stats['commands']} commands and {stats['signals']} signals in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
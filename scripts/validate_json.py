@@ -3,9 +3,35 @@ import json
 import os
 import sys
 import argparse
+import hashlib
+import heapq
+import tempfile
 import jsonschema
 from pathlib import Path
-from datetime import datetime
+
+from schema_validator import compile_schema
+from serialization import dump, dumps, load, loads
+from functools import lru_cache
+
+# Number of records sorted in memory before spilling a sorted run to disk
+SORT_CHUNK_SIZE = 50000
+
+# Values that deep_sort_dict() returns unchanged
+SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+def canonical_encoding(obj):
+    """
+    Encode an already deep-sorted value as minified JSON.
+
+    This single encoding is both the output representation of a value and its
+    sort key. Ordering by it is identical to ordering by
+    json.dumps(obj, sort_keys=True): the two differ only by the space after each
+    structural ',' and ':', and two encodings first differ at the same
+    character in either form, so every comparison has the same outcome.
+    dumps() (see serialization.py) returns the same bytes as json.dumps() with
+    compact separators, whichever backend encodes it.
+    """
+    return dumps(obj)
 
 def deep_sort_dict(obj):
     """
@@ -13,13 +39,17 @@ def deep_sort_dict(obj):
     This ensures the JSON output is deterministic across different runs.
     """
     if isinstance(obj, dict):
-        return {k: deep_sort_dict(obj[k]) for k in sorted(obj.keys())}
+        result = {}
+        for k in sorted(obj):
+            value = obj[k]
+            # Scalars are the bulk of every record, so skip the recursive call for them
+            result[k] = value if type(value) in SCALAR_TYPES else deep_sort_dict(value)
+        return result
     elif isinstance(obj, list):
         if len(obj) > 0 and isinstance(obj[0], dict):
-            # For a list of dictionaries, sort by their serialized string
-            # representation to ensure consistent ordering
-            return sorted([deep_sort_dict(i) for i in obj],
-                          key=lambda x: json.dumps(x, sort_keys=True))
+            # For a list of dictionaries, sort by their canonical encoding
+            # (computed once per element) to ensure consistent ordering
+            return sorted([deep_sort_dict(i) for i in obj], key=canonical_encoding)
         else:
             # For other lists, just sort the elements if they're sortable
             try:
@@ -35,37 +65,196 @@ def load_schema(schema_path):
     with open(schema_path, 'r') as f:
         return json.load(f)
 
-def validate_and_normalize_json(input_path, output_path, schema_path=None):
+@lru_cache(maxsize=None)
+def load_record_validator(schema_path):
     """
-    Validate the JSON against schema, sort it for consistent output,
-    and write it to the output file.
+    Build a validator for single records from a schema describing an array of them.
+
+    The schema is compiled once into specialized checks (see schema_validator.py)
+    and reused for every record.
+    """
+    schema = load_schema(schema_path)
+    return compile_schema(schema.get('items', {}))
+
+def format_validation_error(error):
+    """Describe a validation error, prefixed with the path of the offending field."""
+    path = '.'.join(str(part) for part in error.path)
+    return f"{path}: {error.message}" if path else error.message
+
+def encode_record(record):
+    """
+    Normalize a single top-level record and return its canonical encoding.
+
+    The encoding is exactly how the record appears in the minified output and
+    also serves as its sort key (see canonical_encoding()), so each record is
+    serialized once and never re-encoded for sorting.
+    """
+    return canonical_encoding(deep_sort_dict(record))
+
+def _write_run(encoded, temp_dir):
+    """Sort a chunk of encoded records and spill it to a temporary run file."""
+    encoded.sort()
+    run = tempfile.TemporaryFile('w+', encoding='utf-8', dir=temp_dir)
+    for line in encoded:
+        # Encoded JSON never contains raw newlines, so it is safe as a record separator
+        run.write(line + '\n')
+    run.seek(0)
+    return run
+
+def _read_run(run):
+    for row in run:
+        yield row[:-1]
+
+def sort_encoded_records(records, chunk_size=SORT_CHUNK_SIZE, temp_dir=None, encode=encode_record):
+    """
+    Yield the encoded records in normalized order.
+
+    At most chunk_size records are held in memory at once; larger inputs are
+    sorted in runs on disk and combined with a k-way merge. Records that are
+    already normalized can be passed with encode=canonical_encoding to skip
+    deep_sort_dict().
+    """
+    runs = []
+    chunk = []
+    try:
+        for record in records:
+            chunk.append(encode(record))
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(chunk, temp_dir))
+                chunk = []
+
+        if not runs:
+            chunk.sort()
+            yield from chunk
+            return
+
+        if chunk:
+            runs.append(_write_run(chunk, temp_dir))
+            chunk = []
+        yield from heapq.merge(*(_read_run(run) for run in runs))
+    finally:
+        for run in runs:
+            run.close()
+
+def file_sha256(path):
+    """Hash a file in blocks without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_normalized_stream(records, output_path, validator=None, chunk_size=SORT_CHUNK_SIZE,
+                            keep_invalid=True, sinks=(), encode=encode_record):
+    """
+    Validate, sort and write an iterable of records as a minified JSON array.
+
+    Records are validated one at a time as they are consumed, sorted with a
+    bounded-memory external merge and written incrementally. The output is
+    byte-identical to deep_sort_dict() followed by a minified json.dump(). The
+    file is written through a temporary path and only replaces output_path
+    once it is complete, and, unless keep_invalid is set, only when every record
+    passed validation.
+
+    Each sink's add(record, line) is called with every normalized record and its
+    encoded line, in output order, so derived outputs can be built in the same
+    pass without reading the file back. encode is passed on to
+    sort_encoded_records().
+
+    Returns a dict with the record count, the SHA-256 of the written file and a
+    list of (record_index, message) validation errors.
+    """
+    errors = []
+
+    def validated(records):
+        for index, record in enumerate(records):
+            if validator is not None:
+                for error in validator.iter_errors(record):
+                    errors.append((index, format_validation_error(error)))
+            yield record
+
+    output_path = Path(output_path)
+    os.makedirs(output_path.parent, exist_ok=True)
+    temp_path = output_path.with_name(output_path.name + '.tmp')
+    digest = hashlib.sha256()
+    count = 0
+
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        def write(text):
+            f.write(text)
+            digest.update(text.encode('utf-8'))
+
+        write('[')
+        for line in sort_encoded_records(validated(records), chunk_size, output_path.parent, encode):
+            write(line if count == 0 else ',' + line)
+            count += 1
+            if sinks:
+                record = loads(line)
+                for sink in sinks:
+                    sink.add(record, line)
+        write(']')
+
+    written = keep_invalid or not errors
+    if written:
+        os.replace(temp_path, output_path)
+    else:
+        os.remove(temp_path)
+    return {'count': count, 'sha256': digest.hexdigest(), 'errors': errors, 'written': written}
+
+def validate_and_normalize_json(data, output_path, schema_path=None, strict=True, sinks=(), encode=encode_record):
+    """
+    Validate parameter records against the schema, sort them for consistent
+    output, and write them to the output file.
+
+    data is any iterable of records, such as the list loaded from a file or a
+    generator fed straight from the extractor, so in-process callers never need
+    to serialize the data just to hand it over. With strict set, invalid data
+    leaves the existing output untouched. sinks and encode are passed on to
+    write_normalized_stream().
+
+    Returns the stats dict from write_normalized_stream().
+    """
+    validator = load_record_validator(str(schema_path)) if schema_path else None
+    stats = write_normalized_stream(data, output_path, validator, keep_invalid=not strict, sinks=sinks,
+                                    encode=encode)
+
+    if stats['errors']:
+        print(f"❌ JSON validation failed with {len(stats['errors'])} errors:")
+        for index, message in stats['errors']:
+            print(f"  record {index}: {message}")
+    elif validator is not None:
+        print(f"✅ JSON is valid according to schema")
+
+    if stats['written']:
+        print(f"✅ Normalized JSON written to {output_path}")
+    return stats
+
+def validate_and_normalize_file(input_path, output_path, schema_path=None):
+    """
+    Load a JSON file and validate and normalize it into output_path.
+
+    Returns True if the data was valid and the output was written.
     """
     # Load the input JSON
     with open(input_path, 'r') as f:
-        data = json.load(f)
+        data = load(f)
+
+    if isinstance(data, list) and (not data or isinstance(data[0], dict)):
+        stats = validate_and_normalize_json(data, output_path, schema_path)
+        return stats['written']
 
-    # Validate against schema if provided
+    # Anything other than a list of records is validated as a whole and deep sorted
     if schema_path:
-        schema = load_schema(schema_path)
         try:
-            jsonschema.validate(instance=data, schema=schema)
+            jsonschema.validate(instance=data, schema=load_schema(schema_path))
             print(f"✅ JSON is valid according to schema")
         except jsonschema.exceptions.ValidationError as e:
             print(f"❌ JSON validation error: {e}")
             return False
 
-    # Sort the data for consistent output
-    sorted_data = deep_sort_dict(data)
-
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    # Add metadata as a comment at the top of the file
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Write the sorted data (minified for serving)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
     with open(output_path, 'w') as f:
-        json.dump(sorted_data, f, separators=(',', ':'))
+        dump(deep_sort_dict(data), f)
 
     print(f"✅ Normalized JSON written to {output_path}")
     return True
@@ -84,7 +273,7 @@ def main():
             args.schema = str(default_schema)
             print(f"Using default schema: {default_schema}")
 
-    success = validate_and_normalize_json(args.input, args.output, args.schema)
+    success = validate_and_normalize_file(args.input, args.output, args.schema)
     if not success:
         sys.exit(1)
 
@@ -6,10 +6,104 @@ let cachedMatrixData = null;
 let isLoading = false;
 let loadPromise = null;
 
+// Pointer file of content-addressed artifacts (see scripts/artifacts.py)
+let artifactManifestPromise = null;
+
+// Cache for per-vehicle shards
+let vehicleManifestPromise = null;
+const vehicleShardPromises = {};
+
+// Tables of matrix_data_compact.json, in row index order (see scripts/compact_matrix.py)
+const COMPACT_TABLES = ['vehicles', 'commands', 'formats', 'signalGroups', 'modelYears'];
+const COMPACT_ROW_FIELDS = ['pid', 'id', 'name', 'suggestedMetric', 'path'];
+
+/**
+ * Expands the interned table form of the matrix back into flat parameter records
+ */
+const expandCompactMatrix = (compact) => {
+  const tables = COMPACT_TABLES.map(name => compact[name]);
+
+  return compact.rows.map(row => {
+    // Records that don't fit the row layout are stored as-is
+    if (!Array.isArray(row)) {
+      return row;
+    }
+
+    const record = {};
+    tables.forEach((table, index) => {
+      Object.assign(record, table[row[index]]);
+    });
+    COMPACT_ROW_FIELDS.forEach((field, index) => {
+      record[field] = row[tables.length + index];
+    });
+    return record;
+  });
+};
+
+/**
+ * Resolves a data file to its content-addressed copy, which is safe to cache forever,
+ * or to the plain file if there is no pointer entry for it
+ */
+const resolveDataUrl = async (name) => {
+  if (!artifactManifestPromise) {
+    artifactManifestPromise = axios.get('/data/artifacts.json')
+      .then(response => (response.data && response.data.files) || {})
+      .catch(() => ({}));
+  }
+
+  const files = await artifactManifestPromise;
+  return files[name] ? `/data/${files[name].path}` : `/data/${name}`;
+};
+
+/**
+ * Loads the flat parameter records, preferring the smaller compact file
+ */
+const fetchRawData = async () => {
+  try {
+    const response = await axios.get(await resolveDataUrl('matrix_data_compact.json'));
+    if (response.data && Array.isArray(response.data.rows)) {
+      return expandCompactMatrix(response.data);
+    }
+  } catch (error) {
+    // Fall back to the flat file below
+  }
+
+  const response = await axios.get(await resolveDataUrl('matrix_data.json'));
+  return response.data;
+};
+
+/**
+ * Loads the prebuilt inverted indexes (see scripts/matrix_index.py), or null if unavailable
+ */
+const fetchMatrixIndex = async () => {
+  try {
+    const response = await axios.get(await resolveDataUrl('matrix_index.json'));
+    return response.data && response.data.fields ? response.data : null;
+  } catch (error) {
+    return null;
+  }
+};
+
+/**
+ * Selects the records listed under an index value, or filters them when there is no usable index
+ */
+const selectRecords = (rawData, index, field, value, predicate) => {
+  if (index) {
+    // Only own keys, so values like "constructor" or "__proto__" don't resolve to Object.prototype
+    const offsets = index.fields[field];
+    return (Object.prototype.hasOwnProperty.call(offsets, value) ? offsets[value] : [])
+      .map(offset => rawData[offset]);
+  }
+  return rawData.filter(predicate);
+};
+
 /**
  * Transforms raw matrix data into more usable formats
  */
-const transformData = (rawData) => {
+const transformData = (rawData, matrixIndex = null) => {
+  // Only trust an index built from the same data; offsets are positions in rawData
+  const index = matrixIndex && matrixIndex.count === rawData.length ? matrixIndex : null;
+
   // Extract unique values
   const makes = [...new Set(rawData.map(item => item.make))].sort();
   const models = [...new Set(rawData.map(item => item.model))].sort();
@@ -59,13 +153,13 @@ const transformData = (rawData) => {
   vehicles.forEach(vehicle => {
     if (vehicle.isSpecialCase) {
       // For special cases like SAEJ1979
-      parametersByVehicle[vehicle.id] = rawData.filter(
+      parametersByVehicle[vehicle.id] = selectRecords(rawData, index, 'make', vehicle.make,
         item => item.make === vehicle.make ||
                (item.specialCase && item.specialCase === vehicle.make)
       );
     } else {
       // For regular make-model vehicles
-      parametersByVehicle[vehicle.id] = rawData.filter(
+      parametersByVehicle[vehicle.id] = selectRecords(rawData, index, 'vehicle', vehicle.id,
         item => item.make === vehicle.make && item.model === vehicle.model
       );
     }
@@ -74,7 +168,7 @@ const transformData = (rawData) => {
   // Create parameter lookup by special case
   const parametersBySpecialCase = {};
   specialCases.forEach(specialCase => {
-    parametersBySpecialCase[specialCase] = rawData.filter(
+    parametersBySpecialCase[specialCase] = selectRecords(rawData, index, 'make', specialCase,
       item => item.make === specialCase ||
              (item.specialCase && item.specialCase === specialCase)
     );
@@ -83,7 +177,7 @@ const transformData = (rawData) => {
   // Create parameter lookup by suggested metric
   const parametersByMetric = {};
   suggestedMetrics.forEach(metric => {
-    parametersByMetric[metric] = rawData.filter(
+    parametersByMetric[metric] = selectRecords(rawData, index, 'suggestedMetric', metric,
       item => item.suggestedMetric === metric
     );
   });
@@ -213,8 +307,8 @@ const loadMatrixData = async () => {
     try {
       // In a real implementation, we would load this from an API
       // For now, we'll simulate it with a short timeout
-      const response = await axios.get('/data/matrix_data.json');
-      const transformedData = transformData(response.data);
+      const [rawData, matrixIndex] = await Promise.all([fetchRawData(), fetchMatrixIndex()]);
+      const transformedData = transformData(rawData, matrixIndex);
 
       // Cache the data
       cachedMatrixData = transformedData;
@@ -330,13 +424,60 @@ const getMakes = async () => {
   return data.makes;
 };
 
+/**
+ * Loads the manifest of per-vehicle shards, or null if there isn't one
+ */
+const loadVehicleManifest = () => {
+  if (!vehicleManifestPromise) {
+    vehicleManifestPromise = axios.get('/data/vehicles/manifest.json')
+      .then(response => (response.data && response.data.vehicles) || null)
+      .catch(() => null);
+  }
+  return vehicleManifestPromise;
+};
+
+/**
+ * Loads the parameters of a single vehicle from its shard, or null if it has none
+ */
+const loadVehicleShard = async (vehicleId) => {
+  const manifest = await loadVehicleManifest();
+  const entry = manifest && manifest[vehicleId];
+  if (!entry) {
+    return null;
+  }
+
+  if (!vehicleShardPromises[vehicleId]) {
+    // The content hash in the URL lets unchanged shards stay cached across data updates
+    const url = `/data/vehicles/${encodeURIComponent(entry.file)}?v=${entry.sha256.slice(0, 12)}`;
+    vehicleShardPromises[vehicleId] = axios.get(url)
+      .then(response => (Array.isArray(response.data) ? response.data : null))
+      .catch(error => {
+        delete vehicleShardPromises[vehicleId];
+        throw error;
+      });
+  }
+  return vehicleShardPromises[vehicleId];
+};
+
 /**
  * Gets all parameters for a specific vehicle
  */
 const getVehicleParameters = async (make, model) => {
-  const data = await loadMatrixData();
   const vehicleId = `${make}-${model}`;
 
+  // Until the full matrix has been loaded, fetch just this vehicle's shard
+  if (!cachedMatrixData) {
+    try {
+      const shard = await loadVehicleShard(vehicleId);
+      if (shard) {
+        return shard;
+      }
+    } catch (error) {
+      // Fall back to the full matrix below
+    }
+  }
+
+  const data = await loadMatrixData();
   return data.parametersByVehicle[vehicleId] || [];
 };
 
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# The scripts import their siblings directly, as they do when run from scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+
+def git(*args, cwd=None):
+    """Run git with a fixed identity and return its output."""
+    return subprocess.run(['git', '-c', 'user.name=OBDb', '-c', 'user.email=obdb@example.com', *args],
+                          cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class GitRepo:
+    """A working tree with a bare clone next to it that stands in for the GitHub repository."""
+
+    def __init__(self, path, remote_path):
+        self.path = path
+        self.remote_path = remote_path
+
+    def commit(self, files, message='Update signalsets'):
+        """Write {relative path: text} into the working tree, commit, push and return the commit id."""
+        for name, content in files.items():
+            file_path = self.path / name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+        git('add', '-A', cwd=self.path)
+        git('commit', '-q', '-m', message, cwd=self.path)
+        git('push', '-q', str(self.remote_path), 'main', cwd=self.path)
+        return git('rev-parse', 'HEAD', cwd=self.path)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Return a factory of GitRepos named after vehicles, with their bare remotes in tmp_path/remotes."""
+    def make(name, files):
+        repo = GitRepo(tmp_path / 'sources' / name, tmp_path / 'remotes' / f"{name}.git")
+        repo.path.mkdir(parents=True)
+        git('init', '-q', '-b', 'main', cwd=repo.path)
+        git('init', '-q', '--bare', '-b', 'main', str(repo.remote_path))
+        repo.commit(files, 'Initial signalsets')
+        return repo
+    return make
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import json
+import shutil
+
+import extract_data
+from change_detection import (
+    CHANGE_MANIFEST_VERSION, ChangeDetector, compare_manifests, has_changes, load_change_manifest,
+    save_change_manifest
+)
+from synthetic_workspace import generate_workspace
+
+RECORDS = [
+    {'make': 'Ford', 'model': 'F-150', 'id': 'FORD_SOC', 'name': 'State of charge', 'unit': 'percent'},
+    {'make': 'Ford', 'model': 'F-150', 'id': 'FORD_ODO', 'name': 'Odometer', 'unit': 'kilometers'},
+    {'make': 'Ford', 'model': 'F-150', 'id': 'FORD_ODO', 'name': 'Odometer', 'unit': 'miles'},
+    {'make': 'Toyota', 'model': 'Prius', 'id': 'TOYOTA_SOC', 'name': 'State of charge', 'unit': 'percent'},
+    {'make': 'Kia', 'model': 'Niro', 'id': 'KIA_SOC', 'name': 'State of charge', 'unit': 'percent'},
+]
+
+
+def manifest(records):
+    detector = ChangeDetector()
+    for record in records:
+        detector.add(record, json.dumps(record, sort_keys=True))
+    return detector.manifest()
+
+
+def test_manifest_groups_signals_by_vehicle():
+    vehicles = manifest(RECORDS)['vehicles']
+    assert sorted(vehicles) == ['Ford-F-150', 'Kia-Niro', 'Toyota-Prius']
+    assert vehicles['Ford-F-150']['count'] == 2
+    assert sorted(vehicles['Ford-F-150']['signals']) == ['FORD_ODO', 'FORD_SOC']
+    # Record order within a vehicle is part of its encoded output, signal order isn't
+    assert manifest(RECORDS[1:3] + RECORDS[:1] + RECORDS[3:]) == manifest(RECORDS)
+
+
+def test_unchanged_run():
+    report = compare_manifests(manifest(RECORDS), manifest(list(RECORDS)))
+    assert report == {'added': [], 'removed': [], 'changed': [], 'signals': {}}
+    assert not has_changes(report)
+
+
+def test_added_removed_and_changed_vehicles():
+    previous = manifest(RECORDS)
+    current = manifest([record for record in RECORDS if record['make'] != 'Kia'] + [
+        {'make': 'Tesla', 'model': 'Model 3', 'id': 'TESLA_SOC', 'name': 'State of charge', 'unit': 'percent'}
+    ])
+    current_toyota = manifest([dict(RECORDS[3], unit='ratio')])['vehicles']['Toyota-Prius']
+    current['vehicles']['Toyota-Prius'] = current_toyota
+
+    report = compare_manifests(previous, current)
+    assert has_changes(report)
+    assert report['added'] == ['Tesla-Model 3']
+    assert report['removed'] == ['Kia-Niro']
+    assert report['changed'] == ['Toyota-Prius']
+    assert report['signals'] == {
+        'Kia-Niro': {'added': [], 'removed': ['KIA_SOC'], 'changed': []},
+        'Tesla-Model 3': {'added': ['TESLA_SOC'], 'removed': [], 'changed': []},
+        'Toyota-Prius': {'added': [], 'removed': [], 'changed': ['TOYOTA_SOC']},
+    }
+
+
+def test_added_removed_and_changed_signals():
+    previous = manifest(RECORDS)
+    records = [dict(record, name='Charge') if record['id'] == 'FORD_SOC' else record
+               for record in RECORDS if record['id'] != 'FORD_ODO']
+    records.append({'make': 'Ford', 'model': 'F-150', 'id': 'FORD_RANGE', 'name': 'Range', 'unit': 'kilometers'})
+
+    report = compare_manifests(previous, manifest(records))
+    assert report['added'] == report['removed'] == []
+    assert report['changed'] == ['Ford-F-150']
+    assert report['signals'] == {
+        'Ford-F-150': {'added': ['FORD_RANGE'], 'removed': ['FORD_ODO'], 'changed': ['FORD_SOC']}
+    }
+
+
+def test_changing_one_of_several_records_of_a_signal():
+    previous = manifest(RECORDS)
+    records = [dict(record, unit='feet') if record is RECORDS[2] else record for record in RECORDS]
+    report = compare_manifests(previous, manifest(records))
+    assert report['changed'] == ['Ford-F-150']
+    assert report['signals']['Ford-F-150'] == {'added': [], 'removed': [], 'changed': ['FORD_ODO']}
+
+
+def test_saved_manifest_round_trips(tmp_path):
+    manifest_path = tmp_path / 'state' / 'change_manifest.json'
+    save_change_manifest(manifest_path, manifest(RECORDS))
+    assert load_change_manifest(manifest_path) == manifest(RECORDS)
+    assert [path.name for path in manifest_path.parent.iterdir()] == ['change_manifest.json']
+
+
+def test_missing_or_unusable_manifest(tmp_path):
+    manifest_path = tmp_path / 'change_manifest.json'
+    assert load_change_manifest(manifest_path) is None
+
+    manifest_path.write_text('{"version": 1, "vehicles": ')
+    assert load_change_manifest(manifest_path) is None
+
+    old = dict(manifest(RECORDS), version=CHANGE_MANIFEST_VERSION - 1)
+    manifest_path.write_text(json.dumps(old))
+    assert load_change_manifest(manifest_path) is None
+
+    del old['version']
+    manifest_path.write_text(json.dumps(old))
+    assert load_change_manifest(manifest_path) is None
+
+
+def test_extraction_compares_against_the_saved_manifest(tmp_path):
+    generate_workspace(tmp_path / 'workspace', repos=4, signalsets=2, commands=4, signals=3, signal_groups=2)
+    manifest_path = tmp_path / 'state' / 'change_manifest.json'
+
+    def extract():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return extract_data.extract_data(tmp_path / 'workspace', tmp_path / 'output',
+                                             change_manifest_path=manifest_path)
+
+    # Without a previous manifest the run records a baseline
+    assert extract()['vehicles'] is None
+    baseline = load_change_manifest(manifest_path)
+    assert len(baseline['vehicles']) == 4
+
+    result = extract()
+    assert not result['changed'] and not has_changes(result['vehicles'])
+
+    # A manifest from another version is treated like a missing one and replaced
+    manifest_path.write_text(json.dumps(dict(baseline, version=CHANGE_MANIFEST_VERSION + 1)))
+    assert extract()['vehicles'] is None
+    assert load_change_manifest(manifest_path) == baseline
+
+    removed = sorted(baseline['vehicles'])[0]
+    shutil.rmtree(tmp_path / 'workspace' / removed)
+    result = extract()
+    assert result['changed']
+    assert result['vehicles']['removed'] == [removed]
+    assert result['vehicles']['added'] == result['vehicles']['changed'] == []
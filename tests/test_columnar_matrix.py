@@ -0,0 +1,44 @@
+import math
+
+from columnar_matrix import ColumnarMatrix, ColumnarMatrixBuilder
+
+
+def write_matrix(path, records):
+    builder = ColumnarMatrixBuilder()
+    for record in records:
+        builder.add(record)
+    builder.write(path)
+
+
+def test_columns_outlive_the_file(tmp_path):
+    path = tmp_path / 'matrix_data.columns'
+    write_matrix(path, [
+        {'make': 'Ford', 'id': 'A', 'fmt': {'mul': 0.5}, 'bitOffset': 8},
+        {'make': 'Škoda', 'id': 'B', 'fmt': {'len': 8}},
+    ])
+
+    with ColumnarMatrix(path) as matrix:
+        scales = matrix.column('fmt.mul')
+        offsets = matrix.column('bitOffset')
+        makes = list(matrix.values('make'))
+
+    assert scales[0] == 0.5 and math.isnan(scales[1])
+    assert offsets[0] == 8
+    assert makes == ['Ford', 'Škoda']
+
+
+def test_where_distinguishes_types(tmp_path):
+    path = tmp_path / 'matrix_data.columns'
+    write_matrix(path, [
+        {'id': 'A', 'debug': True},
+        {'id': 'B', 'debug': 1},
+        {'id': 'C', 'debug': 1.0},
+        {'id': 'D', 'cmd': {'22': 'F40D'}},
+    ])
+
+    with ColumnarMatrix(path) as matrix:
+        assert matrix.where(debug=1) == [1]
+        assert matrix.where(debug=True) == [0]
+        assert matrix.where(debug=1.0) == [2]
+        assert matrix.where(debug=False) == []
+        assert matrix.where(cmd={'22': 'F40D'}) == [3]
@@ -0,0 +1,147 @@
+import asyncio
+import gzip
+import hashlib
+
+import pytest
+
+from data_server import DataServer, DataStore, accepts_gzip, etag_matches, parse_range
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 99)),
+    ('bytes=10-10', (10, 10)),
+    ('bytes=900-2000', (900, 999)),
+    # Open-ended and suffix ranges
+    ('bytes=990-', (990, 999)),
+    ('bytes=-10', (990, 999)),
+    ('bytes=-5000', (0, 999)),
+    # Unsatisfiable
+    ('bytes=1000-', False),
+    ('bytes=1000-1001', False),
+    ('bytes=-0', False),
+    # Ignored, so the whole content is sent
+    ('bytes=5-2', None),
+    ('bytes=-', None),
+    ('bytes=0-1,5-6', None),
+    ('items=0-1', None),
+    ('', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+def test_parse_range_of_empty_content():
+    assert parse_range('bytes=-10', 0) is False
+    assert parse_range('bytes=0-', 0) is False
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip', True),
+    ('gzip, deflate, br', True),
+    ('GZIP;q=0.5', True),
+    ('br;q=1.0, gzip;q=0.8', True),
+    ('gzip;q=0', False),
+    ('gzip; q=0.0, *;q=1', False),
+    ('*', True),
+    ('*;q=0', False),
+    ('deflate, br', False),
+    ('gzip;q=invalid', False),
+    ('', False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) == expected
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", W/"abc"', True),
+    ('"xyz" , "abc" ', True),
+    ('*', True),
+    (' * ', True),
+    ('"xyz"', False),
+    ('"ABC"', False),
+    ('abc', False),
+    ('', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') == expected
+
+
+MATRIX = b'[' + b','.join(b'{"id":"SIGNAL_%d","unit":"percent"}' % i for i in range(200)) + b']'
+
+
+async def request(port, target, **headers):
+    """Send one GET request and return the status, the headers and the body."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = [f"GET {target} HTTP/1.1", 'Host: localhost', 'Connection: close']
+    lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    response_headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        response_headers[name.strip().lower()] = value.strip()
+    return int(status_line.split(' ')[1]), response_headers, body
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'matrix_data.json').write_bytes(MATRIX)
+    (tmp_path / 'secret.txt').write_text('outside the data directory')
+    return data_dir
+
+
+def test_responses(data_dir):
+    etag = f'"{hashlib.sha256(MATRIX).hexdigest()}"'
+
+    async def run():
+        server = await asyncio.start_server(DataServer(DataStore(data_dir, 1 << 20), quiet=True).handle,
+                                            '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, headers, body = await request(port, '/data/matrix_data.json')
+            assert (status, headers['etag'], body) == (200, etag, MATRIX)
+
+            status, headers, body = await request(port, '/data/matrix_data.json', Accept_Encoding='gzip')
+            assert (status, headers['content-encoding']) == (200, 'gzip')
+            assert gzip.decompress(body) == MATRIX
+            gzip_etag = headers['etag']
+
+            # Conditional requests
+            for tag, encoding in ((etag, 'identity'), (f"W/{etag}", 'identity'), ('"other", ' + etag, 'identity'),
+                                  ('*', 'identity'), (gzip_etag, 'gzip')):
+                status, headers, body = await request(port, '/data/matrix_data.json', If_None_Match=tag,
+                                                      Accept_Encoding=encoding)
+                assert (status, body) == (304, b''), tag
+            status, _, body = await request(port, '/data/matrix_data.json', If_None_Match=gzip_etag)
+            assert (status, body) == (200, MATRIX)
+
+            # Range requests
+            status, headers, body = await request(port, '/data/matrix_data.json', Range='bytes=1-10')
+            assert (status, headers['content-range'], body) == (206, f"bytes 1-10/{len(MATRIX)}", MATRIX[1:11])
+            status, headers, body = await request(port, '/data/matrix_data.json', Range='bytes=-5',
+                                                  Accept_Encoding='gzip')
+            assert (status, body) == (206, MATRIX[-5:])
+            assert 'content-encoding' not in headers
+            status, headers, body = await request(port, '/data/matrix_data.json', Range='bytes=0-4',
+                                                  If_Range='"stale"')
+            assert (status, body) == (200, MATRIX)
+            status, headers, _ = await request(port, '/data/matrix_data.json', Range=f"bytes={len(MATRIX)}-")
+            assert (status, headers['content-range']) == (416, f"bytes */{len(MATRIX)}")
+
+            # Paths that leave the data directory
+            for target in ('/data/../secret.txt', '/data/%2e%2e/secret.txt', '/data/..%2Fsecret.txt',
+                           '/data/vehicles/../../secret.txt', '/data/missing.json', '/secret.txt'):
+                status, _, body = await request(port, target)
+                assert status == 404, target
+                assert b'outside' not in body
+
+    asyncio.run(run())
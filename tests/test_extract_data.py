@@ -0,0 +1,74 @@
+import contextlib
+import io
+import itertools
+import json
+
+import pytest
+
+import extract_data
+from synthetic_workspace import generate_workspace
+
+IDS = ['BAT_SOC', 'TP_FL_PRES', 'TP_RR_TEMP', 'DOOR_FL_OPEN', 'AA_DUP', 'AB_DUP', 'TIRE_FL', 'tire_rr',
+       'ODO_KM', 'ODO  _KM', 'ODO _KM', 'OTHER']
+
+GROUPS = {
+    'plain': r'^BAT_SOC',
+    'capture': r'^TP_([A-Z]{2})_(PRES|TEMP)$',
+    'named': r'^DOOR_(?P<door>FL|FR|RL|RR)',
+    'backreference': r'^(\w)\1_DUP',
+    'ignorecase': r'(?i)^tire_',
+    'verbose': r'(?x) ^ODO \s* _KM',
+}
+
+
+def signalset(group_names):
+    return json.dumps({
+        'commands': [{'hdr': '7E0', 'cmd': {'22': 'F40D'},
+                      'signals': [{'id': signal_id, 'fmt': {'len': 8}} for signal_id in IDS]}],
+        'signalGroups': [{'id': name.upper(), 'matchingRegex': GROUPS[name]} for name in group_names],
+    })
+
+
+def assigned_groups(content):
+    return {parameter.id: parameter.signalGroups
+            for parameter in extract_data.parse_signalset(content, 'Ford', 'F-150')}
+
+
+@pytest.mark.parametrize('group_names', [
+    combination for size in (2, 3, len(GROUPS)) for combination in itertools.combinations(GROUPS, size)
+])
+def test_prefilter_keeps_group_assignment(monkeypatch, group_names):
+    content = signalset(group_names)
+    with_prefilter = assigned_groups(content)
+    monkeypatch.setattr(extract_data, 'compile_group_prefilter', lambda matching_regexes: None)
+    assert with_prefilter == assigned_groups(content)
+
+
+def test_prefilter_is_only_built_when_combining_is_safe():
+    assert extract_data.compile_group_prefilter((GROUPS['plain'], GROUPS['capture'], GROUPS['named']))
+    for name in ('backreference', 'ignorecase', 'verbose'):
+        assert extract_data.compile_group_prefilter((GROUPS['plain'], GROUPS[name])) is None
+    # Flags scoped to a group don't leak into the other alternatives
+    assert extract_data.compile_group_prefilter((GROUPS['plain'], r'(?i:^tire_)'))
+
+
+def test_groups_are_assigned():
+    groups = assigned_groups(signalset(GROUPS))
+    assert [group['id'] for group in groups['TIRE_FL']] == ['IGNORECASE']
+    assert [group['id'] for group in groups['ODO  _KM']] == ['VERBOSE']
+    assert [group['id'] for group in groups['AA_DUP']] == ['BACKREFERENCE']
+    assert groups['AB_DUP'] == groups['OTHER'] == []
+    assert groups['TP_RR_TEMP'][0]['matchDetails'] == {'group1': 'RR', 'group2': 'TEMP'}
+    assert groups['DOOR_FL_OPEN'][0]['matchDetails'] == {'group1': 'FL'}
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    generate_workspace(tmp_path / 'workspace', repos=12, signalsets=3, commands=6, signals=4, signal_groups=3)
+    for jobs in (1, 3):
+        with contextlib.redirect_stdout(io.StringIO()):
+            extract_data.extract_data(tmp_path / 'workspace', tmp_path / f"jobs-{jobs}", jobs=jobs)
+
+    for name in ('matrix_data.json', 'model_years_data.json', 'generations_data.json'):
+        serial = (tmp_path / 'jobs-1' / name).read_bytes()
+        assert serial not in (b'', b'[]', b'{}'), name
+        assert (tmp_path / 'jobs-3' / name).read_bytes() == serial, name
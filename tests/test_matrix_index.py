@@ -0,0 +1,19 @@
+from matrix_index import MatrixIndexBuilder, search
+
+
+def test_search_matches_non_ascii_words():
+    builder = MatrixIndexBuilder()
+    for record in [
+        {'make': 'Škoda', 'model': 'Octavia', 'id': 'SKODA_OEL_T', 'name': 'Öltemperatur'},
+        {'make': 'Renault', 'model': 'Zoe', 'id': 'ZOE_T_BAT', 'name': 'Température batterie'},
+        {'make': 'Ford', 'model': 'F-150', 'id': 'F150_SOC', 'name': 'State of charge'},
+    ]:
+        builder.add(record)
+    index = builder.to_dict()
+
+    assert search(index, 'öltemperatur') == [0]
+    assert search(index, 'Température') == [1]
+    assert search(index, 'temp') == []
+    # Underscores still separate the words of ids
+    assert search(index, 'soc') == [2]
+    assert search(index, 'zoe bat') == [1]
@@ -0,0 +1,36 @@
+import pytest
+
+from matrix_query import DATA_FILENAME, QUERY_INDEX_FILENAME, MatrixQuery, QueryIndexBuilder, build_query_index
+from validate_json import write_normalized_stream
+
+RECORDS = [
+    {'make': 'Ford', 'model': 'F-150', 'id': 'F150_SOC', 'hdr': '7E0', 'unit': 'percent'},
+    {'make': 'Toyota', 'model': 'Prius', 'id': 'PRIUS_SOC', 'hdr': '7E0', 'unit': 'percent'},
+    {'make': 'Toyota', 'model': 'Prius', 'id': 'PRIUS_ODO', 'hdr': '7C0', 'unit': 'kilometers'},
+]
+
+
+def write_data(data_dir):
+    builder = QueryIndexBuilder()
+    stats = write_normalized_stream(iter(RECORDS), data_dir / DATA_FILENAME, sinks=[builder])
+    builder.write(data_dir / QUERY_INDEX_FILENAME, stats['sha256'])
+
+
+def test_select_reads_matching_records(tmp_path):
+    write_data(tmp_path)
+    with MatrixQuery(tmp_path) as matrix:
+        assert matrix.records(matrix.select(make='Toyota', hdr='7E0')) == [RECORDS[1]]
+
+
+def test_refuses_index_of_changed_data(tmp_path):
+    write_data(tmp_path)
+    data_path = tmp_path / DATA_FILENAME
+    # A change that keeps the file the same size
+    data_path.write_bytes(data_path.read_bytes().replace(b'7C0', b'7C8'))
+
+    with pytest.raises(ValueError, match='does not match'):
+        MatrixQuery(tmp_path)
+
+    build_query_index(tmp_path)
+    with MatrixQuery(tmp_path) as matrix:
+        assert matrix.records(matrix.select(hdr='7C8')) == [dict(RECORDS[2], hdr='7C8')]
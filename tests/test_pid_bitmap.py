@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from pid_bitmap import (ENCODINGS, bitmap_to_pids, convert, decode_bitmap, encode_bitmap, pids_to_bitmap)
+
+PID_LISTS = [
+    [],
+    ['00'],
+    ['FF'],
+    ['00', 'FF'],
+    ['00', '01', '0C', '0D', '20', '40', '5C', '7F', '80', 'A6', 'C0', 'FE', 'FF'],
+    [f'{pid:02X}' for pid in range(256)],
+] + [sorted(f'{pid:02X}' for pid in random.Random(seed).sample(range(256), seed * 7)) for seed in range(1, 20)]
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_pid_list_round_trips_through_bitmap(encoding):
+    for pids in PID_LISTS:
+        bits = pids_to_bitmap(pids)
+        assert bitmap_to_pids(bits) == pids
+        assert bitmap_to_pids(decode_bitmap(encode_bitmap(bits, encoding))) == pids
+
+
+def test_edge_pids_set_the_edge_bits():
+    assert pids_to_bitmap(['00']) == 1
+    assert pids_to_bitmap(['FF']) == 1 << 255
+    assert encode_bitmap(pids_to_bitmap(['00'])) == '0' * 63 + '1'
+    assert encode_bitmap(pids_to_bitmap(['FF'])) == '8' + '0' * 63
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_model_years_round_trip(encoding):
+    vehicles = [
+        {'make': 'Ford', 'model': 'F-150', 'modelYears': {
+            '2019': {'7E8': ['00', '0C', 'FF'], '7E9': []},
+            '2020': {},
+            '2021': {'7E8': ['00']},
+        }},
+        {'make': 'Toyota', 'model': 'Prius', 'modelYears': {}},
+        # Lists a bitmap can't reproduce are kept as they are
+        {'make': 'Kia', 'model': 'Niro', 'modelYears': {'2022': {'7E8': ['0c', '0D', '0D', '100']}}},
+    ]
+    encoded = convert(vehicles, encoding=encoding)
+    assert encoded[0]['modelYears']['2019']['7E9'] == encode_bitmap(0, encoding)
+    assert encoded[0]['modelYears']['2020'] == {}
+    assert encoded[2]['modelYears']['2022']['7E8'] == ['0c', '0D', '0D', '100']
+    assert convert(encoded, decode=True) == vehicles
@@ -0,0 +1,67 @@
+import pytest
+
+from repo_fetcher import RepoFetcher, github_auth_env
+from repo_sources import open_repo_source, workspace_entry_path
+
+SIGNALSET = '{"commands":[{"hdr":"7E0","cmd":{"22":"F40D"},"signals":[{"id":"SPEED","fmt":{"len":8}}]}]}'
+
+
+def fetch(tmp_path, mode, repos, **options):
+    fetcher = RepoFetcher(tmp_path / 'workspace', url_template=str(tmp_path / 'remotes' / '{repo}.git'),
+                          mode=mode, backoff=0, **options)
+    return {result['repo']: result for result in fetcher.fetch_all('OBDb', repos)}
+
+
+@pytest.mark.parametrize('mode', ['worktree', 'git'])
+def test_clone_update_and_failure(tmp_path, git_repo, mode):
+    repo = git_repo('Ford-F-150', {'signalsets/v3/default.json': SIGNALSET})
+    first = repo.commit({'signalsets/v3/2019-2021.json': SIGNALSET})
+
+    results = fetch(tmp_path, mode, ['Ford-F-150', 'Missing-Repo'], retries=0)
+    cloned = results['Ford-F-150']
+    assert cloned['success'] and cloned['head_before'] is None and cloned['head_after'] == first
+    failed = results['Missing-Repo']
+    assert not failed['success'] and failed['attempts'] == 1 and failed['error']
+    assert not workspace_entry_path(tmp_path / 'workspace', 'Missing-Repo', mode).exists()
+
+    second = repo.commit({'signalsets/v3/default.json': SIGNALSET.replace('SPEED', 'VSS')})
+    updated = fetch(tmp_path, mode, ['Ford-F-150'])['Ford-F-150']
+    assert updated['success'] and updated['head_before'] == first and updated['head_after'] == second
+
+    with open_repo_source(workspace_entry_path(tmp_path / 'workspace', 'Ford-F-150', mode)) as source:
+        assert source.list_signalsets() == ['2019-2021.json', 'default.json']
+        assert b'VSS' in source.read('signalsets/v3/default.json')
+
+    unchanged = fetch(tmp_path, mode, ['Ford-F-150'])['Ford-F-150']
+    assert unchanged['head_before'] == unchanged['head_after'] == second
+
+
+def test_failing_repo_is_retried(tmp_path):
+    result = fetch(tmp_path, 'worktree', ['Missing-Repo'], retries=2)['Missing-Repo']
+    assert not result['success'] and result['attempts'] == 3
+
+
+def test_backoff_does_not_hold_a_slot(tmp_path, git_repo, capsys):
+    git_repo('Ford-F-150', {'signalsets/v3/default.json': SIGNALSET})
+    fetcher = RepoFetcher(tmp_path / 'workspace', url_template=str(tmp_path / 'remotes' / '{repo}.git'),
+                          concurrency=1, retries=1, backoff=0.5)
+    results = fetcher.fetch_all('OBDb', ['Missing-Repo', 'Ford-F-150'])
+    assert [result['success'] for result in results] == [False, True]
+
+    # The working repository is fetched while the failing one waits to retry
+    output = capsys.readouterr().out
+    assert output.index('Cloned Ford-F-150') < output.index('Error processing Missing-Repo')
+
+
+def test_token_is_passed_through_the_environment(monkeypatch):
+    monkeypatch.setenv('GITHUB_TOKEN', 'secret')
+    monkeypatch.delenv('GIT_CONFIG_COUNT', raising=False)
+    env = github_auth_env('https://github.com/OBDb/Ford-F-150.git')
+    assert env['GIT_CONFIG_COUNT'] == '1'
+    assert env['GIT_CONFIG_KEY_0'] == 'http.https://github.com/.extraheader'
+    assert env['GIT_CONFIG_VALUE_0'].startswith('AUTHORIZATION: basic ')
+    assert 'secret' not in env['GIT_CONFIG_VALUE_0']
+
+    monkeypatch.setenv('GIT_CONFIG_COUNT', '2')
+    assert 'GIT_CONFIG_KEY_2' in github_auth_env('https://github.com/OBDb/Ford-F-150.git')
+    assert github_auth_env('/srv/mirrors/Ford-F-150.git') == {}
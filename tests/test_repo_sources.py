@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from conftest import git
+from repo_sources import (
+    ArchiveSource, GitObjectSource, RepoSource, WorkingTreeSource, open_repo_source, workspace_entry_path
+)
+
+FILES = {
+    'signalsets/v3/default.json': json.dumps({'commands': []}),
+    'signalsets/v3/2019-2021.json': json.dumps({'commands': [{'hdr': '7E0'}]}),
+    'signalsets/v3/notes.txt': 'not a signalset',
+    'service01/modelyears.json': json.dumps({'2020': {'01': 'FFFF'}}),
+    'generations.yaml': 'generations: []\n',
+    'README.md': '# Ford F-150\n',
+}
+
+NEEDED_PATHS = [
+    'signalsets/v3/2019-2021.json', 'signalsets/v3/default.json', 'service01/modelyears.json',
+    'generations.yaml', 'generations.yml'
+]
+
+
+@pytest.fixture
+def workspaces(git_repo, tmp_path):
+    """The same commit of a repository as a worktree, a bare clone and an archive."""
+    repo = git_repo('Ford-F-150', FILES)
+    workspace = tmp_path / 'workspace'
+    workspace.mkdir()
+    git('clone', '-q', str(repo.remote_path), str(workspace_entry_path(workspace, 'Ford-F-150', 'worktree')))
+    git('clone', '-q', '--bare', str(repo.remote_path), str(workspace_entry_path(workspace, 'Ford-F-150', 'git')))
+    git('archive', '--format=tar.gz', '--prefix=Ford-F-150-main/',
+        '-o', str(workspace_entry_path(workspace, 'Ford-F-150', 'archive')), 'HEAD', cwd=repo.path)
+    commit = git('rev-parse', 'HEAD', cwd=repo.path)
+    return workspace, commit
+
+
+def test_sources_read_the_same_files(workspaces):
+    workspace, commit = workspaces
+    sources = {mode: open_repo_source(workspace_entry_path(workspace, 'Ford-F-150', mode))
+               for mode in ('worktree', 'git', 'archive')}
+    assert isinstance(sources['worktree'], WorkingTreeSource)
+    assert isinstance(sources['git'], GitObjectSource)
+    assert isinstance(sources['archive'], ArchiveSource)
+
+    for mode, source in sources.items():
+        with source:
+            assert source.name == 'Ford-F-150'
+            assert source.has_signalsets()
+            assert source.list_signalsets() == ['2019-2021.json', 'default.json'], mode
+            for path in NEEDED_PATHS:
+                expected = FILES[path].encode('utf-8') if path in FILES else None
+                assert source.read(path) == expected, (mode, path)
+
+    # Every form gives a file's git blob id as its digest
+    for path in NEEDED_PATHS:
+        digests = {mode: source.digest(path) for mode, source in sources.items()}
+        if path in FILES:
+            expected = 'git:' + git('rev-parse', f"HEAD:{path}", cwd=workspace / 'Ford-F-150')
+        else:
+            expected = None
+        assert digests == dict.fromkeys(sources, expected), path
+
+    assert sources['worktree'].head() is None
+    assert sources['git'].head() == commit
+    assert sources['archive'].head() == commit
+
+
+def test_repo_source_is_abstract():
+    with pytest.raises(TypeError):
+        RepoSource('Ford-F-150')
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import jsonschema
+import pytest
+
+from schema_validator import compile_schema
+
+SCHEMA = json.loads((Path(__file__).resolve().parent.parent / 'scripts' / 'matrix_data_schema.json').read_text())
+
+VALID = {
+    'hdr': '7E0', 'pid': '0D', 'cmd': {'01': '0D'}, 'id': 'FORD_SPEED', 'name': 'Vehicle speed',
+    'unit': 'kilometersPerHour', 'suggestedMetric': None, 'scaling': 'raw', 'make': 'Ford', 'model': 'F-150',
+    'modelYears': [2019, 2022], 'bitOffset': 0, 'bitLength': 8, 'debug': False, 'fmt': {'len': 8},
+    'signalGroups': [{'id': 'SPD', 'name': 'Speed', 'path': None, 'matchDetails': {'group1': 'FL'}}],
+}
+
+# (field, value) changes to the valid record
+CHANGES = [
+    ('bitOffset', True), ('bitOffset', 1.0), ('bitOffset', 1.5), ('bitOffset', -1), ('bitLength', 0),
+    ('bitLength', '8'), ('debug', 1), ('debug', 0.0), ('unit', 5), ('unit', False),
+    ('modelYears', [2019]), ('modelYears', [2019, 2020, 2021]), ('modelYears', []), ('modelYears', None),
+    ('modelYears', [2019.0, 2020]), ('modelYears', [True, 2020]), ('modelYears', '2019-2022'),
+    ('signalGroups', [{'name': 'Speed'}]), ('signalGroups', [{'id': 7, 'path': 3}, {'id': 'X'}]),
+    ('signalGroups', {'id': 'SPD'}), ('signalGroups', [{'id': 'SPD', 'matchDetails': []}]),
+    ('signalGroups', [{'id': 'SPD', 'extra': {'nested': True}}]), ('signalGroups', ['SPD', None]),
+    ('cmd', []), ('fmt', 'len=8'), ('unexpected', 1), ('another', None),
+]
+
+
+def issues(errors):
+    return sorted((tuple(error.absolute_path if hasattr(error, 'absolute_path') else error.path), error.message)
+                  for error in errors)
+
+
+def assert_same_errors(schema, instance):
+    expected = issues(jsonschema.Draft7Validator(schema).iter_errors(instance))
+    assert issues(compile_schema(schema).iter_errors(instance)) == expected
+
+
+def test_valid_record():
+    assert not list(compile_schema(SCHEMA['items']).iter_errors(VALID))
+    assert_same_errors(SCHEMA['items'], VALID)
+
+
+@pytest.mark.parametrize('field, value', CHANGES)
+def test_invalid_records_match_jsonschema(field, value):
+    assert_same_errors(SCHEMA['items'], dict(VALID, **{field: value}))
+
+
+def test_missing_and_combined_errors_match_jsonschema():
+    for field in SCHEMA['items']['required']:
+        record = {key: value for key, value in VALID.items() if key != field}
+        assert_same_errors(SCHEMA['items'], record)
+    assert_same_errors(SCHEMA['items'], {'bitOffset': True, 'modelYears': [1.5], 'extra': 1, 'other': 2})
+    for instance in ([], 'record', None, 3):
+        assert_same_errors(SCHEMA['items'], instance)
+
+
+def test_whole_matrix_matches_jsonschema():
+    assert_same_errors(SCHEMA, [VALID, dict(VALID, bitLength=True), {'id': 'X'}])
+
+
+GENERIC_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        # pattern, oneOf and tuple items aren't compiled and go through jsonschema
+        'pid': {'type': 'string', 'pattern': '^[0-9A-F]{2}$'},
+        'value': {'oneOf': [{'type': 'integer'}, {'type': 'string', 'maxLength': 3}]},
+        'pair': {'type': 'array', 'items': [{'type': 'integer'}, {'type': 'string'}]},
+        'years': {'type': 'array', 'items': {'type': 'integer'}, 'uniqueItems': True},
+    },
+    'additionalProperties': {'type': 'integer'},
+}
+
+
+@pytest.mark.parametrize('instance', [
+    {'pid': '0D', 'value': 7, 'pair': [1, 'a'], 'years': [2019, 2020], 'n': 1},
+    {'pid': '0d', 'value': 'long', 'pair': ['a', 1], 'years': [2019, 2019], 'n': True},
+    {'pid': 13, 'value': 1.0, 'pair': [1.0], 'years': [2019.5], 'n': 1.0},
+])
+def test_generic_fallback_matches_jsonschema(instance):
+    assert_same_errors(GENERIC_SCHEMA, instance)
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import serialization
+
+# Edge cases where the fast backends are most likely to differ from json
+VALUES = [
+    {'b': 1, 'a': [1.5, -0.0, 0.1, 100.0, 1e15, 1e16, 1e-4, 1e-05, 5e-324, 1.7976931348623157e308]},
+    {'id': 'FORD_SOC', 'fmt': {'len': 8, 'mul': 0.392156862745098, 'add': -40, 'map': {'0': 'Off'}}},
+    [2 ** 63 - 1, -2 ** 63, 2 ** 64, 10 ** 30, -10 ** 30, True, False, None, '', [], {}],
+    ['café', '°C', '\U0001f697', '\x00\x1f\x7f', 'tab\there', 'line\nbreak', 'quote"slash/back\\'],
+    [float('nan'), float('inf'), -float('inf')],
+    1e16, 1e-05, -2.5e-7, float('nan'), 'café', 7, 2 ** 64,
+    {'hdr': '7E0', 'cmd': {'22': '1E5A'}, 'x': [3e-5, 1.5e300], 'n': {'v': float('nan')}, 'e': '1e5,'},
+    {'z': {'y': [{'b': 2, 'a': 1, 'c': {'é': {'d': [1e-05, 'Température']}}}]}, 'é': 1, 'A': 2,
+     '10': 3, '9': 4},
+]
+
+TEXTS = [
+    '{"a":1,"a":2,"b":[1.0,1e400,-0,0.30000000000000004,2.2250738585072014e-308]}',
+    '[NaN,Infinity,-Infinity]',
+    '[18446744073709551616,-9223372036854775809,9223372036854775807,1E+2,1e-7,1e-05]',
+    '{"big":{"n":100000000000000000000000000000}}',
+    '"\\ud83d\\ude97\\u00e9\\/"',
+    '{"name":"Température","unit":"°C","path":"Škoda/Octavia"}',
+    b'\xef\xbb\xbf{"bom":true}',
+    '{"nested":{"list":[{"x":null}]},"empty":""}',
+]
+
+BACKENDS = [(name, loads, dumps) for name, loads, dumps in serialization.available_backends()]
+BACKENDS.append(('selected', serialization.loads, serialization.dumps))
+
+
+def outcome(function, *args, **kwargs):
+    try:
+        return function(*args, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize('name, loads, dumps', BACKENDS, ids=[backend[0] for backend in BACKENDS])
+def test_dumps_matches_json(name, loads, dumps):
+    for value in VALUES:
+        for sort_keys in (False, True):
+            for ensure_ascii in (True, False):
+                expected = outcome(json.dumps, value, separators=(',', ':'), sort_keys=sort_keys,
+                                   ensure_ascii=ensure_ascii)
+                actual = outcome(dumps, value, sort_keys, ensure_ascii)
+                if isinstance(expected, str):
+                    assert actual.encode('utf-8') == expected.encode('utf-8'), value
+                else:
+                    assert actual == expected, value
+
+
+@pytest.mark.parametrize('name, loads, dumps', BACKENDS, ids=[backend[0] for backend in BACKENDS])
+def test_loads_matches_json(name, loads, dumps):
+    for text in TEXTS:
+        for content in (text, text.encode('utf-8')) if isinstance(text, str) else (text,):
+            # repr() tells 1 from 1.0 and -0.0 from 0.0, and keeps NaN comparable
+            assert repr(outcome(loads, content)) == repr(outcome(json.loads, content)), content
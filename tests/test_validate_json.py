@@ -0,0 +1,74 @@
+import json
+import random
+
+from validate_json import encode_record, sort_encoded_records, write_normalized_stream
+
+
+def legacy_deep_sort_dict(obj):
+    """deep_sort_dict() as it was before records were sorted by their canonical encoding."""
+    if isinstance(obj, dict):
+        return {k: legacy_deep_sort_dict(obj[k]) for k in sorted(obj.keys())}
+    elif isinstance(obj, list):
+        if len(obj) > 0 and isinstance(obj[0], dict):
+            return sorted([legacy_deep_sort_dict(i) for i in obj],
+                          key=lambda x: json.dumps(x, sort_keys=True))
+        else:
+            try:
+                return sorted(obj)
+            except TypeError:
+                return [legacy_deep_sort_dict(i) for i in obj]
+    else:
+        return obj
+
+
+def legacy_output(records):
+    """The whole matrix sorted in memory and dumped, as validate_json.py used to write it."""
+    return json.dumps(legacy_deep_sort_dict(records), separators=(',', ':'))
+
+
+def make_records(count, seed):
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        record = {
+            'make': rng.choice(['Ford', 'Toyota', 'Škoda', 'BMW']),
+            'model': rng.choice(['F-150', 'Corolla', 'Octavia', 'i3']),
+            # Few distinct ids, so many records share one and differ later in the key
+            'id': f"SIG_{rng.randrange(12)}",
+            'name': rng.choice(['Speed', 'Température', 'Battery level', 'Speed']),
+            'hdr': rng.choice(['7E0', '7E4', '720']),
+            'pid': rng.choice(['0D', '2101', '0C']),
+            'cmd': {rng.choice(['01', '22']): rng.choice(['0D', 'F40D'])},
+            'bitOffset': rng.randrange(64),
+            'bitLength': rng.choice([8, 16]),
+            'scaling': rng.choice([{'mul': 0.1, 'div': 1, 'add': -40}, {'mul': 1e-05, 'add': 0}, {}]),
+            'signalGroups': [{'id': 'TP', 'name': 'Tires'}, {'id': 'BAT', 'name': 'Battery', 'path': 'EV'}]
+            if rng.random() < 0.3 else [],
+        }
+        if rng.random() < 0.5:
+            record['modelYears'] = sorted(rng.sample(range(2010, 2025), 2))
+        records.append(record)
+        # Exact duplicates tie on the whole key
+        if index % 9 == 0:
+            records.append(json.loads(json.dumps(record)))
+    rng.shuffle(records)
+    return records
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path):
+    records = make_records(400, seed=7)
+    expected = legacy_output(records)
+
+    # Small chunks force many runs through the heapq.merge path
+    for chunk_size in (1, 7, 64, 10000):
+        output_path = tmp_path / f'matrix_{chunk_size}.json'
+        stats = write_normalized_stream(iter(records), output_path, chunk_size=chunk_size)
+        assert output_path.read_bytes() == expected.encode('utf-8')
+        assert stats['count'] == len(records)
+
+
+def test_sorted_runs_keep_duplicates_and_ties(tmp_path):
+    records = make_records(120, seed=3)
+    merged = list(sort_encoded_records(iter(records), chunk_size=5, temp_dir=tmp_path))
+    assert merged == sorted(encode_record(record) for record in records)
+    assert len(merged) == len(records)